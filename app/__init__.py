@@ -1,51 +1,124 @@
 
+import time
+_import_started = time.perf_counter()
+
 from flask import Flask, render_template, redirect, url_for, session
 from flask_wtf.csrf import CSRFProtect
-from .models.database import init_db_pool, init_db
+from .models.database import init_db_pool, init_db, set_database_path
+from .models.settings import settings
 from .rate_limiter import limiter
+from .utils.principal import principal_cache
+from .utils.passwords import password_hasher
+from .utils.login_shield import login_shield
+from .utils.request_deadline import deadline_watchdog, RequestDeadlineMiddleware
+from .utils.startup import StartupReport, FirstRenderTimer, configure_template_cache, precompile_templates
+from .utils.log_pipeline import configure_logging
+from .utils.metrics import metrics
+from .utils.query_profiler import query_profiler
+from .utils.traffic_capture import traffic_capture, TrafficCaptureMiddleware
+from .utils.uploads import upload_store
+from .utils.upload_validator import upload_validator
+from .utils.thumbnails import thumbnail_generator
+from .utils.assets import asset_manifest, AssetMiddleware
+from .utils.compression import CompressionMiddleware, skip_compression_for_secrets
+from .utils.conditional import conditional_pages
 from config.default import Config
-import logging
 import os
 
+# Time spent importing the app package and its extensions. Forked workers
+# inherit the imports for free, so only the importing process reports it.
+_import_seconds = time.perf_counter() - _import_started
+_import_pid = os.getpid()
+
 def create_app(config_class=Config):
-    app = Flask(__name__, template_folder='templates', static_folder='static')
-    app.config.from_object(config_class)
-    
-    # Initialize CSRF protection
-    csrf = CSRFProtect(app)
-    
-    # Setup logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('app.log')
-        ]
-    )
+    # Imports are only paid by the first app created in a process
+    global _import_seconds
+    report = StartupReport(import_seconds=_import_seconds if os.getpid() == _import_pid else 0.0)
+    _import_seconds = 0.0
+
+    with report.phase('config'):
+        app = Flask(__name__, template_folder='templates', static_folder='static')
+        app.config.from_object(config_class)
+        
+        # Initialize CSRF protection
+        csrf = CSRFProtect(app)
+        
+        # Setup logging
+        configure_logging(app.config)
+        
+        # Compiled templates persist on disk across restarts and workers
+        configure_template_cache(app)
+        FirstRenderTimer().init_app(app)
     
-    # Setup rate limiter
-    limiter.init_app(app)
+    with report.phase('extensions'):
+        # Setup rate limiter
+        limiter.init_app(app)
+        
+        # Setup cache for the logged-in user's rows
+        principal_cache.init_app(app)
+        
+        # Stream uploads to disk under UPLOAD_FOLDER
+        upload_store.init_app(app)
+        upload_validator.init_app(app)
+        thumbnail_generator.init_app(app)
+        
+        # Setup the password hashing pool
+        password_hasher.init_app(app)
+        login_shield.init_app(app)
+        
+        # Per-endpoint latency and database metrics (see /admin/metrics)
+        metrics.init_app(app)
+        query_profiler.init_app(app)
+        
+        # Abort database work of requests that overrun REQUEST_TIMEOUT
+        deadline_watchdog.init_app(app)
+        app.wsgi_app = RequestDeadlineMiddleware(app.wsgi_app, deadline_watchdog)
+        
+        # 304s for unchanged pages (see utils/conditional.py)
+        conditional_pages.init_app(app)
+        
+        # Fingerprinted, pre-compressed CSS/JS (built by `flask --app app build-assets`)
+        asset_manifest.init_app(app)
+        app.wsgi_app = AssetMiddleware(app.wsgi_app, app.static_folder, app.static_url_path,
+                                       app.config['ASSET_CACHE_MAX_AGE'])
+        
+        # gzip/brotli for HTML and other text responses
+        if app.config.get('COMPRESSION_ENABLED'):
+            app.wsgi_app = CompressionMiddleware(app.wsgi_app, app.config['COMPRESSION_MIN_SIZE'],
+                                                 app.config['COMPRESSION_LEVEL'],
+                                                 app.config['COMPRESSION_BROTLI_QUALITY'])
+            app.after_request(skip_compression_for_secrets)
+        
+        # Opt-in recording of sanitized request traces (see benchmarks/replay.py)
+        traffic_capture.init_app(app)
+        if traffic_capture.enabled:
+            app.wsgi_app = TrafficCaptureMiddleware(app.wsgi_app, traffic_capture)
     
-    # Initialize database
-    # Note: init_db() might rely on global path, we should ideally pass config or app
-    # Ensuring database exists
-    with app.app_context():
-         init_db()
-         init_db_pool(app)
+    # Initialize database; the pool opens its connections on first use
+    with report.phase('database'):
+        set_database_path(app.config['DATABASE_PATH'])
+        with app.app_context():
+             init_db()
+             init_db_pool(app)
+             settings.init_app(app)
+             upload_validator.resume_pending()
+             thumbnail_generator.resume_missing()
 
     # Register blueprints
-    from .controllers.auth_controller import auth_bp
-    from .controllers.user_controller import user_bp
-    from .controllers.helper_controller import helper_bp
-    from .controllers.admin_controller import admin_bp
-    from .controllers.feedback_controller import feedback_bp
-    
-    app.register_blueprint(auth_bp, url_prefix='/auth')
-    app.register_blueprint(user_bp, url_prefix='/user')
-    app.register_blueprint(helper_bp, url_prefix='/helper')
-    app.register_blueprint(admin_bp, url_prefix='/admin')
-    app.register_blueprint(feedback_bp, url_prefix='/feedback')
+    with report.phase('blueprints'):
+        from .controllers.auth_controller import auth_bp
+        from .controllers.user_controller import user_bp
+        from .controllers.helper_controller import helper_bp
+        from .controllers.admin_controller import admin_bp
+        from .controllers.feedback_controller import feedback_bp
+        from .controllers.upload_controller import upload_bp
+        
+        app.register_blueprint(auth_bp, url_prefix='/auth')
+        app.register_blueprint(user_bp, url_prefix='/user')
+        app.register_blueprint(helper_bp, url_prefix='/helper')
+        app.register_blueprint(admin_bp, url_prefix='/admin')
+        app.register_blueprint(feedback_bp, url_prefix='/feedback')
+        app.register_blueprint(upload_bp, url_prefix='/uploads')
 
     # Error handlers
     @app.errorhandler(404)
@@ -56,6 +129,10 @@ def create_app(config_class=Config):
     def internal_error(error):
         return render_template('errors/500.html'), 500
 
+    @app.errorhandler(413)
+    def too_large_error(error):
+        return render_template('errors/413.html', error=error), 413
+
     @app.errorhandler(429)
     def ratelimit_error(error):
         return render_template('errors/429.html'), 429
@@ -83,4 +160,11 @@ def create_app(config_class=Config):
     def contact():
         return render_template('contact.html')
 
+    # Compile templates now instead of on the first request that uses each
+    if app.config.get('TEMPLATE_PRECOMPILE'):
+        with report.phase('templates'):
+            precompile_templates(app)
+
+    app.extensions['startup_report'] = report
+    report.log()
     return app
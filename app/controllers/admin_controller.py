@@ -1,29 +1,47 @@
-from flask import Blueprint, request, jsonify, session, redirect, url_for, render_template, flash
+from flask import Blueprint, request, jsonify, session, redirect, url_for, render_template, flash, Response
 from ..models.user import User
 from ..models.helper import Helper
 from ..models.service_request import ServiceRequest
 from ..models.feedback import Feedback
 from ..models.complaint import Complaint
 from ..models.verification import Verification
+from ..models.admin import Admin
+from ..models.database import get_db_connection
+from ..utils.principal import current_principal, invalidate_principal
+from ..utils.metrics import metrics
+from ..utils.query_profiler import query_profiler
+from ..utils.uploads import upload_url
+from ..utils.streaming import stream_page
 from functools import wraps
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+# Complaints listed per page of admin.complaints
+COMPLAINTS_PER_PAGE = 50
+
 # Middleware to check if user is logged in and is an admin
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_type' not in session or session['user_type'] != 'admin':
+        if session.get('user_type') != 'admin' or not current_principal or current_principal.role != 'admin':
             return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return decorated_function
 
+def _page_links(page, total_pages):
+    """Page numbers to link to: the first, last and two either side of page, '...' for gaps"""
+    links = []
+    for number in range(1, total_pages + 1):
+        if number in (1, total_pages) or abs(number - page) <= 2:
+            links.append(number)
+        elif links[-1] != '...':
+            links.append('...')
+    return links
+
 @admin_bp.route('/dashboard')
 @login_required
 def dashboard():
     try:
-        from ..models.database import get_db_connection
-        
         conn = get_db_connection()
         cursor = conn.cursor()
         
@@ -78,9 +96,7 @@ def dashboard():
 @admin_bp.route('/users')
 @login_required
 def users():
-    # Get all users
-    users = User.get_all()
-    return render_template('admin/users.html', users=users)
+    return stream_page('admin/users.html', users=User.iter_all())
 
 @admin_bp.route('/helpers')
 @login_required
@@ -145,16 +161,16 @@ def verification_review(verification_id):
         
     user = User.get_by_id(helper.user_id)
     
-    # Parse document paths
-    document_paths = verification.document_path.split(',')
     documents = []
-    for path in document_paths:
-        if path:
-            doc_type = 'ID' if 'id_' in path else 'Certificate'
-            documents.append({
-                'type': doc_type,
-                'path': f"/static/uploads/verifications/{path}"
-            })
+    for document in verification.get_documents():
+        file_url = upload_url(document.path)
+        documents.append({
+            'type': document.document_type,
+            'name': document.original_name or document.document_type,
+            'path': file_url,
+            'file_url': file_url
+        })
+    verification.documents = documents
     
     return render_template('admin/verification_review.html',
                            verification=verification,
@@ -179,6 +195,7 @@ def approve_verification(verification_id):
     helper = Helper.get_by_id(verification.helper_id)
     if helper:
         helper.verify(True)
+        invalidate_principal(helper.user_id)
     
     flash(f'Verification #{verification_id} has been approved successfully', 'success')
     return redirect(url_for('admin.verifications', status='Approved'))
@@ -193,10 +210,13 @@ def reject_verification(verification_id):
     Verification.update_status(verification_id, 'Rejected', admin_id, notes)
     
     # Ensure helper is not verified
-    verification.helper_id
+    verification = Verification.get_by_id(verification_id)
+    if not verification:
+        return redirect(url_for('admin.verifications'))
     helper = Helper.get_by_id(verification.helper_id)
     if helper:
         helper.verify(False)
+        invalidate_principal(helper.user_id)
     
     flash(f'Verification #{verification_id} has been rejected', 'warning')
     return redirect(url_for('admin.verifications', status='Rejected'))
@@ -215,90 +235,21 @@ def reopen_verification(verification_id):
 @admin_bp.route('/requests')
 @login_required
 def requests():
-    # Get all service requests
-    conn = Helper.get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM service_requests ORDER BY created_at DESC')
-    requests_data = cursor.fetchall()
-    conn.close()
-    
-    # Get user and helper information for each request
-    requests_with_details = []
-    for request_data in requests_data:
-        service_request = ServiceRequest(
-            id=request_data['id'],
-            user_id=request_data['user_id'],
-            helper_id=request_data['helper_id'],
-            category=request_data['category'],
-            title=request_data['title'],
-            description=request_data['description'],
-            deadline=request_data['deadline'],
-            status=request_data['status'],
-            created_at=request_data['created_at'],
-            updated_at=request_data['updated_at']
-        )
-        
-        user = User.get_by_id(service_request.user_id)
-        helper = None
-        helper_user = None
-        
-        if service_request.helper_id:
-            helper = Helper.get_by_id(service_request.helper_id)
-            if helper:
-                helper_user = User.get_by_id(helper.user_id)
-        
-        requests_with_details.append({
-            'request': service_request,
-            'user': user,
-            'helper': helper,
-            'helper_user': helper_user
-        })
-    
-    return render_template('admin/requests.html', requests=requests_with_details)
+    return stream_page('admin/requests.html', requests=ServiceRequest.iter_with_people())
 
 @admin_bp.route('/complaints')
 @login_required
 def complaints():
-    # Get all complaints
-    conn = Helper.get_db_connection()
-    cursor = conn.cursor()
+    total = Complaint.count()
+    total_pages = max(1, -(-total // COMPLAINTS_PER_PAGE))
+    page = min(max(request.args.get('page', 1, type=int), 1), total_pages)
     
-    cursor.execute('SELECT * FROM complaints ORDER BY status ASC, created_at DESC')
-    complaints_data = cursor.fetchall()
-    conn.close()
-    
-    # Get user, helper, and service request information for each complaint
-    complaints_with_details = []
-    for complaint_data in complaints_data:
-        complaint = Complaint(
-            id=complaint_data['id'],
-            user_id=complaint_data['user_id'],
-            helper_id=complaint_data['helper_id'],
-            service_request_id=complaint_data['service_request_id'],
-            description=complaint_data['description'],
-            status=complaint_data['status'],
-            resolution=complaint_data['resolution'],
-            created_at=complaint_data['created_at'],
-            updated_at=complaint_data['updated_at']
-        )
-        
-        user = User.get_by_id(complaint.user_id)
-        helper = Helper.get_by_id(complaint.helper_id)
-        helper_user = None
-        if helper:
-            helper_user = User.get_by_id(helper.user_id)
-        service_request = ServiceRequest.get_by_id(complaint.service_request_id)
-        
-        complaints_with_details.append({
-            'complaint': complaint,
-            'user': user,
-            'helper': helper,
-            'helper_user': helper_user,
-            'service_request': service_request
-        })
-    
-    return render_template('admin/complaints.html', complaints=complaints_with_details)
+    return stream_page('admin/complaints.html', csrf=True,
+                       complaints=Complaint.iter_page_with_people(COMPLAINTS_PER_PAGE, (page - 1) * COMPLAINTS_PER_PAGE),
+                       total_complaints=total,
+                       current_page=page,
+                       pages=_page_links(page, total_pages),
+                       total_pages=total_pages)
 
 @admin_bp.route('/complaint/<int:complaint_id>/resolve', methods=['POST'])
 @login_required
@@ -316,50 +267,14 @@ def resolve_complaint(complaint_id):
 @admin_bp.route('/feedback')
 @login_required
 def feedback():
-    # Get all feedback
-    conn = Helper.get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM feedback ORDER BY created_at DESC')
-    feedback_data = cursor.fetchall()
-    conn.close()
-    
-    # Get user, helper, and service request information for each feedback
-    feedback_with_details = []
-    for fb_data in feedback_data:
-        feedback = Feedback(
-            id=fb_data['id'],
-            user_id=fb_data['user_id'],
-            helper_id=fb_data['helper_id'],
-            service_request_id=fb_data['service_request_id'],
-            rating=fb_data['rating'],
-            review=fb_data['review'],
-            created_at=fb_data['created_at']
-        )
-        
-        user = User.get_by_id(feedback.user_id)
-        helper = Helper.get_by_id(feedback.helper_id)
-        helper_user = None
-        if helper:
-            helper_user = User.get_by_id(helper.user_id)
-        service_request = ServiceRequest.get_by_id(feedback.service_request_id)
-        
-        feedback_with_details.append({
-            'feedback': feedback,
-            'user': user,
-            'helper': helper,
-            'helper_user': helper_user,
-            'service_request': service_request
-        })
-    
-    return render_template('admin/feedback.html', feedback_list=feedback_with_details)
+    return stream_page('admin/feedback.html', feedback_list=Feedback.iter_with_people())
 
 @admin_bp.route('/make-admin', methods=['GET', 'POST'])
 @login_required
 def make_admin():
     if request.method == 'GET':
         # Get all users who are not admins
-        conn = Helper.get_db_connection()
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -374,7 +289,6 @@ def make_admin():
         for user_data in users_data:
             users.append(User(
                 id=user_data['id'],
-                firebase_uid=user_data['firebase_uid'],
                 email=user_data['email'],
                 name=user_data['name'],
                 phone=user_data['phone'],
@@ -382,7 +296,9 @@ def make_admin():
                 profile_picture=user_data['profile_picture'],
                 user_type=user_data['user_type'],
                 created_at=user_data['created_at'],
-                updated_at=user_data['updated_at']
+                updated_at=user_data['updated_at'],
+                location=user_data['location'],
+                profile_thumbnail=user_data['profile_thumbnail']
             ))
         
         return render_template('admin/make_admin.html', users=users)
@@ -394,3 +310,17 @@ def make_admin():
         Admin.create(user_id=user_id)
     
     return redirect(url_for('admin.dashboard'))
+
+@admin_bp.route('/metrics')
+@login_required
+def metrics_view():
+    """Per-endpoint metrics of this process: Prometheus text, or JSON with ?format=json"""
+    if request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json':
+        return jsonify(metrics.as_json())
+    return Response(metrics.as_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@admin_bp.route('/queries')
+@login_required
+def query_profile():
+    """Time per query shape in this process, slowest first, with captured plans"""
+    return jsonify(query_profiler.report())
@@ -2,6 +2,11 @@ from flask import Blueprint, request, render_template, redirect, url_for, flash,
 from ..models.user import User
 from ..models.helper import Helper
 from ..models.admin import Admin
+from ..utils.principal import current_principal, invalidate_principal
+from ..utils.passwords import PasswordHashingBusy
+from ..utils.login_shield import login_shield
+import copy
+import math
 from functools import wraps
 import logging
 
@@ -69,6 +74,10 @@ def register():
         except ValueError as e:
             logger.warning(f"Validation error during registration: {str(e)}")
             flash(str(e), 'danger')
+        except PasswordHashingBusy:
+            logger.warning(f"Password hashing pool busy during registration for {email}")
+            flash('The server is busy right now. Please try again in a moment.', 'warning')
+            return render_template('auth/register.html'), 503
         except Exception as e:
             logger.error(f"Unexpected error during registration: {str(e)}", exc_info=True)
             flash(f"An unexpected error occurred: {str(e)}", 'danger')
@@ -81,9 +90,29 @@ def login():
         email = request.form.get('email')
         password = request.form.get('password')
         
+        # Throttle per IP and per account before doing any lookup or hashing
+        retry_after = login_shield.check(request.remote_addr, email)
+        if retry_after:
+            logger.warning(f"Login throttled for {request.remote_addr}")
+            return render_template('errors/429.html'), 429, {'Retry-After': str(math.ceil(retry_after))}
+        
         user = User.get_by_email(email)
         
-        if user and user.verify_password(password):
+        try:
+            authenticated = user is not None and user.verify_password(password)
+        except PasswordHashingBusy:
+            logger.warning("Password hashing pool busy, rejecting login")
+            flash('The server is busy right now. Please try again in a moment.', 'warning')
+            return render_template('auth/login.html'), 503
+        
+        if authenticated:
+            # Upgrade hashes made with older hashing parameters; best effort,
+            # the password is already verified so a busy pool must not fail the login
+            try:
+                user.rehash_password_if_needed(password)
+            except PasswordHashingBusy:
+                logger.warning(f"Password hashing pool busy, skipping rehash for user {user.id}")
+            
             session['user_id'] = user.id
             session['user_type'] = user.user_type
             session['user_name'] = user.name
@@ -104,6 +133,7 @@ def login():
             else:
                 return redirect(url_for('user.dashboard'))
         
+        login_shield.record_failure(email)
         flash('Invalid email or password.', 'danger')
     
     return render_template('auth/login.html')
@@ -115,25 +145,21 @@ def logout():
 
 @auth_bp.route('/profile')
 def profile():
-    if 'user' not in session:
+    if 'user' not in session or not current_principal:
         return redirect(url_for('auth.login'))
     
-    user = User.get_by_id(session['user']['id'])
-    
-    # If user is a helper, get helper profile
-    helper_profile = None
-    if user.user_type == 'helper':
-        helper_profile = Helper.get_by_user_id(user.id)
-    
-    return render_template('auth/profile.html', user=user, helper_profile=helper_profile)
+    return render_template('auth/profile.html',
+                           user=current_principal.user,
+                           helper_profile=current_principal.helper)
 
 @auth_bp.route('/update-profile', methods=['POST'])
 def update_profile():
-    if 'user' not in session:
+    if 'user' not in session or not current_principal:
         return redirect(url_for('auth.login'))
     
     data = request.form
-    user = User.get_by_id(session['user']['id'])
+    # Edit copies; the cached principal is shared with other requests
+    user = copy.copy(current_principal.user)
     
     # Update user information
     user.name = data['name']
@@ -143,12 +169,13 @@ def update_profile():
     
     # If user is a helper, update helper profile
     if user.user_type == 'helper':
-        helper = Helper.get_by_user_id(user.id)
+        helper = copy.copy(current_principal.helper)
         if helper:
             helper.skills = data.get('skills', '')
             helper.experience = data.get('experience')
             helper.availability = data.get('availability')
             helper.update()
+    invalidate_principal(user.id)
     
     # Update session data
     session['user']['name'] = user.name
@@ -4,6 +4,7 @@ from ..models.helper import Helper
 from ..models.service_request import ServiceRequest
 from ..models.feedback import Feedback
 from ..models.complaint import Complaint
+from ..utils.conditional import conditional_page
 
 feedback_bp = Blueprint('feedback', __name__, url_prefix='/feedback')
 
@@ -18,6 +19,7 @@ def login_required(f):
 
 @feedback_bp.route('/helper/<int:helper_id>')
 @login_required
+@conditional_page(lambda helper_id: [f"helper:{helper_id}"])
 def helper_feedback(helper_id):
     # Get helper
     helper = Helper.get_by_id(helper_id)
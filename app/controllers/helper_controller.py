@@ -1,12 +1,15 @@
-from flask import Blueprint, request, jsonify, session, redirect, url_for, render_template, flash, current_app
+from flask import Blueprint, request, jsonify, session, redirect, url_for, render_template, flash
 from functools import wraps
 from ..models.user import User
 from ..models.helper import Helper
 from ..models.service_request import ServiceRequest
 from ..models.feedback import Feedback
 from ..models.verification import Verification
-import os
-import uuid
+from ..models.settings import settings as site_settings
+from ..utils.principal import current_principal, invalidate_principal
+from ..utils.uploads import upload_store, UploadRejected, DOCUMENT_EXTENSIONS
+from ..utils.upload_validator import upload_validator
+import copy
 
 helper_bp = Blueprint('helper', __name__, url_prefix='/helper')
 
@@ -14,7 +17,7 @@ helper_bp = Blueprint('helper', __name__, url_prefix='/helper')
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_type' not in session or session['user_type'] != 'helper':
+        if session.get('user_type') != 'helper' or not current_principal or current_principal.role != 'helper':
             return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return decorated_function
@@ -23,7 +26,7 @@ def login_required(f):
 @login_required
 def complete_profile():
     user_id = session.get('user_id')
-    user = User.get_by_id(user_id)
+    user = current_principal.user
     
     if request.method == 'GET':
         return render_template('helper/complete_profile.html', user=user)
@@ -49,6 +52,7 @@ def complete_profile():
                 experience=experience,
                 availability=availability
             )
+            invalidate_principal(user_id)
             flash('Profile completed successfully! Welcome to your dashboard.', 'success')
             return redirect(url_for('helper.dashboard'))
         except Exception as e:
@@ -66,13 +70,12 @@ def dashboard():
     
     try:
         # Get helper profile
-        helper = Helper.get_by_user_id(user_id)
+        helper = current_principal.helper
         if not helper:
             flash('Please complete your profile to continue.', 'info')
             return redirect(url_for('helper.complete_profile'))
         
-        # Check if helper is verified
-        user = User.get_by_id(user_id)
+        user = current_principal.user
         
         # Get service requests assigned to this helper
         assigned_requests = ServiceRequest.get_by_helper_id(helper.id)
@@ -115,11 +118,9 @@ def dashboard():
 @helper_bp.route('/requests')
 @login_required
 def requests():
-    user_id = session.get('user_id')
-    
     try:
         # Get helper profile
-        helper = Helper.get_by_user_id(user_id)
+        helper = current_principal.helper
         if not helper:
             flash('Please complete your profile to continue.', 'info')
             return redirect(url_for('helper.complete_profile'))
@@ -164,8 +165,7 @@ def view_request(request_id):
     user = User.get_by_id(service_request.user_id)
     
     # Check if helper is assigned to this request
-    user_id = session['user']['id']
-    helper = Helper.get_by_user_id(user_id)
+    helper = current_principal.helper
     is_assigned = helper and service_request.helper_id == helper.id
     
     return render_template('helper/view_request.html', 
@@ -176,10 +176,8 @@ def view_request(request_id):
 @helper_bp.route('/request/<int:request_id>/accept', methods=['POST'])
 @login_required
 def accept_request(request_id):
-    user_id = session['user']['id']
-    
     # Get helper profile
-    helper = Helper.get_by_user_id(user_id)
+    helper = current_principal.helper
     
     if not helper:
         return redirect(url_for('auth.logout'))
@@ -190,6 +188,16 @@ def accept_request(request_id):
     if not service_request or service_request.status != 'open':
         return redirect(url_for('helper.requests'))
     
+    # Enforce verification and job limits from the settings table
+    if site_settings.verification_required and not helper.verified:
+        flash('You must be verified before you can accept service requests.', 'warning')
+        return redirect(url_for('helper.verification'))
+    
+    max_jobs = site_settings.max_active_jobs
+    if max_jobs > 0 and ServiceRequest.count_active_by_helper(helper.id) >= max_jobs:
+        flash(f'You can have at most {max_jobs} active jobs. Complete one before accepting another.', 'warning')
+        return redirect(url_for('helper.requests'))
+    
     # Assign helper to service request
     service_request.assign_helper(helper.id)
     
@@ -198,10 +206,8 @@ def accept_request(request_id):
 @helper_bp.route('/request/<int:request_id>/start', methods=['POST'])
 @login_required
 def start_request(request_id):
-    user_id = session['user']['id']
-    
     # Get helper profile
-    helper = Helper.get_by_user_id(user_id)
+    helper = current_principal.helper
     
     if not helper:
         return redirect(url_for('auth.logout'))
@@ -220,10 +226,8 @@ def start_request(request_id):
 @helper_bp.route('/request/<int:request_id>/complete', methods=['POST'])
 @login_required
 def complete_request(request_id):
-    user_id = session['user']['id']
-    
     # Get helper profile
-    helper = Helper.get_by_user_id(user_id)
+    helper = current_principal.helper
     
     if not helper:
         return redirect(url_for('auth.logout'))
@@ -242,13 +246,9 @@ def complete_request(request_id):
 @helper_bp.route('/profile')
 @login_required
 def profile():
-    user_id = session['user']['id']
-    
-    # Get user information
-    user = User.get_by_id(user_id)
-    
-    # Get helper profile
-    helper = Helper.get_by_user_id(user_id)
+    # Get user information and helper profile
+    user = current_principal.user
+    helper = current_principal.helper
     
     if not helper:
         return redirect(url_for('auth.logout'))
@@ -264,17 +264,16 @@ def profile():
 @helper_bp.route('/update-profile', methods=['POST'])
 @login_required
 def update_profile():
-    user_id = session['user']['id']
-    
-    # Get user information
-    user = User.get_by_id(user_id)
-    
-    # Get helper profile
-    helper = Helper.get_by_user_id(user_id)
+    # Get user information and helper profile
+    user = current_principal.user
+    helper = current_principal.helper
     
     if not helper:
         return redirect(url_for('auth.logout'))
     
+    # Edit copies; the cached principal is shared with other requests
+    user = copy.copy(user)
+    helper = copy.copy(helper)
     data = request.form
     
     # Update user information
@@ -288,6 +287,7 @@ def update_profile():
     helper.experience = data.get('experience')
     helper.availability = data.get('availability')
     helper.update()
+    invalidate_principal(user.id)
     
     # Update session data
     session['user']['name'] = user.name
@@ -297,11 +297,10 @@ def update_profile():
 @helper_bp.route('/verification')
 @login_required
 def verification():
-    user_id = session.get('user_id')
     status = request.args.get('status', 'none')
     
     # Get helper profile
-    helper = Helper.get_by_user_id(user_id)
+    helper = current_principal.helper
     if not helper:
         flash('Helper profile not found. Please contact support.', 'danger')
         return redirect(url_for('auth.logout'))
@@ -311,9 +310,7 @@ def verification():
     
     if verification:
         status = verification.status
-        # Parse documents if they are stored as comma-separated string
-        if verification.document_path:
-            verification.documents = verification.document_path.split(',')
+        verification.documents = verification.get_documents()
     
     return render_template('helper/verification.html', 
                             helper=helper,
@@ -323,49 +320,47 @@ def verification():
 @helper_bp.route('/verification/submit', methods=['POST'])
 @login_required
 def submit_verification():
-    user_id = session.get('user_id')
-    
     # Get helper profile
-    helper = Helper.get_by_user_id(user_id)
+    helper = current_principal.helper
     if not helper:
         flash('Helper profile not found. Please contact support.', 'danger')
         return redirect(url_for('auth.logout'))
 
-    # Check if files were uploaded
-    if 'id_proof' not in request.files or 'certificate' not in request.files:
+    # Check if files were uploaded (the form names the ID field id_document)
+    id_proof = request.files.get('id_document') or request.files.get('id_proof')
+    certificate = request.files.get('certificate')
+    if not id_proof or not certificate:
         flash('Please upload all required documents', 'danger')
         return redirect(url_for('helper.verification'))
     
-    id_proof = request.files['id_proof']
-    certificate = request.files['certificate']
-    
     if id_proof.filename == '' or certificate.filename == '':
         flash('No selected file', 'danger')
         return redirect(url_for('helper.verification'))
 
+    uploads = []
     try:
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join(current_app.static_folder, 'uploads', 'verifications')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Save files
-        id_filename = f"id_{helper.id}_{str(uuid.uuid4())[:8]}_{id_proof.filename}"
-        cert_filename = f"cert_{helper.id}_{str(uuid.uuid4())[:8]}_{certificate.filename}"
-        
-        id_proof.save(os.path.join(upload_dir, id_filename))
-        certificate.save(os.path.join(upload_dir, cert_filename))
+        # Stream both files into the upload store, then record them with the request
+        for document_type, file_storage in (('ID', id_proof), ('Certificate', certificate)):
+            upload = upload_store.save(file_storage, DOCUMENT_EXTENSIONS)
+            uploads.append((document_type, upload, file_storage.filename))
         
-        # Create verification record
-        document_path = f"{id_filename},{cert_filename}"
-        Verification.create(
+        verification_id = Verification.create_with_documents(
             helper_id=helper.id,
-            document_type="ID,Certificate",
-            document_path=document_path
+            documents=[(document_type, upload.id, name, upload.extension)
+                       for document_type, upload, name in uploads]
         )
+        # File types are checked in the background; the review page shows the outcome
+        upload_validator.submit_verification(verification_id)
         
         flash('Your verification documents have been submitted and will be reviewed soon', 'success')
         return redirect(url_for('helper.verification'))
         
     except Exception as e:
-        flash(f'Error submitting verification: {str(e)}', 'danger')
+        # Nothing references the files stored so far
+        for _, upload, _ in uploads:
+            upload_store.release(upload)
+        if isinstance(e, UploadRejected):
+            flash(str(e), 'danger')
+        else:
+            flash(f'Error submitting verification: {str(e)}', 'danger')
         return redirect(url_for('helper.verification'))
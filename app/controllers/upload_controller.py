@@ -0,0 +1,82 @@
+import os
+from flask import Blueprint, current_app, send_from_directory, abort
+from ..rate_limiter import limiter
+from ..models.upload import Upload
+from ..models.user import User
+from ..models.verification import Verification
+from ..utils.principal import current_principal
+from ..utils.uploads import OBJECTS_DIR
+from ..utils.upload_validator import sniff_mime_type, upload_validator
+
+upload_bp = Blueprint('uploads', __name__)
+
+# Uploads from before the content-addressed store keep verification documents here
+LEGACY_VERIFICATIONS_DIR = 'verifications'
+
+def _may_view_document(owner_ids):
+    """Whether the current user is an admin or one of the helpers owning a document"""
+    principal = current_principal._get_current_object()
+    return principal is not None and (principal.is_admin or principal.id in owner_ids)
+
+def _keep_private(response):
+    response.cache_control.public = False
+    response.cache_control.max_age = None
+    response.cache_control.immutable = False
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
+
+@upload_bp.route('/<path:path>')
+@limiter.exempt
+def serve(path):
+    """Serve a stored upload without copying it through a worker thread.
+
+    send_from_directory hands the open file to the server's
+    wsgi.file_wrapper, which waitress drains from its I/O thread, and
+    answers If-None-Match and Range requests with 304 and 206. Avatars
+    under objects/ are named by their SHA-256 and never change, so that is
+    their strong ETag and they are cached publicly for UPLOAD_CACHE_MAX_AGE
+    as immutable; older uploads are revalidated on each use. Verification
+    documents are only served to admins and the helper who submitted them,
+    and never stored by a cache; anyone else gets a 404. Objects have no
+    extension, so their type is sniffed from the content the first time
+    one is served.
+    """
+    # Temp files of uploads in progress (.incoming) are not served
+    if any(part.startswith('.') for part in path.split('/')):
+        abort(404)
+
+    root = current_app.config['UPLOAD_FOLDER']
+    if not path.startswith(OBJECTS_DIR + '/'):
+        if path.split('/', 1)[0] == LEGACY_VERIFICATIONS_DIR:
+            if not _may_view_document(()):
+                abort(404)
+            return _keep_private(send_from_directory(root, path, max_age=0))
+        return send_from_directory(root, path, max_age=0)
+
+    upload = Upload.get_by_path(path)
+    if upload is None:
+        abort(404)
+    # The same content may be both a document and an avatar, which its owner made public
+    owner_ids = Verification.get_document_owners(path)
+    private = bool(owner_ids) and not User.is_avatar(path)
+    if private and not _may_view_document(owner_ids):
+        abort(404)
+
+    mime_type = upload.mime_type
+    if mime_type is None:
+        try:
+            with open(os.path.join(root, path), 'rb') as f:
+                mime_type = sniff_mime_type(f.read(upload_validator.sniff_bytes))
+        except FileNotFoundError:
+            abort(404)
+        Upload.set_mime_type(upload.id, mime_type)
+
+    digest = os.path.splitext(os.path.basename(path))[0]
+    if private:
+        return _keep_private(send_from_directory(root, path, mimetype=mime_type, etag=digest, max_age=0))
+    response = send_from_directory(root, path, mimetype=mime_type, etag=digest,
+                                   max_age=current_app.config['UPLOAD_CACHE_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -1,12 +1,18 @@
-from flask import Blueprint, request, jsonify, session, redirect, url_for, render_template, flash, current_app
+from flask import Blueprint, request, jsonify, session, redirect, url_for, render_template, flash
 from ..models.user import User
 from ..models.service_request import ServiceRequest
 from ..models.helper import Helper
 from ..models.feedback import Feedback
 from ..models.complaint import Complaint
+from ..models.database import get_db_connection
+from ..models.settings import settings as site_settings
 from functools import wraps
-import os
+import copy
 from ..rate_limiter import limiter
+from ..utils.principal import current_principal, invalidate_principal
+from ..utils.uploads import upload_store, UploadRejected, IMAGE_EXTENSIONS
+from ..utils.thumbnails import thumbnail_generator
+from ..utils.conditional import conditional_page
 
 user_bp = Blueprint('user', __name__, url_prefix='/user')
 
@@ -14,13 +20,14 @@ user_bp = Blueprint('user', __name__, url_prefix='/user')
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_type' not in session or session['user_type'] != 'user':
+        if session.get('user_type') != 'user' or not current_principal or current_principal.role != 'user':
             return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return decorated_function
 
 @user_bp.route('/dashboard')
 @login_required
+@conditional_page()
 def dashboard():
     user_id = session.get('user_id')
     
@@ -30,10 +37,7 @@ def dashboard():
     
     try:
         # Get user information
-        user = User.get_by_id(user_id)
-        if not user:
-            flash('User not found.', 'danger')
-            return redirect(url_for('auth.login'))
+        user = current_principal.user
         
         # Get service requests for this user
         service_requests = ServiceRequest.get_by_user_id(user_id)
@@ -59,23 +63,24 @@ def dashboard():
         flash(f'Error loading dashboard: {str(e)}', 'danger')
         return redirect(url_for('index'))
 
+def _get_categories():
+    """Get category names for the new request form"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT name FROM categories ORDER BY name')
+    categories = [row['name'] for row in cursor.fetchall()]
+    conn.close()
+    
+    if not categories:
+        # Fallback categories if none in database
+        categories = ['Home Repair', 'Technology', 'Transportation', 'Cleaning', 'Cooking', 'Gardening', 'Companionship', 'Education']
+    return categories
+
 @user_bp.route('/request/new', methods=['GET', 'POST'])
 @login_required
 def new_request():
     if request.method == 'GET':
-        # Get categories from database
-        from ..models.database import get_db_connection
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT name FROM categories ORDER BY name')
-        categories = [row['name'] for row in cursor.fetchall()]
-        conn.close()
-        
-        if not categories:
-            # Fallback categories if none in database
-            categories = ['Home Repair', 'Technology', 'Transportation', 'Cleaning', 'Cooking', 'Gardening', 'Companionship', 'Education']
-        
-        return render_template('user/new_request.html', categories=categories)
+        return render_template('user/new_request.html', categories=_get_categories())
     
     # Handle form submission
     if request.method == 'POST':
@@ -90,14 +95,13 @@ def new_request():
         # Validate form data
         if not title or not category or not description:
             flash('Please fill out all required fields', 'danger')
-            # Get categories again for form
-            from models.database import get_db_connection
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT name FROM categories ORDER BY name')
-            categories = [row['name'] for row in cursor.fetchall()]
-            conn.close()
-            return render_template('user/new_request.html', categories=categories)
+            return render_template('user/new_request.html', categories=_get_categories())
+        
+        # Enforce the per-user limit from the settings table
+        max_active = site_settings.max_active_requests
+        if max_active > 0 and ServiceRequest.count_active_by_user(user_id) >= max_active:
+            flash(f'You can have at most {max_active} active requests. Please wait for one to finish or cancel it.', 'warning')
+            return render_template('user/new_request.html', categories=_get_categories())
         
         try:
             # Create service request in database
@@ -114,14 +118,7 @@ def new_request():
             
         except Exception as e:
             flash(f'Error creating service request: {str(e)}', 'danger')
-            # Get categories again for form
-            from models.database import get_db_connection
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT name FROM categories ORDER BY name')
-            categories = [row['name'] for row in cursor.fetchall()]
-            conn.close()
-            return render_template('user/new_request.html', categories=categories)
+            return render_template('user/new_request.html', categories=_get_categories())
 
 @user_bp.route('/request/<int:request_id>')
 @login_required
@@ -168,21 +165,17 @@ def view_request(request_id):
 @login_required
 @limiter.exempt
 def profile():
-    # Debugging: Log the session state
-    current_app.logger.info(f"Session state: {session}")
-
     user_id = session.get('user', {}).get('id')
     if not user_id:
         flash('You must be logged in to view your profile.', 'danger')
         return redirect(url_for('auth.login'))
 
-    # Fetch user data from the database
-    user = User.get_by_id(user_id)
-    if not user:
-        flash('User not found.', 'danger')
-        return redirect(url_for('auth.login'))
+    user = current_principal.user
 
     if request.method == 'POST':
+        # Edit a copy; the cached principal is shared with other requests
+        user = copy.copy(user)
+
         # Validate required fields
         name = request.form.get('name')
         if not name:
@@ -195,15 +188,31 @@ def profile():
         user.address = request.form.get('address')
         
         # Handle profile picture upload
-        if 'profile_picture' in request.files:
-            profile_picture_file = request.files['profile_picture']
-            if profile_picture_file.filename:
-                file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], profile_picture_file.filename)
-                profile_picture_file.save(file_path)
-                user.profile_picture = file_path
+        new_picture = False
+        replaced_picture = None
+        profile_picture_file = request.files.get('profile_picture')
+        if profile_picture_file and profile_picture_file.filename:
+            try:
+                upload = upload_store.save(profile_picture_file, IMAGE_EXTENSIONS)
+            except UploadRejected as e:
+                flash(str(e), 'danger')
+                return redirect(url_for('user.profile'))
+            replaced_picture = user.profile_picture
+            user.profile_picture = upload.path
+            new_picture = True
 
         user.location = request.form.get('location')
         user.update()
+        if new_picture:
+            # The old thumbnail goes with the old picture; a new one is made in the background
+            replaced_thumbnail = User.clear_profile_thumbnail(user.id)
+            if replaced_picture:
+                upload_store.release(replaced_picture)
+            if replaced_thumbnail:
+                upload_store.release(replaced_thumbnail)
+        invalidate_principal(user.id)
+        if new_picture:
+            thumbnail_generator.submit(user.id)
 
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('user.profile'))
@@ -327,6 +336,7 @@ def find_helpers():
 
 @user_bp.route('/helper/<int:helper_id>')
 @login_required
+@conditional_page(lambda helper_id: [f"helper:{helper_id}"])
 def view_helper(helper_id):
     # Get helper
     helper = Helper.get_by_id(helper_id)
@@ -360,7 +370,7 @@ def my_requests():
         service_requests = ServiceRequest.get_by_user_id(user_id)
         
         # Get user information
-        user = User.get_by_id(user_id)
+        user = current_principal.user
         
         return render_template('user/my_requests.html', 
                              service_requests=service_requests,
@@ -437,7 +447,7 @@ def settings():
     if request.method == 'POST':
         try:
             # Handle settings update
-            user = User.get_by_id(user_id)
+            user = current_principal.user
             if user:
                 # Update notification preferences
                 notifications_enabled = request.form.get('notifications_enabled') == 'on'
@@ -451,7 +461,7 @@ def settings():
             flash(f'Error updating settings: {str(e)}', 'danger')
     
     try:
-        user = User.get_by_id(user_id)
+        user = current_principal.user
         return render_template('user/settings.html', user=user)
         
     except Exception as e:
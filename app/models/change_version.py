@@ -0,0 +1,18 @@
+from .database import get_db_connection
+
+class ChangeVersion:
+    """Change counters per scope ('user:<id>', 'helper:<id>'), bumped by triggers"""
+
+    @staticmethod
+    def get_versions(scopes):
+        """{scope: version} for the given scopes; 0 for a scope never changed"""
+        scopes = list(scopes)
+        conn = get_db_connection()
+        rows = conn.execute(f'''
+            SELECT scope, version FROM change_versions
+            WHERE scope IN ({', '.join('?' * len(scopes))})
+        ''', scopes).fetchall()
+        conn.close()
+        versions = dict.fromkeys(scopes, 0)
+        versions.update((row['scope'], row['version']) for row in rows)
+        return versions
@@ -1,4 +1,5 @@
-from .database import get_db_connection
+from .database import get_db_connection, iter_rows
+from .user import User
 
 class Complaint:
     def __init__(self, id=None, user_id=None, helper_id=None, service_request_id=None,
@@ -129,6 +130,48 @@ class Complaint:
             ))
         return complaints
     
+    @staticmethod
+    def count():
+        """Number of complaints"""
+        conn = get_db_connection()
+        count = conn.execute('SELECT COUNT(*) FROM complaints').fetchone()[0]
+        conn.close()
+        return count
+
+    @staticmethod
+    def iter_page_with_people(limit, offset=0, batch_size=200):
+        """Yield a page of complaints, pending first, for the admin listing.
+
+        One joined query read batch_size rows at a time. Each complaint is
+        a dict of its columns plus 'title' (its request's title),
+        'date_submitted', 'user' and 'helper_user' (as 'helper' too).
+        """
+        query = f'''
+        SELECT c.*, r.title AS request_title,
+               {User.joined_columns('u', 'complainant_')}, {User.joined_columns('hu', 'helper_user_')}
+        FROM complaints c
+        LEFT JOIN service_requests r ON r.id = c.service_request_id
+        LEFT JOIN users u ON u.id = c.user_id
+        LEFT JOIN helpers h ON h.id = c.helper_id
+        LEFT JOIN users hu ON hu.id = h.user_id
+        ORDER BY c.status ASC, c.created_at DESC, c.id DESC
+        LIMIT ? OFFSET ?
+        '''
+        for complaint_data in iter_rows(query, (limit, offset), batch_size=batch_size):
+            helper_user = User.from_joined_row(complaint_data, 'helper_user_')
+            yield {
+                'id': complaint_data['id'],
+                'service_request_id': complaint_data['service_request_id'],
+                'title': complaint_data['request_title'],
+                'description': complaint_data['description'],
+                'status': complaint_data['status'],
+                'resolution': complaint_data['resolution'],
+                'date_submitted': complaint_data['created_at'],
+                'user': User.from_joined_row(complaint_data, 'complainant_'),
+                'helper': helper_user,
+                'helper_user': helper_user
+            }
+
     def resolve(self, resolution):
         """Resolve a complaint"""
         conn = get_db_connection()
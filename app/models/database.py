@@ -7,6 +7,9 @@ import time
 import logging
 import os
 from flask import current_app
+from ..utils.request_deadline import install_progress_handler
+from ..utils.metrics import TimedConnection, record_acquire
+from ..utils.query_profiler import query_profiler
 
 logger = logging.getLogger(__name__)
 
@@ -15,47 +18,65 @@ logger = logging.getLogger(__name__)
 # We want database in root, which is 2 levels up from app/models/
 DATABASE_PATH = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'community_helper.db'))
 
+def set_database_path(path):
+    """Point get_db_connection() and init_db() at the configured database"""
+    global DATABASE_PATH
+    DATABASE_PATH = os.path.abspath(path)
+
 def get_db_connection():
     """Create a connection to the SQLite database (Legacy support)"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
+        start = time.perf_counter()
+        conn = sqlite3.connect(DATABASE_PATH, factory=TimedConnection)
         conn.row_factory = sqlite3.Row
+        install_progress_handler(conn)
+        query_profiler.install(conn)
+        record_acquire(time.perf_counter() - start)
         return conn
     except sqlite3.Error as e:
         logger.error(f"Error connecting to database: {e}")
         raise
 
+def iter_rows(query, params=(), batch_size=200):
+    """Yield the rows of query batch_size at a time, on a connection of its own.
+
+    Only one batch is held in memory, so a caller rendering rows as they
+    come (a streamed page) stays flat as the table grows. The connection
+    is closed when the rows run out or the generator is closed early.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
 class DatabaseConnectionPool:
+    """Pool of up to max_connections connections, opened on first use.
+
+    Nothing is opened at construction so app startup (and every worker
+    restart) does not pay for max_connections connects and WAL pragmas.
+    """
+
     def __init__(self, db_path: str, max_connections: int = 10):
         self.db_path = db_path
         self.max_connections = max_connections
         self.connections = queue.Queue(maxsize=max_connections)
         self.lock = threading.Lock()
-        self._initialize_pool()
-        self._setup_logging()
-
-    def _initialize_pool(self):
-        """Initialize connection pool"""
-        for _ in range(self.max_connections):
-            conn = self._create_new_connection()
-            self.connections.put(conn)
-        logger.info(f"Initialized connection pool with {self.max_connections} connections")
-
-    def _setup_logging(self):
-        """Setup logging configuration"""
-        handler = logging.StreamHandler()
-        handler.setFormatter(logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        ))
-        logger.addHandler(handler)
-        logger.setLevel(logging.INFO)
+        self.created = 0
 
     @contextmanager
     def get_connection(self) -> Generator[sqlite3.Connection, None, None]:
         """Get a database connection from the pool with context management"""
         conn = None
         try:
+            start = time.perf_counter()
             conn = self._get_connection()
+            record_acquire(time.perf_counter() - start)
             yield conn
             conn.commit()  # Auto-commit if no exception occurred
         except Exception as e:
@@ -68,7 +89,18 @@ class DatabaseConnectionPool:
                 self._return_connection(conn)
 
     def _get_connection(self) -> sqlite3.Connection:
-        """Get a connection with timeout and retry"""
+        """Get an idle connection, open a new one if below max, else wait"""
+        try:
+            conn = self.connections.get_nowait()
+        except queue.Empty:
+            conn = self._open_if_below_max()
+        if conn is not None:
+            if not self._is_connection_valid(conn):
+                logger.warning("Found invalid connection, creating new one")
+                conn.close()
+                conn = self._create_new_connection()
+            return conn
+
         start_time = time.time()
         while True:
             try:
@@ -84,6 +116,18 @@ class DatabaseConnectionPool:
                     raise TimeoutError("Could not get database connection")
                 time.sleep(0.1)
 
+    def _open_if_below_max(self):
+        with self.lock:
+            if self.created >= self.max_connections:
+                return None
+            self.created += 1
+        try:
+            return self._create_new_connection()
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            raise
+
     def _return_connection(self, conn: sqlite3.Connection):
         """Return a connection to the pool"""
         try:
@@ -91,6 +135,8 @@ class DatabaseConnectionPool:
         except queue.Full:
             logger.warning("Connection pool full, closing extra connection")
             conn.close()
+            with self.lock:
+                self.created -= 1
 
     def _is_connection_valid(self, conn: sqlite3.Connection) -> bool:
         """Check if connection is still valid"""
@@ -102,8 +148,10 @@ class DatabaseConnectionPool:
 
     def _create_new_connection(self) -> sqlite3.Connection:
         """Create a new database connection"""
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, factory=TimedConnection)
         conn.row_factory = sqlite3.Row
+        install_progress_handler(conn)
+        query_profiler.install(conn)
         # Enable foreign keys
         conn.execute("PRAGMA foreign_keys = ON")
         # Set journal mode to WAL for better concurrency
@@ -117,6 +165,8 @@ class DatabaseConnectionPool:
             try:
                 conn = self.connections.get_nowait()
                 conn.close()
+                with self.lock:
+                    self.created -= 1
             except queue.Empty:
                 break
             except Exception as e:
@@ -126,19 +176,22 @@ class DatabaseConnectionPool:
 db_pool = None
 
 def init_db():
-    """Initialize the database with required tables"""
-    if os.path.exists(DATABASE_PATH):
-        logger.info(f"Database {DATABASE_PATH} already exists.")
-        return
+    """Create the schema on a new database, then apply pending migrations"""
+    from .migrations import migrate
 
+    exists = os.path.exists(DATABASE_PATH)
     conn = get_db_connection()
     try:
-        # Use absolute path for schema.sql
-        schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
-        with open(schema_path, 'r') as f:
-            conn.executescript(f.read())
-        conn.commit()
-        logger.info(f"Database {DATABASE_PATH} initialized successfully.")
+        if exists:
+            logger.info(f"Database {DATABASE_PATH} already exists.")
+        else:
+            # Use absolute path for schema.sql
+            schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
+            with open(schema_path, 'r') as f:
+                conn.executescript(f.read())
+            conn.commit()
+            logger.info(f"Database {DATABASE_PATH} initialized successfully.")
+        migrate(conn)
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
         raise
@@ -1,4 +1,5 @@
-from .database import get_db_connection
+from .database import get_db_connection, iter_rows
+from .user import User
 from .helper import Helper
 from datetime import datetime
 
@@ -131,6 +132,37 @@ class Feedback:
             )
         return None
     
+    @staticmethod
+    def iter_with_people(batch_size=200):
+        """Yield all feedback, newest first, with who left it and the helper's user.
+
+        One joined query read batch_size rows at a time; yields dicts with
+        'feedback', 'user', 'helper_user' and 'service_request_id'.
+        """
+        query = f'''
+        SELECT f.*, {User.joined_columns('u', 'reviewer_')}, {User.joined_columns('hu', 'helper_user_')}
+        FROM feedback f
+        LEFT JOIN users u ON u.id = f.user_id
+        LEFT JOIN helpers h ON h.id = f.helper_id
+        LEFT JOIN users hu ON hu.id = h.user_id
+        ORDER BY f.created_at DESC, f.id DESC
+        '''
+        for feedback_data in iter_rows(query, batch_size=batch_size):
+            yield {
+                'feedback': Feedback(
+                    id=feedback_data['id'],
+                    user_id=feedback_data['user_id'],
+                    helper_id=feedback_data['helper_id'],
+                    service_request_id=feedback_data['service_request_id'],
+                    rating=feedback_data['rating'],
+                    review=feedback_data['review'],
+                    created_at=feedback_data['created_at']
+                ),
+                'user': User.from_joined_row(feedback_data, 'reviewer_'),
+                'helper_user': User.from_joined_row(feedback_data, 'helper_user_'),
+                'service_request_id': feedback_data['service_request_id']
+            }
+
     def to_dict(self):
         """Convert feedback object to dictionary"""
         return {
@@ -0,0 +1,26 @@
+import time
+from .database import get_db_connection
+
+class JobClaim:
+    """Leases on background jobs, so only one process runs each.
+
+    Every prefork worker resumes unfinished work at startup; claiming an
+    item first means one of them does it. A claim lapses after its lease,
+    so work whose claimant died is picked up again at a later startup.
+    """
+
+    @staticmethod
+    def claim(job, item_id, lease=600):
+        """Claim job for item_id; False if another process holds a live claim"""
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute('''
+                INSERT INTO job_claims (job, item_id, claimed_at) VALUES (?, ?, ?)
+                ON CONFLICT (job, item_id) DO UPDATE SET claimed_at = excluded.claimed_at
+                WHERE job_claims.claimed_at < ?
+            ''', (job, item_id, now, now - lease))
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
@@ -0,0 +1,142 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _bump(select):
+    """Trigger statement adding one to the change counter of each scope select returns"""
+    return (f"INSERT INTO change_versions (scope) {select} "
+            f"ON CONFLICT (scope) DO UPDATE SET version = version + 1;")
+
+def _trigger(table, event, *statements):
+    return (f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_change_versions "
+            f"AFTER {event} ON {table} BEGIN {' '.join(statements)} END")
+
+# Schema changes applied on top of schema.sql, in order. A database's
+# PRAGMA user_version is the number of migrations it has had; append new
+# entries, never edit applied ones.
+MIGRATIONS = [
+    # 1: content-addressed uploads, and verification documents as rows
+    # instead of the comma-separated verifications.document_path
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS uploads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sha256 TEXT NOT NULL UNIQUE,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS verification_documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            verification_id INTEGER NOT NULL,
+            upload_id INTEGER NOT NULL,
+            document_type TEXT NOT NULL,
+            original_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (verification_id) REFERENCES verifications(id) ON DELETE CASCADE,
+            FOREIGN KEY (upload_id) REFERENCES uploads(id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_uploads_path ON uploads (path)',
+        'CREATE INDEX IF NOT EXISTS idx_verification_documents_verification '
+        'ON verification_documents (verification_id)',
+    ],
+    # 2: MIME types sniffed from upload content, and the outcome of
+    # validating a verification request's documents
+    [
+        'ALTER TABLE uploads ADD COLUMN mime_type TEXT',
+        'ALTER TABLE verifications ADD COLUMN validation_status TEXT',
+        'ALTER TABLE verifications ADD COLUMN validation_notes TEXT',
+    ],
+    # 3: fixed-size thumbnails of profile pictures
+    [
+        'ALTER TABLE users ADD COLUMN profile_thumbnail TEXT',
+    ],
+    # 4: change counters behind conditional GETs (see utils/conditional.py).
+    # 'user:<id>' covers a user's row and requests; 'helper:<id>' a helper's
+    # rows, its feedback and the names of the users who left it.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS change_versions (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 1
+        )
+        ''',
+        _trigger('users', 'UPDATE', _bump("SELECT 'user:' || NEW.id WHERE true"),
+                 _bump("SELECT 'helper:' || id FROM helpers WHERE user_id = NEW.id"),
+                 _bump("SELECT DISTINCT 'helper:' || helper_id FROM feedback WHERE user_id = NEW.id")),
+        _trigger('users', 'DELETE', _bump("SELECT 'user:' || OLD.id WHERE true"),
+                 _bump("SELECT 'helper:' || id FROM helpers WHERE user_id = OLD.id")),
+        _trigger('helpers', 'INSERT', _bump("SELECT 'helper:' || NEW.id WHERE true")),
+        _trigger('helpers', 'UPDATE', _bump("SELECT 'helper:' || NEW.id WHERE true")),
+        _trigger('helpers', 'DELETE', _bump("SELECT 'helper:' || OLD.id WHERE true")),
+        _trigger('feedback', 'INSERT', _bump("SELECT 'helper:' || NEW.helper_id WHERE true")),
+        _trigger('feedback', 'UPDATE', _bump("SELECT 'helper:' || OLD.helper_id WHERE true"),
+                 _bump("SELECT 'helper:' || NEW.helper_id WHERE NEW.helper_id IS NOT OLD.helper_id")),
+        _trigger('feedback', 'DELETE', _bump("SELECT 'helper:' || OLD.helper_id WHERE true")),
+        _trigger('service_requests', 'INSERT', _bump("SELECT 'user:' || NEW.user_id WHERE true")),
+        _trigger('service_requests', 'UPDATE', _bump("SELECT 'user:' || OLD.user_id WHERE true"),
+                 _bump("SELECT 'user:' || NEW.user_id WHERE NEW.user_id IS NOT OLD.user_id")),
+        _trigger('service_requests', 'DELETE', _bump("SELECT 'user:' || OLD.user_id WHERE true")),
+    ],
+    # 5: indexes in the order the admin listings stream rows, so their
+    # first rows come without sorting the whole table
+    [
+        'CREATE INDEX IF NOT EXISTS idx_service_requests_created ON service_requests (created_at, id)',
+        'CREATE INDEX IF NOT EXISTS idx_complaints_status_created '
+        'ON complaints (status, created_at DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_feedback_created ON feedback (created_at, id)',
+    ],
+    # 6: leases on background jobs resumed at startup (see models/job_claim.py)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS job_claims (
+            job TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            claimed_at REAL NOT NULL,
+            PRIMARY KEY (job, item_id)
+        )
+        ''',
+    ],
+    # 7: the extension each verification document was uploaded with and the
+    # type sniffed from it, kept per document since uploads are shared by content
+    [
+        'ALTER TABLE verification_documents ADD COLUMN extension TEXT',
+        'ALTER TABLE verification_documents ADD COLUMN mime_type TEXT',
+    ],
+    # 8: lookups deciding whether a stored upload is a public avatar
+    [
+        'CREATE INDEX IF NOT EXISTS idx_users_profile_picture ON users (profile_picture)',
+        'CREATE INDEX IF NOT EXISTS idx_users_profile_thumbnail ON users (profile_thumbnail)',
+        'CREATE INDEX IF NOT EXISTS idx_verification_documents_upload ON verification_documents (upload_id)',
+    ],
+]
+
+def migrate(conn):
+    """Apply the migrations conn's database has not had yet.
+
+    Each migration runs in its own write transaction and re-reads
+    user_version once it holds the lock, so processes starting together
+    apply every migration exactly once.
+    """
+    for version, statements in enumerate(MIGRATIONS, start=1):
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Applied database migration {version}")
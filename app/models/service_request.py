@@ -1,4 +1,5 @@
-from .database import get_db_connection
+from .database import get_db_connection, iter_rows
+from .user import User
 from datetime import datetime
 
 class ServiceRequest:
@@ -154,7 +155,70 @@ class ServiceRequest:
                 updated_at=request_data['updated_at']
             ))
         return requests
-    
+
+    @staticmethod
+    def iter_with_people(batch_size=200):
+        """Yield every request, newest first, with the user who made it and its helper's user.
+
+        One joined query read batch_size rows at a time; yields dicts with
+        'request', 'user' and 'helper_user' (None when unassigned).
+        """
+        query = f'''
+        SELECT r.*, {User.joined_columns('u', 'requester_')}, {User.joined_columns('hu', 'helper_user_')}
+        FROM service_requests r
+        LEFT JOIN users u ON u.id = r.user_id
+        LEFT JOIN helpers h ON h.id = r.helper_id
+        LEFT JOIN users hu ON hu.id = h.user_id
+        ORDER BY r.created_at DESC, r.id DESC
+        '''
+        for request_data in iter_rows(query, batch_size=batch_size):
+            yield {
+                'request': ServiceRequest(
+                    id=request_data['id'],
+                    user_id=request_data['user_id'],
+                    helper_id=request_data['helper_id'],
+                    category=request_data['category'],
+                    title=request_data['title'],
+                    description=request_data['description'],
+                    deadline=request_data['deadline'],
+                    status=request_data['status'],
+                    created_at=request_data['created_at'],
+                    updated_at=request_data['updated_at']
+                ),
+                'user': User.from_joined_row(request_data, 'requester_'),
+                'helper_user': User.from_joined_row(request_data, 'helper_user_')
+            }
+
+    @staticmethod
+    def count_active_by_user(user_id):
+        """Count a user's requests that are not yet completed or cancelled"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        SELECT COUNT(*) as count FROM service_requests
+        WHERE user_id = ? AND status IN ('open', 'assigned', 'in_progress')
+        ''', (user_id,))
+        result = cursor.fetchone()
+        conn.close()
+
+        return result['count'] if result else 0
+
+    @staticmethod
+    def count_active_by_helper(helper_id):
+        """Count the jobs a helper has accepted but not yet completed"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        SELECT COUNT(*) as count FROM service_requests
+        WHERE helper_id = ? AND status IN ('assigned', 'in_progress')
+        ''', (helper_id,))
+        result = cursor.fetchone()
+        conn.close()
+
+        return result['count'] if result else 0
+
     def assign_helper(self, helper_id):
         """Assign a helper to this service request"""
         conn = get_db_connection()
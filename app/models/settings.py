@@ -0,0 +1,159 @@
+import sqlite3
+import threading
+import time
+import logging
+from .database import DATABASE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Type of every known key in the settings table. Values are stored as TEXT,
+# so they are coerced once when the table is loaded instead of on every read.
+SETTING_TYPES = {
+    'site_name': str,
+    'site_description': str,
+    'contact_email': str,
+    'contact_phone': str,
+    'verification_required': bool,
+    'max_active_requests': int,
+    'max_active_jobs': int,
+}
+
+# Used when a key is missing from the table or holds an unparsable value
+DEFAULT_SETTINGS = {
+    'site_name': 'Community Helper',
+    'site_description': 'Connect with helpers in your community',
+    'contact_email': 'contact@communityhelper.com',
+    'contact_phone': '+1-555-123-4567',
+    'verification_required': True,
+    'max_active_requests': 5,
+    'max_active_jobs': 3,
+}
+
+def _coerce(key, raw):
+    """Convert a TEXT value from the settings table to its declared type"""
+    value_type = SETTING_TYPES.get(key, str)
+    if value_type is bool:
+        return str(raw).strip().lower() in ('1', 'true', 'yes', 'on')
+    return value_type(raw)
+
+class SettingsService:
+    """In-memory copy of the settings table.
+
+    All keys are loaded once at startup. Writes made by other connections or
+    processes are picked up through ``PRAGMA data_version``, which is only
+    checked once per ``refresh_interval`` seconds, so reading a setting on the
+    request path normally costs no database access at all.
+    """
+
+    def __init__(self, db_path=None, refresh_interval=5.0):
+        self.db_path = db_path or DATABASE_PATH
+        self.refresh_interval = refresh_interval
+        self._values = dict(DEFAULT_SETTINGS)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._next_check = 0.0
+
+    def init_app(self, app):
+        """Bind the service to the application's database and load all keys"""
+        self.db_path = app.config.get('DATABASE_PATH', self.db_path)
+        self.refresh_interval = app.config.get('SETTINGS_REFRESH_INTERVAL', self.refresh_interval)
+        with self._lock:
+            self._close()
+            self._reload()
+        app.extensions['settings'] = self
+
+    def _connection(self) -> sqlite3.Connection:
+        """Dedicated connection; data_version is only meaningful per connection"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _reload(self):
+        """Load every row of the settings table (caller holds the lock)"""
+        conn = self._connection()
+        values = dict(DEFAULT_SETTINGS)
+        try:
+            for row in conn.execute('SELECT key, value FROM settings'):
+                try:
+                    values[row['key']] = _coerce(row['key'], row['value'])
+                except (TypeError, ValueError):
+                    logger.warning(f"Ignoring invalid value {row['value']!r} for setting {row['key']}")
+            self._data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Error loading settings: {str(e)}")
+            # Keep serving the last good values and retry after the interval
+            # rather than hitting the database on every request
+            self._next_check = time.monotonic() + self.refresh_interval
+            return
+        self._values = values
+        self._next_check = time.monotonic() + self.refresh_interval
+
+    def _maybe_refresh(self):
+        """Reload the cache if another connection has written to the database"""
+        if time.monotonic() < self._next_check:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            try:
+                version = self._connection().execute('PRAGMA data_version').fetchone()[0]
+            except sqlite3.Error as e:
+                logger.error(f"Error checking settings version: {str(e)}")
+                self._next_check = time.monotonic() + self.refresh_interval
+                return
+            if version != self._data_version:
+                self._reload()
+            else:
+                self._next_check = time.monotonic() + self.refresh_interval
+
+    def get(self, key, default=None):
+        """Get a typed setting value"""
+        self._maybe_refresh()
+        return self._values.get(key, default)
+
+    def all(self):
+        """Get a copy of all settings"""
+        self._maybe_refresh()
+        return dict(self._values)
+
+    def set(self, key, value):
+        """Persist a setting and update the cache immediately"""
+        if key in SETTING_TYPES:
+            value = _coerce(key, value)
+        raw = ('true' if value else 'false') if isinstance(value, bool) else str(value)
+        with self._lock:
+            conn = self._connection()
+            conn.execute('''
+            INSERT INTO settings (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+            ''', (key, raw))
+            conn.commit()
+            values = dict(self._values)
+            values[key] = value
+            self._values = values
+        return True
+
+    @property
+    def max_active_requests(self):
+        """Maximum number of active requests a user can have (0 disables the limit)"""
+        return self.get('max_active_requests')
+
+    @property
+    def max_active_jobs(self):
+        """Maximum number of active jobs a helper can have (0 disables the limit)"""
+        return self.get('max_active_jobs')
+
+    @property
+    def verification_required(self):
+        """Whether helpers need verification before accepting requests"""
+        return self.get('verification_required')
+
+# Global settings instance, bound to the app in create_app
+settings = SettingsService()
@@ -0,0 +1,107 @@
+from .database import get_db_connection
+
+class Upload:
+    """One stored file, shared by every record that references its content"""
+
+    def __init__(self, id=None, sha256=None, path=None, size=None, ref_count=None, created_at=None,
+                 mime_type=None, extension=None):
+        self.id = id
+        self.sha256 = sha256
+        self.path = path
+        self.size = size
+        self.ref_count = ref_count
+        self.created_at = created_at
+        self.mime_type = mime_type  # sniffed from the content when first served
+        # Extension of the name this reference was uploaded under; the same content
+        # may arrive under other names, so it is kept by the referencing record
+        self.extension = extension
+
+    @staticmethod
+    def _from_row(row):
+        return Upload(
+            id=row['id'],
+            sha256=row['sha256'],
+            path=row['path'],
+            size=row['size'],
+            ref_count=row['ref_count'],
+            created_at=row['created_at'],
+            mime_type=row['mime_type']
+        )
+
+    @staticmethod
+    def reference(sha256, path, size, place_file):
+        """Count one more reference to the content with this hash.
+
+        place_file(path) is called with the stored path while the write lock
+        is held, so it cannot race with release() removing the same file.
+        """
+        conn = get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT OR IGNORE INTO uploads (sha256, path, size) VALUES (?, ?, ?)',
+                         (sha256, path, size))
+            conn.execute('UPDATE uploads SET ref_count = ref_count + 1 WHERE sha256 = ?', (sha256,))
+            row = conn.execute('SELECT * FROM uploads WHERE sha256 = ?', (sha256,)).fetchone()
+            place_file(row['path'])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return Upload._from_row(row)
+
+    @staticmethod
+    def release(upload_id, remove_file):
+        """Drop one reference; remove_file(path) is called once none are left.
+
+        The file is removed only after the row is gone for good, in a second
+        write transaction that checks nothing has stored the path again
+        meanwhile. A crash in between leaves an unreferenced file, which the
+        next upload of the same content reuses.
+        """
+        conn = get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('UPDATE uploads SET ref_count = ref_count - 1 WHERE id = ? AND ref_count > 0',
+                         (upload_id,))
+            row = conn.execute('SELECT * FROM uploads WHERE id = ?', (upload_id,)).fetchone()
+            unreferenced = row is not None and row['ref_count'] == 0
+            if unreferenced:
+                conn.execute('DELETE FROM uploads WHERE id = ?', (upload_id,))
+            conn.commit()
+
+            if unreferenced:
+                conn.execute('BEGIN IMMEDIATE')
+                if conn.execute('SELECT 1 FROM uploads WHERE path = ?', (row['path'],)).fetchone() is None:
+                    remove_file(row['path'])
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_by_id(upload_id):
+        """Get upload by ID"""
+        conn = get_db_connection()
+        row = conn.execute('SELECT * FROM uploads WHERE id = ?', (upload_id,)).fetchone()
+        conn.close()
+        return Upload._from_row(row) if row else None
+
+    @staticmethod
+    def get_by_path(path):
+        """Get upload by its path under UPLOAD_FOLDER"""
+        conn = get_db_connection()
+        row = conn.execute('SELECT * FROM uploads WHERE path = ?', (path,)).fetchone()
+        conn.close()
+        return Upload._from_row(row) if row else None
+
+    @staticmethod
+    def set_mime_type(upload_id, mime_type):
+        """Record the MIME type sniffed from the content"""
+        conn = get_db_connection()
+        conn.execute('UPDATE uploads SET mime_type = ? WHERE id = ?', (mime_type, upload_id))
+        conn.commit()
+        conn.close()
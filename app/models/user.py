@@ -1,11 +1,11 @@
 import sqlite3
-from .database import get_db_connection
-from werkzeug.security import generate_password_hash, check_password_hash
+from .database import get_db_connection, iter_rows
+from ..utils.passwords import password_hasher
 
 class User:
     def __init__(self, id=None, email=None, name=None, phone=None, 
                  address=None, profile_picture=None, user_type=None, password_hash=None,
-                 created_at=None, updated_at=None, location=None):
+                 created_at=None, updated_at=None, location=None, profile_thumbnail=None):
         self.id = id
         self.email = email
         self.name = name
@@ -17,6 +17,7 @@ class User:
         self.created_at = created_at
         self.updated_at = updated_at
         self.location = location
+        self.profile_thumbnail = profile_thumbnail  # set by the thumbnail worker
     
     @staticmethod
     def create(email, name, password, user_type, phone=None, address=None, profile_picture=None, location=None):
@@ -39,7 +40,7 @@ class User:
                 raise ValueError('Email address already registered')
                 
             # Hash the password
-            password_hash = generate_password_hash(password)
+            password_hash = password_hasher.hash(password)
             
             # Insert new user
             cursor.execute('''
@@ -84,7 +85,8 @@ class User:
                 user_type=user_data['user_type'],
                 created_at=user_data['created_at'],
                 updated_at=user_data['updated_at'],
-                location=user_data['location']
+                location=user_data['location'],
+                profile_thumbnail=user_data['profile_thumbnail']
             )
         return None
     
@@ -110,10 +112,44 @@ class User:
                 user_type=user_data['user_type'],
                 created_at=user_data['created_at'],
                 updated_at=user_data['updated_at'],
-                location=user_data['location']
+                location=user_data['location'],
+                profile_thumbnail=user_data['profile_thumbnail']
             ))
         return users
     
+    @staticmethod
+    def iter_all(batch_size=200):
+        """Yield every user, reading batch_size rows at a time"""
+        for user_data in iter_rows('SELECT * FROM users ORDER BY id', batch_size=batch_size):
+            yield User(
+                id=user_data['id'],
+                email=user_data['email'],
+                name=user_data['name'],
+                phone=user_data['phone'],
+                address=user_data['address'],
+                profile_picture=user_data['profile_picture'],
+                user_type=user_data['user_type'],
+                created_at=user_data['created_at'],
+                updated_at=user_data['updated_at'],
+                location=user_data['location'],
+                profile_thumbnail=user_data['profile_thumbnail']
+            )
+
+    # Columns of a joined users table that listings show, see joined_columns
+    LISTING_COLUMNS = ('id', 'email', 'name', 'user_type', 'profile_picture', 'profile_thumbnail')
+
+    @staticmethod
+    def joined_columns(alias, prefix):
+        """Select list for the users table joined as alias, each column named prefix + column"""
+        return ', '.join(f"{alias}.{column} AS {prefix}{column}" for column in User.LISTING_COLUMNS)
+
+    @staticmethod
+    def from_joined_row(row, prefix):
+        """The user selected with joined_columns(..., prefix), or None if the join found none"""
+        if row[f"{prefix}id"] is None:
+            return None
+        return User(**{column: row[f"{prefix}{column}"] for column in User.LISTING_COLUMNS})
+
     @staticmethod
     def get_by_email(email):
         """Get user by email"""
@@ -136,7 +172,8 @@ class User:
                 password_hash=user_data['password_hash'],
                 created_at=user_data['created_at'],
                 updated_at=user_data['updated_at'],
-                location=user_data['location']
+                location=user_data['location'],
+                profile_thumbnail=user_data['profile_thumbnail']
             )
         return None
     
@@ -156,9 +193,93 @@ class User:
         
         return True
     
+    @staticmethod
+    def set_profile_thumbnail(user_id, source, thumbnail):
+        """Record the thumbnail generated from the profile picture source.
+
+        Nothing changes if the picture has been replaced since, or already
+        has this thumbnail. Returns the thumbnail path the caller no longer
+        holds a reference for (the superseded or the unused one), or None.
+        """
+        conn = get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT profile_picture, profile_thumbnail FROM users WHERE id = ?',
+                               (user_id,)).fetchone()
+            if row is None or row['profile_picture'] != source or row['profile_thumbnail'] == thumbnail:
+                conn.rollback()
+                return thumbnail
+            conn.execute('UPDATE users SET profile_thumbnail = ? WHERE id = ?', (thumbnail, user_id))
+            conn.commit()
+            return row['profile_thumbnail']
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def clear_profile_thumbnail(user_id):
+        """Forget the thumbnail of a replaced picture; returns its path"""
+        conn = get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT profile_thumbnail FROM users WHERE id = ?', (user_id,)).fetchone()
+            conn.execute('UPDATE users SET profile_thumbnail = NULL WHERE id = ?', (user_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return row['profile_thumbnail'] if row else None
+
+    @staticmethod
+    def is_avatar(path):
+        """Whether some user's profile picture or thumbnail is stored at path"""
+        conn = get_db_connection()
+        row = conn.execute('''
+            SELECT 1 FROM users WHERE profile_picture = ?
+            UNION ALL SELECT 1 FROM users WHERE profile_thumbnail = ?
+            LIMIT 1
+        ''', (path, path)).fetchone()
+        conn.close()
+        return row is not None
+
+    @staticmethod
+    def get_missing_thumbnails():
+        """IDs of users with a profile picture but no thumbnail yet"""
+        conn = get_db_connection()
+        rows = conn.execute('''
+            SELECT id FROM users
+            WHERE profile_picture IS NOT NULL AND profile_picture != '' AND profile_thumbnail IS NULL
+        ''').fetchall()
+        conn.close()
+        return [row['id'] for row in rows]
+
     def verify_password(self, password):
         """Verify the user's password"""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """Re-hash a verified password if the hashing parameters have changed"""
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+
+        password_hash = password_hasher.hash(password)
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        UPDATE users SET password_hash = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', (password_hash, self.id))
+
+        conn.commit()
+        conn.close()
+
+        self.password_hash = password_hash
+        return True
     
     def to_dict(self):
         """Convert user object to dictionary"""
@@ -169,6 +290,7 @@ class User:
             'phone': self.phone,
             'address': self.address,
             'profile_picture': self.profile_picture,
+            'profile_thumbnail': self.profile_thumbnail,
             'user_type': self.user_type,
             'created_at': self.created_at,
             'updated_at': self.updated_at,
@@ -3,7 +3,8 @@ import datetime
 
 class Verification:
     def __init__(self, id=None, helper_id=None, document_type=None, document_path=None, 
-                 status=None, admin_id=None, admin_notes=None, created_at=None, updated_at=None):
+                 status=None, admin_id=None, admin_notes=None, created_at=None, updated_at=None,
+                 validation_status=None, validation_notes=None):
         self.id = id
         self.helper_id = helper_id
         self.document_type = document_type
@@ -13,6 +14,10 @@ class Verification:
         self.admin_notes = admin_notes
         self.created_at = created_at
         self.updated_at = updated_at
+        # Set by the upload validator: 'pending', 'validated' or 'rejected'
+        # (None for requests made before documents were validated)
+        self.validation_status = validation_status
+        self.validation_notes = validation_notes
     
     @staticmethod
     def create(helper_id, document_type, document_path):
@@ -33,6 +38,79 @@ class Verification:
         
         return verification_id
     
+    @staticmethod
+    def create_with_documents(helper_id, documents):
+        """Create a verification request with its documents.
+
+        documents is a list of (document_type, upload_id, original_name, extension).
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        try:
+            cursor.execute('''
+            INSERT INTO verifications (helper_id, document_type, document_path, status, created_at, updated_at,
+                                       validation_status)
+            VALUES (?, ?, '', ?, ?, ?, 'pending')
+            ''', (helper_id, ','.join(doc[0] for doc in documents), 'Pending', now, now))
+            verification_id = cursor.lastrowid
+            cursor.executemany('''
+            INSERT INTO verification_documents (verification_id, upload_id, document_type, original_name,
+                                                extension)
+            VALUES (?, ?, ?, ?, ?)
+            ''', [(verification_id, upload_id, document_type, original_name, extension)
+                  for document_type, upload_id, original_name, extension in documents])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        return verification_id
+    
+    def get_documents(self):
+        """Documents of this request as VerificationDocuments, in upload order.
+
+        Requests made before documents were stored as rows only have the
+        comma-separated document_path; those come back with upload_id None.
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT d.*, u.path FROM verification_documents d JOIN uploads u ON u.id = d.upload_id
+        WHERE d.verification_id = ? ORDER BY d.id
+        ''', (self.id,))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        if rows:
+            return [VerificationDocument(
+                id=row['id'],
+                verification_id=row['verification_id'],
+                upload_id=row['upload_id'],
+                document_type=row['document_type'],
+                original_name=row['original_name'],
+                path=row['path'],
+                extension=row['extension'],
+                mime_type=row['mime_type']
+            ) for row in rows]
+        
+        document_types = (self.document_type or '').split(',')
+        documents = []
+        for index, path in enumerate((self.document_path or '').split(',')):
+            if path:
+                # The oldest rows hold bare file names under uploads/verifications
+                documents.append(VerificationDocument(
+                    verification_id=self.id,
+                    document_type=document_types[index] if index < len(document_types) else 'Document',
+                    original_name=path.rsplit('/', 1)[-1],
+                    path=path if '/' in path else f'verifications/{path}'
+                ))
+        return documents
+    
     @staticmethod
     def get_by_id(verification_id):
         """Get verification by ID"""
@@ -53,7 +131,9 @@ class Verification:
                 admin_id=verification_data['admin_id'],
                 admin_notes=verification_data['admin_notes'],
                 created_at=verification_data['created_at'],
-                updated_at=verification_data['updated_at']
+                updated_at=verification_data['updated_at'],
+                validation_status=verification_data['validation_status'],
+                validation_notes=verification_data['validation_notes']
             )
         return None
     
@@ -77,7 +157,9 @@ class Verification:
                 admin_id=verification_data['admin_id'],
                 admin_notes=verification_data['admin_notes'],
                 created_at=verification_data['created_at'],
-                updated_at=verification_data['updated_at']
+                updated_at=verification_data['updated_at'],
+                validation_status=verification_data['validation_status'],
+                validation_notes=verification_data['validation_notes']
             )
         return None
     
@@ -106,7 +188,9 @@ class Verification:
                 admin_id=verification_data['admin_id'],
                 admin_notes=verification_data['admin_notes'],
                 created_at=verification_data['created_at'],
-                updated_at=verification_data['updated_at']
+                updated_at=verification_data['updated_at'],
+                validation_status=verification_data['validation_status'],
+                validation_notes=verification_data['validation_notes']
             ))
         return verifications
     
@@ -159,7 +243,9 @@ class Verification:
                 admin_id=verification_data['admin_id'],
                 admin_notes=verification_data['admin_notes'],
                 created_at=verification_data['created_at'],
-                updated_at=verification_data['updated_at']
+                updated_at=verification_data['updated_at'],
+                validation_status=verification_data['validation_status'],
+                validation_notes=verification_data['validation_notes']
             ))
         
         return verifications, total
@@ -183,6 +269,60 @@ class Verification:
         
         return True
     
+    @staticmethod
+    def set_validation(verification_id, validation_status, notes=None):
+        """Record the outcome of validating the request's documents"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        UPDATE verifications SET validation_status = ?, validation_notes = ? WHERE id = ?
+        ''', (validation_status, notes, verification_id))
+        
+        conn.commit()
+        conn.close()
+    
+    @staticmethod
+    def set_document_mime_type(document_id, mime_type):
+        """Record the MIME type sniffed from a document's content"""
+        conn = get_db_connection()
+        conn.execute('UPDATE verification_documents SET mime_type = ? WHERE id = ?', (mime_type, document_id))
+        conn.commit()
+        conn.close()
+    
+    @staticmethod
+    def get_document_owners(path):
+        """User IDs of the helpers with a verification document stored at path.
+
+        An empty list means path is not a verification document.
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT DISTINCT h.user_id FROM verification_documents d
+        JOIN uploads u ON u.id = d.upload_id
+        JOIN verifications v ON v.id = d.verification_id
+        JOIN helpers h ON h.id = v.helper_id
+        WHERE u.path = ?
+        ''', (path,))
+        user_ids = [row['user_id'] for row in cursor.fetchall()]
+        conn.close()
+        
+        return user_ids
+    
+    @staticmethod
+    def get_pending_validation():
+        """IDs of requests whose documents have not been validated yet"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT id FROM verifications WHERE validation_status = 'pending' ORDER BY id")
+        ids = [row['id'] for row in cursor.fetchall()]
+        conn.close()
+        
+        return ids
+    
     @staticmethod
     def count_by_status(status):
         """Count verifications by status"""
@@ -193,4 +333,18 @@ class Verification:
         result = cursor.fetchone()
         conn.close()
         
-        return result['count'] if result else 0
\ No newline at end of file
+        return result['count'] if result else 0
+
+class VerificationDocument:
+    """One file submitted with a verification request"""
+
+    def __init__(self, id=None, verification_id=None, upload_id=None, document_type=None,
+                 original_name=None, path=None, extension=None, mime_type=None):
+        self.id = id
+        self.verification_id = verification_id
+        self.upload_id = upload_id
+        self.document_type = document_type
+        self.original_name = original_name
+        self.path = path  # relative to UPLOAD_FOLDER
+        self.extension = extension  # as uploaded; None for requests older than migration 7
+        self.mime_type = mime_type  # sniffed from the content, once validated
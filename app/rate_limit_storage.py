@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from limits.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# RETURNING lets the upsert hand back the new count in a single statement
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+class SQLiteStorage(Storage):
+    """Rate limit counters shared by every worker process on one host.
+
+    Registered for ``sqlite://`` URIs, e.g. ``sqlite:////var/lib/app/ratelimit.db``.
+    Counters live in a WAL-mode SQLite table so all processes enforce one
+    quota, and expired windows are swept periodically so the table only holds
+    currently active keys. Supports the fixed-window strategy (the
+    Flask-Limiter default).
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, sweep_interval=60, busy_timeout=5000, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # Same convention as SQLAlchemy: sqlite:///relative.db, sqlite:////absolute.db
+        path = (uri or 'sqlite:///ratelimit.db').split('://', 1)[1]
+        if path.startswith('/'):
+            path = path[1:]
+        self.path = os.path.abspath(path or 'ratelimit.db')
+        self.sweep_interval = float(sweep_interval)
+        self.busy_timeout = int(busy_timeout)
+        self._local = threading.local()
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = 0.0
+        self._create_table()
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        """One autocommit connection per thread, reopened after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute(f'PRAGMA busy_timeout = {self.busy_timeout}')
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_table(self):
+        self._connection().execute('''
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            count INTEGER NOT NULL,
+            expiry REAL NOT NULL
+        ) WITHOUT ROWID
+        ''')
+
+    def _maybe_sweep(self, now):
+        """Delete expired windows, at most once per sweep_interval per process"""
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + self.sweep_interval
+            deleted = self._connection().execute('DELETE FROM rate_limits WHERE expiry <= ?', (now,)).rowcount
+            if deleted:
+                logger.debug(f"Swept {deleted} expired rate limit keys")
+        finally:
+            self._sweep_lock.release()
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        """Increment the counter for key, starting a new window if it expired"""
+        now = time.time()
+        self._maybe_sweep(now)
+        conn = self._connection()
+        params = (key, amount, now + expiry, now, now)
+        upsert = '''
+        INSERT INTO rate_limits (key, count, expiry) VALUES (?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET
+            count = CASE WHEN expiry <= ? THEN excluded.count ELSE count + excluded.count END,
+            expiry = CASE WHEN expiry <= ? THEN excluded.expiry ELSE expiry END
+        '''
+        if _HAS_RETURNING:
+            # fetchall() steps the statement to completion so the write lock is released
+            return conn.execute(upsert + ' RETURNING count', params).fetchall()[0][0]
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(upsert, params)
+            count = conn.execute('SELECT count FROM rate_limits WHERE key = ?', (key,)).fetchone()[0]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return count
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT count FROM rate_limits WHERE key = ? AND expiry > ?', (key, time.time())).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expiry FROM rate_limits WHERE key = ? AND expiry > ?', (key, now)).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM rate_limits WHERE key = ?', (key,))
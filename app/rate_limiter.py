@@ -1,5 +1,6 @@
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from . import rate_limit_storage  # registers the sqlite:// storage scheme
 
 limiter = Limiter(
     key_func=get_remote_address,
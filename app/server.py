@@ -0,0 +1,213 @@
+import os
+import signal
+import socket
+import sys
+import time
+import logging
+from .utils.log_pipeline import configure_logging, log_pipeline
+
+logger = logging.getLogger(__name__)
+
+def _server_options(config):
+    return {
+        'threads': config.WEB_THREADS,
+        'connection_limit': config.WEB_CONNECTION_LIMIT,
+        'channel_timeout': config.WEB_CHANNEL_TIMEOUT,
+        'max_request_body_size': config.MAX_CONTENT_LENGTH,
+    }
+
+def _prepare(config):
+    """One-time setup done in the parent before any worker exists"""
+    from flask import Config
+    from .models.database import init_db, set_database_path
+
+    settings = Config('')
+    settings.from_object(config)
+    configure_logging(settings)
+    # Create the schema once here; workers racing to create it would see a
+    # half-initialised database
+    set_database_path(config.DATABASE_PATH)
+    init_db()
+
+def serve_app(app_factory, config, host='0.0.0.0', port=5000):
+    """Serve the app with waitress, prefork style when WEB_WORKERS > 1.
+
+    With several workers the parent binds the listening socket and forks
+    worker processes that share it. The app (and with it every connection
+    pool, thread pool and watchdog) is created in each worker after the fork.
+    On platforms without fork this falls back to a single process.
+    """
+    _prepare(config)
+
+    workers = config.WEB_WORKERS
+    if workers <= 1 or not hasattr(os, 'fork'):
+        from waitress import serve
+        serve(app_factory(config), host=host, port=port, **_server_options(config))
+        return
+
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(config.WEB_BACKLOG)
+    sock.setblocking(False)
+
+    Arbiter(app_factory, config, sock).run()
+
+class Arbiter:
+    """Parent process: keeps WEB_WORKERS workers alive.
+
+    SIGHUP starts a fresh set of workers and then drains the old ones, so
+    workers can be recycled without dropping connections. SIGTERM/SIGINT
+    drain all workers and exit. Draining never blocks the main loop: old
+    workers are tracked with a deadline and killed if they overrun it.
+    """
+
+    def __init__(self, app_factory, config, sock):
+        self.app_factory = app_factory
+        self.config = config
+        self.sock = sock
+        self.workers = {}   # pid -> start time
+        self.draining = {}  # pid -> kill deadline
+        self.stopping = False
+        self.reload_requested = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        logger.info(f"Starting {self.config.WEB_WORKERS} workers on {self.sock.getsockname()}")
+        for _ in range(self.config.WEB_WORKERS):
+            self._spawn()
+
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self._reload()
+            self._reap()
+            self._kill_overdue()
+            time.sleep(0.5)
+
+        logger.info("Shutting down: draining workers")
+        self._drain(list(self.workers))
+        while self.draining:
+            self._reap()
+            self._kill_overdue()
+            time.sleep(0.1)
+        self.sock.close()
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def _handle_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                Worker(self.app_factory, self.config, self.sock).run()
+            except BaseException:
+                logger.exception("Worker crashed")
+                status = 1
+            finally:
+                # os._exit skips atexit, so flush queued log records first
+                log_pipeline.stop()
+                os._exit(status)
+        self.workers[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+        return pid
+
+    def _reap(self):
+        """Collect exited workers; replace live ones that died unexpectedly"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.draining.pop(pid, None) is not None:
+                logger.info(f"Worker {pid} drained")
+                continue
+            started = self.workers.pop(pid, None)
+            if started is None:
+                continue
+            logger.warning(f"Worker {pid} exited with status {status}")
+            if not self.stopping:
+                # Back off if workers die straight after starting
+                if time.monotonic() - started < 1:
+                    time.sleep(1)
+                self._spawn()
+
+    def _reload(self):
+        old = list(self.workers)
+        logger.info("Reloading: starting new workers")
+        for _ in range(self.config.WEB_WORKERS):
+            self._spawn()
+        self._drain(old)
+
+    def _drain(self, pids):
+        """Ask workers to finish in-flight requests and exit"""
+        deadline = time.monotonic() + self.config.WEB_GRACEFUL_TIMEOUT + 5
+        for pid in pids:
+            self.workers.pop(pid, None)
+            self.draining[pid] = deadline
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.draining.items()):
+            if now >= deadline:
+                logger.warning(f"Worker {pid} did not drain in time, killing it")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                # Give it one more period to be reaped
+                self.draining[pid] = now + 5
+
+class Worker:
+    """One waitress server on the shared socket; drains on SIGTERM"""
+
+    def __init__(self, app_factory, config, sock):
+        self.app_factory = app_factory
+        self.config = config
+        self.sock = sock
+        self.draining = False
+
+    def run(self):
+        from waitress.server import create_server
+        from waitress import wasyncore
+
+        signal.signal(signal.SIGTERM, self._handle_term)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+
+        app = self.app_factory(self.config)
+        socket_map = {}
+        server = create_server(app, map=socket_map, sockets=[self.sock], **_server_options(self.config))
+        adj = server.adj
+
+        while not self.draining:
+            wasyncore.loop(timeout=adj.asyncore_loop_timeout, map=socket_map,
+                           use_poll=adj.asyncore_use_poll, count=1)
+
+        # Stop accepting and let in-flight requests finish
+        server.accepting = False
+        deadline = time.monotonic() + self.config.WEB_GRACEFUL_TIMEOUT
+        while server.active_channels and time.monotonic() < deadline:
+            for channel in list(server.active_channels.values()):
+                if not channel.requests:
+                    channel.will_close = True
+            wasyncore.loop(timeout=0.1, map=socket_map, use_poll=adj.asyncore_use_poll, count=1)
+
+        server.task_dispatcher.shutdown(timeout=1)
+        sys.stdout.flush()
+
+    def _handle_term(self, signum, frame):
+        self.draining = True
@@ -90,12 +90,12 @@ class ThemeManager {
     applyTheme(theme) {
         if (theme === 'dark') {
             document.documentElement.classList.add('dark-theme');
-            this.themeCSS.setAttribute('href', this.themeCSS.getAttribute('href').replace('theme-light.css', 'theme-dark.css'));
+            this.themeCSS.setAttribute('href', this.themeCSS.dataset.darkHref || this.themeCSS.getAttribute('href').replace('theme-light.css', 'theme-dark.css'));
             this.themeSwitch.querySelector('.dark-icon').style.display = 'none';
             this.themeSwitch.querySelector('.light-icon').style.display = 'inline-block';
         } else {
             document.documentElement.classList.remove('dark-theme');
-            this.themeCSS.setAttribute('href', this.themeCSS.getAttribute('href').replace('theme-dark.css', 'theme-light.css'));
+            this.themeCSS.setAttribute('href', this.themeCSS.dataset.lightHref || this.themeCSS.getAttribute('href').replace('theme-dark.css', 'theme-light.css'));
             this.themeSwitch.querySelector('.dark-icon').style.display = 'inline-block';
             this.themeSwitch.querySelector('.light-icon').style.display = 'none';
         }
@@ -0,0 +1,215 @@
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import time
+import logging
+import mimetypes
+import click
+from werkzeug.wsgi import wrap_file
+from .compression import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; assets are then pre-compressed with gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Built assets live in <static>/<BUILD_DIR>, next to the manifest mapping
+# each source name (css/base.css) to its fingerprinted copy
+BUILD_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ASSET_EXTENSIONS = ('.css', '.js')
+
+def minify_css(source):
+    """Drop comments and whitespace CSS does not need"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+def minify_js(source):
+    r"""Conservative JS minification: indentation, blank lines and comments that start a line.
+
+    Line breaks are kept, so automatic semicolon insertion is unaffected,
+    and lines inside multi-line template literals are left untouched. Only
+    the comment itself is dropped, never code after it on the same line:
+
+    >>> minify_js('  /* x */ init();\n/* a\n b */ run();\n// done\n')
+    'init();\nrun();\n'
+    """
+    lines = []
+    in_comment = in_template = False
+    for line in source.splitlines():
+        if in_template:
+            lines.append(line)
+            if line.count('`') % 2:
+                in_template = False
+            continue
+        stripped = line.strip()
+        if in_comment:
+            if '*/' not in stripped:
+                continue
+            stripped = stripped.split('*/', 1)[1].strip()
+            in_comment = False
+        while stripped.startswith('/*'):
+            if '*/' not in stripped[2:]:
+                in_comment = True
+                stripped = ''
+                break
+            stripped = stripped[2:].split('*/', 1)[1].strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+        if stripped.count('`') % 2:
+            in_template = True
+    return '\n'.join(lines) + '\n'
+
+def _compress(path, data):
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+def build_assets(static_folder):
+    """Minify, fingerprint and pre-compress the CSS and JS under static_folder.
+
+    Each asset is written to <BUILD_DIR>/<dir>/<name>.<hash>.<ext>, with a
+    .gz (and .br when brotli is installed) copy beside it, and the manifest
+    is replaced atomically. Returns the manifest.
+    """
+    build_root = os.path.join(static_folder, BUILD_DIR)
+    manifest = {}
+    for directory, subdirectories, files in os.walk(static_folder):
+        relative_dir = os.path.relpath(directory, static_folder)
+        if relative_dir.split(os.sep)[0] == BUILD_DIR:
+            subdirectories[:] = []
+            continue
+        for name in sorted(files):
+            stem, extension = os.path.splitext(name)
+            if extension not in ASSET_EXTENSIONS:
+                continue
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                source = f.read()
+            minified = (minify_css if extension == '.css' else minify_js)(source).encode('utf-8')
+            digest = hashlib.sha256(minified).hexdigest()[:12]
+
+            source_name = os.path.normpath(os.path.join(relative_dir, name)).replace(os.sep, '/')
+            built_name = posixpath.join(posixpath.dirname(source_name), f"{stem}.{digest}{extension}")
+            built_path = os.path.join(build_root, built_name)
+            os.makedirs(os.path.dirname(built_path), exist_ok=True)
+            with open(built_path, 'wb') as f:
+                f.write(minified)
+            _compress(built_path, minified)
+            manifest[source_name] = f"{BUILD_DIR}/{built_name}"
+
+    os.makedirs(build_root, exist_ok=True)
+    manifest_path = os.path.join(build_root, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+class AssetManifest:
+    """Points url_for('static', ...) at fingerprinted builds of the assets.
+
+    With a manifest from `flask --app app build-assets`, static URLs for
+    built CSS and JS name their content-hashed copy, which AssetMiddleware
+    serves with far-future immutable caching. Without one, URLs are left
+    as they are and assets are served unbuilt.
+    """
+
+    def __init__(self):
+        self.manifest = {}
+
+    def init_app(self, app):
+        self.manifest = {}
+        path = os.path.join(app.static_folder, BUILD_DIR, MANIFEST_NAME)
+        if app.config.get('USE_ASSET_MANIFEST', True):
+            try:
+                with open(path) as f:
+                    self.manifest = json.load(f)
+            except FileNotFoundError:
+                logger.info("No asset manifest; static assets are served unbuilt")
+        app.url_defaults(self._fingerprint)
+        app.cli.add_command(build_assets_command)
+        app.extensions['assets'] = self
+
+    def _fingerprint(self, endpoint, values):
+        if endpoint == 'static' and self.manifest:
+            built = self.manifest.get(values.get('filename'))
+            if built:
+                values['filename'] = built
+
+class AssetMiddleware:
+    """Serves built assets under <static_url_path>/<BUILD_DIR>/ ahead of Flask.
+
+    Picks the .br or .gz copy the client accepts, sends it through
+    wsgi.file_wrapper and marks it cacheable for a year: a changed asset
+    gets a new name, so a cached one never goes stale.
+    """
+
+    def __init__(self, wsgi_app, static_folder, static_url_path='/static', max_age=365 * 24 * 3600):
+        self.wsgi_app = wsgi_app
+        self.root = os.path.join(static_folder, BUILD_DIR)
+        self.prefix = f"{static_url_path.rstrip('/')}/{BUILD_DIR}/"
+        self.max_age = max_age
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix) or environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return self.wsgi_app(environ, start_response)
+
+        name = path[len(self.prefix):]
+        if not name.endswith(ASSET_EXTENSIONS) or any(part in ('', '.', '..') for part in name.split('/')):
+            return self.wsgi_app(environ, start_response)
+        file_path = os.path.join(self.root, *name.split('/'))
+
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz'), (None, '')):
+            if encoding and encoding not in accepted:
+                continue
+            try:
+                f = open(file_path + suffix, 'rb')
+                break
+            except FileNotFoundError:
+                continue
+        else:
+            return self.wsgi_app(environ, start_response)
+
+        etag = f'"{os.path.basename(name)}{suffix}"'
+        headers = [
+            ('Content-Type', mimetypes.guess_type(name)[0] + '; charset=utf-8'),
+            ('Cache-Control', f'public, max-age={self.max_age}, immutable'),
+            ('Vary', 'Accept-Encoding'),
+            ('ETag', etag),
+        ]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        if etag in environ.get('HTTP_IF_NONE_MATCH', ''):
+            f.close()
+            start_response('304 Not Modified', headers[1:])
+            return []
+        headers.append(('Content-Length', str(os.fstat(f.fileno()).st_size)))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            f.close()
+            return []
+        return wrap_file(environ, f)
+
+@click.command('build-assets')
+def build_assets_command():
+    """Minify, fingerprint and pre-compress static CSS and JS."""
+    from flask import current_app
+    started = time.perf_counter()
+    manifest = build_assets(current_app.static_folder)
+    click.echo(f"Built {len(manifest)} assets in {(time.perf_counter() - started) * 1000:.0f}ms"
+               f" ({'gzip and brotli' if brotli else 'gzip'}); restart the app to use them")
+
+# Global asset manifest, configured in create_app
+asset_manifest = AssetManifest()
@@ -0,0 +1,199 @@
+import re
+import zlib
+from itertools import chain
+from flask import current_app, g, request
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; responses are then gzip-compressed only
+    brotli = None
+
+# Types worth compressing; images, PDFs and archives are compressed already
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                      'image/svg+xml')
+
+# A streamed body is flushed to the client at least every this many input bytes
+STREAM_FLUSH_BYTES = 16 * 1024
+# Bodies of known length up to this size are compressed in one go
+WHOLE_BODY_MAX = 1024 * 1024
+# Set in the WSGI environ of requests whose response must go out uncompressed
+SKIP_COMPRESSION = 'community_helper.skip_compression'
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows (q=0 excluded)"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding and not re.match(r'\s*q=0(\.0*)?\s*$', params):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def skip_compression_for_secrets(response):
+    """after_request hook: send pages that embed the CSRF token uncompressed.
+
+    Compressing a secret alongside text an attacker can influence lets
+    them recover it from response sizes (BREACH), so these pages are sent
+    as they are. Streamed pages are marked when they generate the token
+    up front (see utils/streaming.py).
+    """
+    if current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token') in g:
+        request.environ[SKIP_COMPRESSION] = True
+    return response
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits 31: zlib stream with a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+class CompressionMiddleware:
+    """Compresses text responses with brotli or gzip, as the client accepts.
+
+    Skipped for HEAD requests, partial and bodiless responses, responses
+    that already have a Content-Encoding (pre-compressed assets) or
+    Cache-Control: no-transform, pages marked SKIP_COMPRESSION (see
+    skip_compression_for_secrets), non-text types, and bodies under min_size.
+    A body of known length (up to WHOLE_BODY_MAX) is compressed in one go
+    and keeps a Content-Length; a streamed body is compressed chunk by
+    chunk and flushed at its first chunk and every STREAM_FLUSH_BYTES, so
+    the browser starts early on a long page. Strong ETags are made weak, since the
+    compressed bytes are a different representation of the same content.
+    """
+
+    def __init__(self, wsgi_app, min_size=1024, level=6, brotli_quality=5):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, environ):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or 'HTTP_RANGE' in environ:
+            return None
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def _compressor(self, encoding):
+        return _Brotli(self.brotli_quality) if encoding == 'br' else _Gzip(self.level)
+
+    def _should_compress(self, status, headers):
+        if not status.startswith('200'):
+            return False
+        values = {name.lower(): value for name, value in headers}
+        if 'content-encoding' in values or 'no-transform' in values.get('cache-control', ''):
+            return False
+        if not values.get('content-type', '').startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = values.get('content-length')
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        encoding = self._choose_encoding(environ)
+        if encoding is None:
+            return self.wsgi_app(environ, start_response)
+
+        # Flask calls start_response before returning the body, so the
+        # headers can be inspected before anything is sent
+        captured = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+            return self._write
+
+        app_iter = self.wsgi_app(environ, capture)
+        if not captured:
+            # An app that calls start_response lazily: pull body chunks
+            # until it has, then put them back in front of the rest
+            iterator = iter(app_iter)
+            pulled = []
+            try:
+                while not captured:
+                    pulled.append(next(iterator))
+            except StopIteration:
+                pass
+            except BaseException:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+                raise
+            app_iter = ClosingIterator(chain(pulled, iterator), getattr(app_iter, 'close', None))
+            if not captured:
+                app_iter.close()
+                raise RuntimeError("The application did not call start_response")
+        status, headers, exc_info = captured
+        if environ.get(SKIP_COMPRESSION) or not self._should_compress(status, headers):
+            start_response(status, headers, exc_info)
+            return app_iter
+
+        length = next((int(value) for name, value in headers if name.lower() == 'content-length'), None)
+        headers = [(name, value) for name, value in headers if name.lower() != 'content-length']
+        headers = [(name, 'W/' + value if name.lower() == 'etag' and value.startswith('"') else value)
+                   for name, value in headers]
+        headers.append(('Content-Encoding', encoding))
+        vary = [value for name, value in headers if name.lower() == 'vary']
+        if not any('accept-encoding' in value.lower() for value in vary):
+            headers.append(('Vary', 'Accept-Encoding'))
+
+        if length is not None and length <= WHOLE_BODY_MAX:
+            # A rendered page: compress it whole and keep a Content-Length
+            compressor = self._compressor(encoding)
+            try:
+                body = compressor.compress(b''.join(app_iter)) + compressor.finish()
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            headers.append(('Content-Length', str(len(body))))
+            start_response(status, headers, exc_info)
+            return [body]
+
+        start_response(status, headers, exc_info)
+        return self._stream(app_iter, self._compressor(encoding))
+
+    @staticmethod
+    def _stream(app_iter, compressor):
+        pending = 0
+        first = True
+        try:
+            for chunk in app_iter:
+                if not chunk:
+                    continue
+                output = compressor.compress(chunk)
+                pending += len(chunk)
+                if first or pending >= STREAM_FLUSH_BYTES:
+                    output += compressor.flush()
+                    pending = 0
+                    first = False
+                if output:
+                    yield output
+            yield compressor.finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    @staticmethod
+    def _write(data):
+        raise RuntimeError("CompressionMiddleware does not support the WSGI write() callable")
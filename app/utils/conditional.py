@@ -0,0 +1,79 @@
+import hashlib
+import os
+from functools import wraps
+from flask import current_app, request, session, make_response
+from ..models.change_version import ChangeVersion
+from .principal import refresh_stale_principal
+
+class ConditionalPages:
+    """ETags for pages built from a few rows, checked before the page is built.
+
+    A page's ETag hashes the change counters of the scopes it is built
+    from (kept by triggers, see migration 4), the viewer and their own
+    counter, and a release token covering the app's code and templates.
+    Reading it is one indexed query, so a revalidation that matches is
+    answered 304 without running the page's queries or its template.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.release = ''
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CONDITIONAL_GET_ENABLED', True)
+        self.release = self._release_token(app.root_path)
+        app.extensions['conditional_pages'] = self
+
+    @staticmethod
+    def _release_token(root):
+        """Changes whenever a file of the app (code, templates, built assets) does"""
+        digest = hashlib.sha256()
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = sorted(d for d in subdirectories if d not in ('uploads', '__pycache__'))
+            for name in sorted(files):
+                stat = os.stat(os.path.join(directory, name))
+                digest.update(f"{os.path.relpath(os.path.join(directory, name), root)}:"
+                              f"{stat.st_mtime_ns}:{stat.st_size};".encode())
+        return digest.hexdigest()[:16]
+
+    def etag(self, scopes):
+        """The page's ETag, and the viewer's own change counter it includes"""
+        viewer = session.get('user_id')
+        versions = ChangeVersion.get_versions(list(scopes) + [f"user:{viewer}"])
+        key = '|'.join([self.release, str(viewer), str(session.get('user_type'))]
+                       + [f"{scope}={version}" for scope, version in sorted(versions.items())])
+        return hashlib.sha256(key.encode()).hexdigest()[:32], versions[f"user:{viewer}"]
+
+def conditional_page(scopes=None):
+    """Answer If-None-Match for a GET view before running it.
+
+    scopes(**view_args) lists the change scopes the page is built from;
+    the viewer's own user scope is always included. Pages are marked
+    private and revalidated on every use. Requests with pending flash
+    messages always get the full page, since it shows them. A page is
+    never rendered from a cached principal older than its ETag says.
+    """
+    def decorator(view):
+        @wraps(view)
+        def decorated_function(*args, **kwargs):
+            pages = current_app.extensions['conditional_pages']
+            if not pages.enabled or request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            etag, viewer_version = pages.etag(scopes(**kwargs) if scopes else [])
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                refresh_stale_principal(viewer_version)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
+
+# Global conditional page support, configured in create_app
+conditional_pages = ConditionalPages()
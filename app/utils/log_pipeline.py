@@ -0,0 +1,190 @@
+import atexit
+import copy
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from flask import has_request_context, request, session
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class RequestContextFilter(logging.Filter):
+    """Tag records made while serving a request with who and what it was for"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+            record.remote_addr = request.remote_addr
+            record.user_id = session.get('user_id')
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Let each call site log at most `limit` INFO/DEBUG records per `interval`.
+
+    Warnings and errors always pass. When a call site is let through again
+    after being throttled, the record notes how many lines were dropped.
+    """
+
+    def __init__(self, limit=20, interval=60.0, max_sites=1000):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.max_sites = max_sites
+        self._sites = {}  # (pathname, lineno) -> [window start, count, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.interval:
+                suppressed = site[2] if site else 0
+                if site is None and len(self._sites) >= self.max_sites:
+                    self._sites.clear()
+                self._sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if site[1] < self.limit:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller; drops records when full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, but leave formatting to the sink
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including request context and extra= fields"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in data:
+                data[key] = value
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return json.dumps(data, default=str)
+
+class LogPipeline:
+    """Root logging goes through a queue to a single sink written by one thread.
+
+    Request threads only append to an in-memory queue; the QueueListener
+    thread does the formatting and the (possibly blocking) disk writes.
+    After a fork the child gets a fresh queue and listener.
+    """
+
+    def __init__(self):
+        self.queue_handler = None
+        self.listener = None
+        self.sink = None
+        self.queue_size = 10000
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def installed(self):
+        return self.listener is not None and self._pid == os.getpid()
+
+    def configure(self, config):
+        with self._lock:
+            if self.installed:
+                return
+            self.queue_size = config.get('LOG_QUEUE_SIZE', 10000)
+            self.sink = self._make_sink(config)
+            self.queue_handler = DroppingQueueHandler(queue.Queue(self.queue_size))
+            self.queue_handler.addFilter(RequestContextFilter())
+            # Only the per-request loggers are sampled; everything else
+            # (auth and admin events included) is always written
+            sampler = SamplingFilter(limit=config.get('LOG_SAMPLE_LIMIT', 20),
+                                     interval=config.get('LOG_SAMPLE_INTERVAL', 60.0))
+            for name in config.get('LOG_SAMPLED_LOGGERS', ()):
+                logging.getLogger(name).addFilter(sampler)
+
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(self.queue_handler)
+            root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+            self._start()
+
+    def _make_sink(self, config):
+        path = config.get('LOG_FILE', 'app.log')
+        sink = logging.FileHandler(path) if path else logging.StreamHandler(sys.stderr)
+        if config.get('LOG_FORMAT', 'text') == 'json':
+            sink.setFormatter(JSONFormatter())
+        else:
+            sink.setFormatter(logging.Formatter(TEXT_FORMAT))
+        return sink
+
+    def _start(self):
+        self._pid = os.getpid()
+        self.listener = logging.handlers.QueueListener(self.queue_handler.queue, self.sink)
+        self.listener.start()
+
+    def _after_fork(self):
+        # The listener thread does not survive fork and the queue's locks may
+        # have been held by it, so start over with new ones
+        if self.listener is not None:
+            self.queue_handler.queue = queue.Queue(self.queue_size)
+            self._lock = threading.Lock()
+            self._start()
+
+    def stop(self):
+        """Flush queued records and stop the listener"""
+        if self.installed:
+            self.listener.stop()
+            self.listener = None
+
+# Global logging pipeline, configured in create_app (and by the prefork parent)
+log_pipeline = LogPipeline()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=log_pipeline._after_fork)
+atexit.register(log_pipeline.stop)
+
+def configure_logging(config):
+    """Route root logging through the queue to the configured sink (once per process)"""
+    log_pipeline.configure(config)
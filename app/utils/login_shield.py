@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TokenBucketTable:
+    """Fixed-size table of token buckets keyed by string.
+
+    Each key gets ``capacity`` tokens refilled at ``refill_rate`` per second.
+    At most ``max_keys`` buckets are kept; the least recently used one is
+    evicted when the table is full, so memory stays bounded no matter how many
+    distinct keys an attacker sends.
+    """
+
+    def __init__(self, capacity, refill_rate, max_keys):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, now=None):
+        """Take one token for key; returns False if the bucket is empty"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.capacity
+            else:
+                tokens, last = bucket
+                tokens = min(self.capacity, tokens + (now - last) * self.refill_rate)
+                self._buckets.move_to_end(key)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def peek(self, key, now=None):
+        """True if key has a token, without taking it"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+        if bucket is None:
+            return True
+        tokens, last = bucket
+        return min(self.capacity, tokens + (now - last) * self.refill_rate) >= 1.0
+
+    def retry_after(self, key):
+        """Seconds until key has a token again"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+        if bucket is None or self.refill_rate <= 0:
+            return 0
+        tokens, last = bucket
+        tokens = min(self.capacity, tokens + (time.monotonic() - last) * self.refill_rate)
+        return max(0.0, (1.0 - tokens) / self.refill_rate)
+
+    def __len__(self):
+        return len(self._buckets)
+
+class LoginShield:
+    """Per-IP and per-account login throttle checked before any password work.
+
+    Runs in-process and costs a dict lookup, so rejected attempts never reach
+    User.get_by_email or the password hashing pool.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.ip_buckets = TokenBucketTable(capacity=10, refill_rate=10 / 60.0, max_keys=10000)
+        self.account_buckets = TokenBucketTable(capacity=5, refill_rate=5 / 300.0, max_keys=10000)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('LOGIN_SHIELD_ENABLED', True)
+        max_keys = app.config.get('LOGIN_SHIELD_MAX_KEYS', 10000)
+        self.ip_buckets = TokenBucketTable(
+            capacity=app.config.get('LOGIN_SHIELD_IP_BURST', 10),
+            refill_rate=app.config.get('LOGIN_SHIELD_IP_PER_MINUTE', 10) / 60.0,
+            max_keys=max_keys)
+        self.account_buckets = TokenBucketTable(
+            capacity=app.config.get('LOGIN_SHIELD_ACCOUNT_BURST', 5),
+            refill_rate=app.config.get('LOGIN_SHIELD_ACCOUNT_PER_MINUTE', 1) / 60.0,
+            max_keys=max_keys)
+        app.extensions['login_shield'] = self
+
+    def check(self, ip, email):
+        """Returns seconds to wait before retrying, or 0 if the attempt may proceed.
+
+        Every attempt costs an IP token. The account bucket is only looked at
+        here; it is charged by record_failure, so a user who types the right
+        password is never locked out by someone else guessing at their account.
+        """
+        if not self.enabled:
+            return 0
+        if not self.ip_buckets.consume(ip or 'unknown'):
+            return self.ip_buckets.retry_after(ip or 'unknown')
+        account = self._account_key(email)
+        if account and not self.account_buckets.peek(account):
+            return self.account_buckets.retry_after(account)
+        return 0
+
+    def record_failure(self, email):
+        """Charge the account bucket for a failed password check"""
+        account = self._account_key(email)
+        if self.enabled and account:
+            self.account_buckets.consume(account)
+
+    @staticmethod
+    def _account_key(email):
+        return (email or '').strip().lower()
+
+# Global login shield, configured in create_app
+login_shield = LoginShield()
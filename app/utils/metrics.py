@@ -0,0 +1,257 @@
+import os
+import sqlite3
+import threading
+import time
+from flask import g, request
+from .thread_buckets import ThreadBuckets
+from .query_profiler import query_profiler
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_local = threading.local()
+
+class RouteStats:
+    """Counters for one endpoint, owned by a single thread"""
+    __slots__ = ('requests', 'errors', 'seconds', 'buckets', 'queries', 'db_seconds', 'acquire_seconds')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.acquire_seconds = 0.0
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.seconds += other.seconds
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.queries += other.queries
+        self.db_seconds += other.db_seconds
+        self.acquire_seconds += other.acquire_seconds
+
+class RequestTimer:
+    """Database work of the request currently running on this thread"""
+    __slots__ = ('started', 'queries', 'db_seconds', 'acquire_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.acquire_seconds = 0.0
+
+def record_query(seconds, count=1):
+    """Charge SQLite time to the current request (no-op outside one)"""
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.queries += count
+        timer.db_seconds += seconds
+
+def record_acquire(seconds):
+    """Charge time spent getting a database connection to the current request"""
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.acquire_seconds += seconds
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports the time spent executing and fetching.
+
+    Time goes to the current request's metrics and to the query profiler,
+    which attributes fetch time to the statement last executed.
+    """
+    profile_sql = None
+    profile_params = None
+    profile_elapsed = 0.0
+    profile_slow = False
+
+    def _start(self, sql, parameters):
+        self.profile_sql = sql
+        self.profile_params = parameters
+        self.profile_elapsed = 0.0
+        self.profile_slow = False
+
+    def _observe(self, start, executed):
+        seconds = time.perf_counter() - start
+        self.profile_elapsed += seconds
+        record_query(seconds, executed)
+        query_profiler.record(self, seconds, executed)
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._observe(start, 1)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql, None)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._observe(start, 1)
+
+    def executescript(self, sql_script):
+        # Scripts (schema setup, migrations) are timed but not profiled by shape
+        self._start(None, None)
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._observe(start, 1)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._observe(start, 0)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._observe(start, 0)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._observe(start, 0)
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute) are TimedCursors.
+
+    Use as ``sqlite3.connect(path, factory=TimedConnection)``.
+    """
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # The C shortcuts bypass Python overrides of Cursor.execute
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+class Metrics:
+    """Per-endpoint latency and database metrics.
+
+    Each thread writes to its own dict of RouteStats, so recording a
+    request takes no lock; snapshot() merges the per-thread buckets.
+    Metrics are per process: with several workers each reports its own.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.started = time.time()
+        self._buckets = ThreadBuckets()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+        # Run before every other hook so rate limited requests are timed too
+        app.before_request_funcs.setdefault(None, []).insert(0, self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        _local.timer = RequestTimer()
+
+    def _after_request(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        timer = getattr(_local, 'timer', None)
+        if timer is None:
+            return
+        _local.timer = None
+        elapsed = time.perf_counter() - timer.started
+        status = 500 if exc is not None else g.get('metrics_status', 500)
+
+        endpoint = request.endpoint or 'unmatched'
+        bucket = self._buckets.local()
+        stats = bucket.get(endpoint)
+        if stats is None:
+            stats = bucket[endpoint] = RouteStats()
+        stats.requests += 1
+        if status >= 500:
+            stats.errors += 1
+        stats.seconds += elapsed
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                stats.buckets[i] += 1
+                break
+        else:
+            stats.buckets[-1] += 1
+        stats.queries += timer.queries
+        stats.db_seconds += timer.db_seconds
+        stats.acquire_seconds += timer.acquire_seconds
+
+    def snapshot(self):
+        """Merged RouteStats per endpoint across all threads"""
+        merged = {}
+        for bucket in self._buckets.all():
+            for endpoint, stats in list(bucket.items()):
+                merged.setdefault(endpoint, RouteStats()).merge(stats)
+        return merged
+
+    def as_json(self):
+        routes = {}
+        for endpoint, stats in sorted(self.snapshot().items()):
+            routes[endpoint] = {
+                'requests': stats.requests,
+                'errors': stats.errors,
+                'avg_ms': round(stats.seconds / stats.requests * 1000, 3) if stats.requests else 0.0,
+                # [upper bound in seconds (None for +Inf), requests] pairs, not cumulative
+                'latency_buckets': [list(pair) for pair in zip(list(LATENCY_BUCKETS) + [None], stats.buckets)],
+                'queries': stats.queries,
+                'queries_per_request': round(stats.queries / stats.requests, 2) if stats.requests else 0.0,
+                'db_ms': round(stats.db_seconds * 1000, 3),
+                'acquire_ms': round(stats.acquire_seconds * 1000, 3),
+            }
+        return {'pid': os.getpid(), 'uptime_seconds': round(time.time() - self.started, 1), 'routes': routes}
+
+    def as_prometheus(self):
+        lines = [
+            '# HELP app_request_duration_seconds Request latency by endpoint.',
+            '# TYPE app_request_duration_seconds histogram',
+        ]
+        snapshot = sorted(self.snapshot().items())
+        for endpoint, stats in snapshot:
+            cumulative = 0
+            for bound, count in zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], stats.buckets):
+                cumulative += count
+                lines.append(f'app_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'app_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats.seconds:.6f}')
+            lines.append(f'app_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats.requests}')
+
+        counters = [
+            ('app_request_errors_total', 'counter', 'Requests that ended in a 5xx.', 'errors', '{}'),
+            ('app_db_queries_total', 'counter', 'SQLite statements executed.', 'queries', '{}'),
+            ('app_db_query_seconds_total', 'counter', 'Time spent in SQLite.', 'db_seconds', '{:.6f}'),
+            ('app_db_acquire_seconds_total', 'counter', 'Time spent getting a database connection.',
+             'acquire_seconds', '{:.6f}'),
+        ]
+        for name, kind, help_text, attr, fmt in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for endpoint, stats in snapshot:
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {fmt.format(getattr(stats, attr))}')
+        return '\n'.join(lines) + '\n'
+
+# Global metrics registry, configured in create_app
+metrics = Metrics()
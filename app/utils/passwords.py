@@ -0,0 +1,106 @@
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+# Werkzeug's defaults, used to expand short method names such as "pbkdf2"
+_DEFAULT_PARAMS = {
+    'pbkdf2': ['sha256', '600000'],
+    'scrypt': ['32768', '8', '1'],
+}
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing pool is saturated and a request is turned away"""
+
+def normalize_method(method):
+    """Expand a hashing method to the full form stored in password hashes"""
+    parts = method.split(':')
+    defaults = _DEFAULT_PARAMS.get(parts[0], [])
+    return ':'.join(parts + defaults[len(parts) - 1:])
+
+class PasswordHasher:
+    """Runs password hashing on a small bounded pool.
+
+    PBKDF2/scrypt are deliberately slow. Running them on a waitress thread lets
+    a burst of logins occupy every thread, so the work is sent to a pool with
+    at most ``max_pending`` hashes admitted (running or queued) at a time. A
+    request beyond that waits up to ``queue_timeout`` seconds for a slot and
+    is rejected with PasswordHashingBusy only if none frees up by then.
+    """
+
+    def __init__(self, method='pbkdf2:sha256:600000', workers=2, max_pending=None,
+                 timeout=10.0, queue_timeout=2.0, executor='thread'):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.max_pending = max_pending or 4 * workers
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.executor_type = executor
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = normalize_method(app.config.get('PASSWORD_HASH_METHOD', self.method))
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING') or 4 * self.workers
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', self.queue_timeout)
+        self.executor_type = app.config.get('PASSWORD_HASH_EXECUTOR', self.executor_type)
+        self.shutdown()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        app.extensions['password_hasher'] = self
+
+    def _get_executor(self):
+        """Create the pool on first use so each worker process gets its own"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_type == 'process':
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                            thread_name_prefix='password-hash')
+                    logger.info(f"Started {self.executor_type} password hashing pool with {self.workers} workers")
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHashingBusy('Password hashing pool is busy')
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            logger.warning("Password hashing timed out")
+            raise PasswordHashingBusy('Password hashing timed out')
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash"""
+        if not password_hash or password is None:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with different parameters"""
+        if not password_hash or '$' not in password_hash:
+            return False
+        return password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+# Global password hasher, configured in create_app
+password_hasher = PasswordHasher()
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import g, session, has_request_context
+from werkzeug.local import LocalProxy
+from ..models.user import User
+from ..models.helper import Helper
+from ..models.change_version import ChangeVersion
+
+class Principal:
+    """The logged-in account: its user row, helper row (if any) and role.
+
+    version is the user's change counter (see ChangeVersion) read before
+    the user row, so the row is at least that new.
+    """
+
+    def __init__(self, user, helper=None, version=0):
+        self.id = user.id
+        self.user = user
+        self.helper = helper
+        self.role = user.user_type
+        self.version = version
+
+    @property
+    def is_helper(self):
+        return self.role == 'helper'
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+class PrincipalCache:
+    """Thread-safe LRU of principals keyed by user id with a short TTL.
+
+    Entries are invalidated explicitly when a profile changes; the TTL bounds
+    staleness for writes made elsewhere (other processes, rating updates).
+    """
+
+    def __init__(self, max_size=1024, ttl=30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_size = app.config.get('PRINCIPAL_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('PRINCIPAL_CACHE_TTL', self.ttl)
+        self.clear()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def put(self, user_id, principal):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Global principal cache, configured in create_app
+principal_cache = PrincipalCache()
+
+def load_principal(user_id):
+    """Get the principal for a user id from the cache or the database"""
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    version = ChangeVersion.get_versions([f"user:{user_id}"])[f"user:{user_id}"]
+    user = User.get_by_id(user_id)
+    if not user:
+        return None
+
+    helper = Helper.get_by_user_id(user.id) if user.user_type == 'helper' else None
+    principal = Principal(user, helper, version)
+    principal_cache.put(user_id, principal)
+    return principal
+
+def invalidate_principal(user_id):
+    """Drop a cached principal after its user or helper row changed"""
+    principal_cache.invalidate(user_id)
+    if has_request_context():
+        current = g.get('current_principal')
+        if current is not None and current.id == user_id:
+            g.pop('current_principal', None)
+
+def refresh_stale_principal(version):
+    """Reload the current principal if its user row has changed past version.
+
+    The cache can be behind for up to its TTL after a write made by another
+    worker or a background job; pages keyed on change counters call this
+    with the counter they are keyed on so they never render older rows.
+    """
+    principal = _get_current_principal()
+    if principal is not None and principal.version < version:
+        invalidate_principal(principal.id)
+
+def _get_current_principal():
+    if 'current_principal' not in g:
+        user_id = session.get('user_id')
+        g.current_principal = load_principal(user_id) if user_id else None
+    return g.current_principal
+
+# Principal for the session user, built at most once per request
+current_principal = LocalProxy(_get_current_principal)
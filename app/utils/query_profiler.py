@@ -0,0 +1,193 @@
+import re
+import sqlite3
+import threading
+import logging
+from functools import lru_cache
+from flask import request
+from .thread_buckets import ThreadBuckets
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+def shape_of(sql):
+    """Query shape of a statement: literals and IN lists become ?, comments
+    dropped and whitespace collapsed.
+
+    ``SELECT * FROM service_requests WHERE status = "open"`` and
+    ``SELECT * FROM service_requests WHERE status = ?`` share one shape.
+    """
+    shape = _LITERAL.sub('?', _COMMENT.sub(' ', sql))
+    shape = _IN_LIST.sub('IN (?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip().rstrip(';')
+
+# Statements passed to execute() repeat, so their shapes are cached
+normalize = lru_cache(maxsize=2048)(shape_of)
+
+def analyze_plan(details):
+    """Flags for an EXPLAIN QUERY PLAN: full table scans and temp sorts"""
+    full_scans = [d[5:].split(' ')[0] for d in details
+                  if d.startswith('SCAN ') and 'USING' not in d and d != 'SCAN CONSTANT ROW']
+    return {
+        'full_scans': full_scans,
+        'temp_btree': any('USE TEMP B-TREE' in d for d in details),
+    }
+
+class ShapeStats:
+    __slots__ = ('count', 'seconds', 'max_seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+class QueryProfiler:
+    """Aggregates SQLite time by query shape and captures plans of slow ones.
+
+    TimedCursor reports every execute and fetch here. Totals are kept per
+    thread and merged on read (see report()). The first time a shape takes
+    longer than SQL_SLOW_QUERY_MS, its EXPLAIN QUERY PLAN is captured and
+    full table scans are flagged. With SQL_PROFILE_REQUESTS (on by default
+    in debug mode) each request also gets a Server-Timing header and a log
+    line listing the statements it ran, as traced by set_trace_callback.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.slow_seconds = 0.1
+        self.per_request = False
+        self.plans = {}  # shape -> plan info, captured once
+        self._plans_lock = threading.Lock()
+        self._buckets = ThreadBuckets()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SQL_PROFILER_ENABLED', True)
+        self.slow_seconds = app.config.get('SQL_SLOW_QUERY_MS', 100) / 1000.0
+        per_request = app.config.get('SQL_PROFILE_REQUESTS')
+        self.per_request = self.enabled and (app.debug if per_request is None else per_request)
+        app.extensions['query_profiler'] = self
+        if self.per_request:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+            app.teardown_request(self._teardown_request)
+
+    def install(self, conn):
+        """Trace the statements run on conn when per-request profiling is on"""
+        if self.per_request:
+            conn.set_trace_callback(_trace)
+
+    def record(self, cursor, seconds, executed):
+        """Charge seconds of execute/fetch time on cursor to its statement's shape"""
+        if not self.enabled or cursor.profile_sql is None:
+            return
+        shape = normalize(cursor.profile_sql)
+        bucket = self._buckets.local()
+        stats = bucket.get(shape)
+        if stats is None:
+            stats = bucket[shape] = ShapeStats()
+        stats.count += executed
+        stats.seconds += seconds
+        if cursor.profile_elapsed > stats.max_seconds:
+            stats.max_seconds = cursor.profile_elapsed
+
+        statements = getattr(_local, 'statements', None)
+        if statements is not None:
+            statements.append((shape, seconds))
+
+        if cursor.profile_elapsed >= self.slow_seconds and not cursor.profile_slow:
+            cursor.profile_slow = True
+            self._slow(cursor, shape)
+
+    def _slow(self, cursor, shape):
+        with self._plans_lock:
+            first = shape not in self.plans
+            if first:
+                self.plans[shape] = None
+        if first:
+            self.plans[shape] = self._explain(cursor, shape)
+        plan = self.plans[shape] or {}
+        scans = ', '.join(plan.get('full_scans', []))
+        message = f"Slow query ({cursor.profile_elapsed * 1000:.1f}ms): {shape}"
+        if scans:
+            message += f" [full scan of {scans}]"
+        if first:
+            logger.warning(message + ''.join(f"\n  {d}" for d in plan.get('plan', [])))
+        else:
+            logger.info(message)
+
+    def _explain(self, cursor, shape):
+        sql = cursor.profile_sql
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE) or cursor.profile_params is None:
+            return None
+        try:
+            # A plain cursor so the EXPLAIN itself is not profiled
+            rows = sqlite3.Cursor(cursor.connection).execute(
+                'EXPLAIN QUERY PLAN ' + sql, cursor.profile_params).fetchall()
+        except sqlite3.Error as e:
+            logger.debug(f"Could not explain {shape}: {e}")
+            return None
+        details = [row[3] for row in rows]
+        return dict(plan=details, **analyze_plan(details))
+
+    def report(self):
+        """Shapes ordered by total time, with plans where captured"""
+        merged = {}
+        for bucket in self._buckets.all():
+            for shape, stats in list(bucket.items()):
+                total = merged.setdefault(shape, ShapeStats())
+                total.count += stats.count
+                total.seconds += stats.seconds
+                total.max_seconds = max(total.max_seconds, stats.max_seconds)
+        shapes = []
+        for shape, stats in sorted(merged.items(), key=lambda item: item[1].seconds, reverse=True):
+            entry = {
+                'shape': shape,
+                'count': stats.count,
+                'total_ms': round(stats.seconds * 1000, 3),
+                'avg_ms': round(stats.seconds / stats.count * 1000, 3) if stats.count else 0.0,
+                'max_ms': round(stats.max_seconds * 1000, 3),
+            }
+            plan = self.plans.get(shape)
+            if plan:
+                entry.update(plan)
+            shapes.append(entry)
+        return {'slow_query_ms': self.slow_seconds * 1000, 'shapes': shapes}
+
+    def reset(self):
+        self._buckets.clear()
+        with self._plans_lock:
+            self.plans.clear()
+
+    def _before_request(self):
+        _local.statements = []
+        _local.traced = []
+
+    def _after_request(self, response):
+        statements = getattr(_local, 'statements', None)
+        if statements is None:
+            return response
+        total_ms = sum(seconds for _, seconds in statements) * 1000
+        executed = len(getattr(_local, 'traced', []))
+        response.headers.add('Server-Timing', f'db;dur={total_ms:.2f};desc="{executed} statements"')
+        traced = ''.join(f"\n  {sql}" for sql in _local.traced)
+        logger.info(f"{request.method} {request.path}: {executed} statements, {total_ms:.1f}ms in SQLite{traced}")
+        return response
+
+    def _teardown_request(self, exc):
+        _local.statements = None
+        _local.traced = None
+
+def _trace(sql):
+    traced = getattr(_local, 'traced', None)
+    if traced is not None:
+        # Shapes only: the expanded statement carries bound values such as password hashes
+        traced.append(shape_of(sql))
+
+# Global query profiler, configured in create_app
+query_profiler = QueryProfiler()
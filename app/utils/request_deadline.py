@@ -0,0 +1,166 @@
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+import traceback
+import logging
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+class Deadline:
+    """Deadline of one in-flight request"""
+    __slots__ = ('method', 'path', 'started', 'expires_at', 'thread_id', 'cancelled', 'done')
+
+    def __init__(self, method, path, timeout):
+        self.method = method
+        self.path = path
+        self.started = time.monotonic()
+        self.expires_at = self.started + timeout
+        self.thread_id = threading.get_ident()
+        self.cancelled = False
+        self.done = False
+
+def current_deadline():
+    """Deadline of the request being served on this thread, if any"""
+    return getattr(_local, 'deadline', None)
+
+def _progress_handler():
+    deadline = getattr(_local, 'deadline', None)
+    return 1 if deadline is not None and deadline.cancelled else 0
+
+def install_progress_handler(conn, instructions=1000):
+    """Abort SQLite work on conn once the current request's deadline passes.
+
+    The handler looks up the deadline of whichever thread is running the
+    statement, so it is safe on pooled connections shared between threads.
+    An aborted statement raises sqlite3.OperationalError('interrupted').
+    """
+    conn.set_progress_handler(_progress_handler, instructions)
+
+class DeadlineWatchdog:
+    """One background thread that cancels requests that overrun their deadline.
+
+    Deadlines sit in a min-heap ordered by expiry. Finished requests are only
+    marked done and dropped lazily when they reach the top of the heap, so
+    registering and finishing a request is O(log n) with no thread creation.
+    """
+
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+        self.overruns = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.timeout = app.config.get('REQUEST_TIMEOUT', self.timeout)
+        app.extensions['deadline_watchdog'] = self
+
+    def _ensure_thread(self):
+        # Started lazily so each forked worker process runs its own watchdog
+        if self._thread is None or self._pid != os.getpid():
+            self._heap = []
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='deadline-watchdog', daemon=True)
+            self._thread.start()
+
+    def start(self, method, path):
+        deadline = Deadline(method, path, self.timeout)
+        with self._condition:
+            self._ensure_thread()
+            heapq.heappush(self._heap, (deadline.expires_at, next(self._counter), deadline))
+            if self._heap[0][2] is deadline:
+                self._condition.notify()
+        return deadline
+
+    def finish(self, deadline):
+        deadline.done = True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                expires_at, _, deadline = self._heap[0]
+                if deadline.done:
+                    heapq.heappop(self._heap)
+                    continue
+                wait = expires_at - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+                deadline.cancelled = True
+                self.overruns += 1
+            self._report(deadline)
+
+    def _report(self, deadline):
+        elapsed = time.monotonic() - deadline.started
+        frame = sys._current_frames().get(deadline.thread_id)
+        stack = ''.join(traceback.format_stack(frame, limit=8)) if frame else '  (thread finished)\n'
+        logger.warning(
+            f"Request {deadline.method} {deadline.path} exceeded its {self.timeout:g}s deadline "
+            f"after {elapsed:.1f}s; aborting its database work. Current stack:\n{stack}")
+
+class _ChunkDeadlines:
+    """Response body that gives the work of producing each chunk its own deadline.
+
+    Time the server spends writing earlier chunks to a slow client is not
+    counted, so a long streamed page is not cut off once its database work
+    is done; producing any one chunk (fetching the next rows, say) is still
+    bounded by the timeout.
+    """
+
+    def __init__(self, response, watchdog, method, path):
+        self.response = response
+        self.watchdog = watchdog
+        self.method = method
+        self.path = path
+        self._iterator = iter(response)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        deadline = self.watchdog.start(self.method, self.path)
+        _local.deadline = deadline
+        try:
+            return next(self._iterator)
+        finally:
+            self.watchdog.finish(deadline)
+            _local.deadline = None
+
+    def close(self):
+        if hasattr(self.response, 'close'):
+            self.response.close()
+
+class RequestDeadlineMiddleware:
+    """WSGI middleware that gives every request a deadline on the watchdog"""
+
+    def __init__(self, app, watchdog):
+        self.app = app
+        self.watchdog = watchdog
+
+    def __call__(self, environ, start_response):
+        if not self.watchdog.timeout:
+            return self.app(environ, start_response)
+
+        method, path = environ.get('REQUEST_METHOD', ''), environ.get('PATH_INFO', '')
+        deadline = self.watchdog.start(method, path)
+        _local.deadline = deadline
+        try:
+            response = self.app(environ, start_response)
+        finally:
+            self.watchdog.finish(deadline)
+            _local.deadline = None
+        # The view is done; a streamed body gets a fresh deadline per chunk
+        return _ChunkDeadlines(response, self.watchdog, method, path)
+
+# Global watchdog, configured in create_app
+deadline_watchdog = DeadlineWatchdog()
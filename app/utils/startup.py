@@ -0,0 +1,115 @@
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from flask import before_render_template, template_rendered
+from jinja2 import FileSystemBytecodeCache
+
+logger = logging.getLogger(__name__)
+
+class StartupReport:
+    """Wall-clock breakdown of app startup, one entry per phase"""
+
+    def __init__(self, import_seconds=0.0):
+        self.started = time.perf_counter()
+        self.phases = [('imports', import_seconds)] if import_seconds else []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 2),
+            'phases_ms': {name: round(seconds * 1000, 2) for name, seconds in self.phases},
+        }
+
+    def log(self):
+        breakdown = ', '.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases)
+        logger.info(f"App started in {self.total * 1000:.1f}ms ({breakdown})")
+
+def precompile_templates(app):
+    """Compile every template into the Jinja cache so no request pays for it.
+
+    With a bytecode cache, templates compiled by an earlier process are
+    loaded from it instead. Returns the number of templates compiled.
+    """
+    env = app.jinja_env
+    names = [name for name in env.list_templates() if name.endswith('.html')]
+    for name in names:
+        env.get_template(name)
+    cache = env.bytecode_cache
+    if isinstance(cache, TemplateBytecodeCache):
+        logger.info(f"Precompiled {len(names)} templates ({cache.hits} from the bytecode cache, "
+                    f"{cache.misses} compiled)")
+    return len(names)
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """Jinja bytecode cache on disk, shared by workers and kept across restarts.
+
+    Jinja checks each entry against the template source, so an edited
+    template is recompiled. Hits and misses are counted for the startup log.
+    """
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.hits = 0
+        self.misses = 0
+
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        if bucket.code is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+def configure_template_cache(app):
+    """Use TEMPLATE_BYTECODE_CACHE_DIR (if set) as the Jinja bytecode cache"""
+    directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = TemplateBytecodeCache(directory)
+    return app.jinja_env.bytecode_cache
+
+class FirstRenderTimer:
+    """Logs how long the first render of each template in this process takes.
+
+    That render includes compiling (or loading from the bytecode cache)
+    the layouts and includes it pulls in, which is what the first request
+    to each page pays after a restart.
+    """
+
+    def __init__(self):
+        self.first_renders = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        before_render_template.connect(self._started, app)
+        template_rendered.connect(self._finished, app)
+        app.extensions['first_renders'] = self
+
+    def _started(self, sender, template, context, **extra):
+        if template.name not in self.first_renders:
+            self._local.__dict__.setdefault('started', {})[template.name] = time.perf_counter()
+
+    def _finished(self, sender, template, context, **extra):
+        started = getattr(self._local, 'started', {}).pop(template.name, None)
+        if started is None:
+            return
+        ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            if template.name in self.first_renders:
+                return
+            self.first_renders[template.name] = round(ms, 2)
+        logger.info(f"First render of {template.name} took {ms:.1f}ms")
@@ -0,0 +1,36 @@
+from flask import current_app, get_flashed_messages, stream_template
+from flask_wtf.csrf import generate_csrf
+
+# Rendered output is sent in pieces of at least this many bytes
+STREAM_CHUNK_SIZE = 8 * 1024
+
+def _chunked(pieces, size):
+    """Join the small strings a template stream yields into chunks of about size bytes"""
+    buffer = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+def stream_page(template_name, csrf=False, **context):
+    """Respond with template_name rendered as it is sent, for pages of unbounded length.
+
+    Rows fed from a generator are rendered and sent a chunk at a time, so
+    time to first byte and memory do not grow with the table. The session
+    is saved before the body starts, so anything the page takes from it
+    is taken here first: flashed messages always, and the CSRF token when
+    csrf is set, which templates calling csrf_token() need (it also keeps
+    the page uncompressed, see utils/compression.py). An error while
+    rendering cuts the page short instead of giving a 500.
+    """
+    get_flashed_messages()
+    if csrf:
+        generate_csrf()
+    pieces = stream_template(template_name, **context)
+    return current_app.response_class(_chunked(pieces, STREAM_CHUNK_SIZE), mimetype='text/html')
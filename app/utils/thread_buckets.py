@@ -0,0 +1,40 @@
+import os
+import threading
+
+class ThreadBuckets:
+    """One dict per thread for lock-free counters, merged on read.
+
+    A thread only ever writes to its own dict; the lock is taken once per
+    thread (to register the dict) and by readers. After a fork the child
+    starts with no buckets, so it never reports its parent's numbers.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._buckets = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def local(self):
+        """This thread's dict"""
+        bucket = getattr(self._local, 'bucket', None)
+        if bucket is None or self._local.pid != os.getpid():
+            bucket = {}
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._buckets = []
+                    self._pid = os.getpid()
+                self._buckets.append(bucket)
+            self._local.bucket = bucket
+            self._local.pid = os.getpid()
+        return bucket
+
+    def all(self):
+        """Every thread's dict (the live objects; copy items before iterating)"""
+        with self._lock:
+            return list(self._buckets) if self._pid == os.getpid() else []
+
+    def clear(self):
+        with self._lock:
+            for bucket in self._buckets:
+                bucket.clear()
@@ -0,0 +1,135 @@
+import io
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from ..models.user import User
+from ..models.job_claim import JobClaim
+from .principal import principal_cache
+from .uploads import upload_store, upload_url
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it pictures are shown at full size
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+def avatar_url(user, default=None):
+    """URL of a user's avatar: the thumbnail once it exists, else the full picture.
+
+    Works with User objects and their to_dict() form. Templates get it as a
+    global; default is returned for users without a picture.
+    """
+    if not user:  # None, or a template variable that is not set
+        return default
+    get = user.get if isinstance(user, dict) else lambda name: getattr(user, name, None)
+    path = get('profile_thumbnail') or get('profile_picture')
+    if not path:
+        return default
+    return upload_url(path)
+
+class ThumbnailGenerator:
+    """Generates fixed-size thumbnails of profile pictures on a background pool.
+
+    submit() returns at once; a worker center-crops the picture to
+    THUMBNAIL_SIZE pixels square, recompresses it as a JPEG and stores it in
+    the upload store, so identical pictures share one thumbnail. Until it
+    is recorded on the user, avatar_url() falls back to the full picture.
+    Pictures still without a thumbnail are queued again at startup.
+    """
+
+    def __init__(self, size=160, quality=82, workers=1):
+        self.size = size
+        self.quality = quality
+        self.workers = workers
+        self.root = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return Image is not None
+
+    def init_app(self, app):
+        self.size = app.config.get('THUMBNAIL_SIZE', self.size)
+        self.quality = app.config.get('THUMBNAIL_QUALITY', self.quality)
+        self.workers = app.config.get('THUMBNAIL_WORKERS', self.workers)
+        self.root = app.config['UPLOAD_FOLDER']
+        app.add_template_global(avatar_url)
+        app.extensions['thumbnails'] = self
+        if not self.enabled:
+            logger.info("Pillow is not installed; profile pictures are served without thumbnails")
+
+    def _get_executor(self):
+        """Create the pool on first use so each worker process gets its own"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='thumbnails')
+                self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, user_id):
+        """Generate a user's thumbnail in the background"""
+        if not self.enabled:
+            return None
+        future = self._get_executor().submit(self.generate, user_id)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def resume_missing(self):
+        """Queue pictures uploaded before a restart or before Pillow was installed.
+
+        Every worker calls this at startup; each user is claimed first, so
+        only one of them renders the thumbnail.
+        """
+        if not self.enabled:
+            return
+        for user_id in User.get_missing_thumbnails():
+            if JobClaim.claim('thumbnail', user_id):
+                self.submit(user_id)
+
+    @staticmethod
+    def _log_failure(future):
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Thumbnail generation failed: {error!r}")
+
+    def render(self, path):
+        """JPEG bytes of the picture at path, cropped and scaled to size x size"""
+        with Image.open(path) as image:
+            image.draft('RGB', (self.size, self.size))  # JPEG: decode at a reduced scale
+            image = ImageOps.exif_transpose(image)
+            image = ImageOps.fit(image.convert('RGB'), (self.size, self.size), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=self.quality, optimize=True, progressive=True)
+        return output.getvalue()
+
+    def generate(self, user_id):
+        user = User.get_by_id(user_id)
+        if user is None or not user.profile_picture or user.profile_thumbnail:
+            return None
+        source = user.profile_picture
+        source_path = os.path.join(self.root, source)
+        try:
+            source_size = os.path.getsize(source_path)
+            data = self.render(source_path)
+        except (OSError, ValueError) as e:
+            # Unreadable or not an image; the full picture stays in use
+            logger.warning(f"No thumbnail for {source}: {e}")
+            return None
+
+        thumbnail = upload_store.save_bytes(data, 'jpg')
+        unused = User.set_profile_thumbnail(user_id, source, thumbnail.path)
+        if unused:
+            upload_store.release(unused)
+        if unused == thumbnail.path:
+            return None
+        principal_cache.invalidate(user_id)
+        logger.info(f"Thumbnail for user {user_id}: {source_size} -> {len(data)} bytes")
+        return thumbnail.path
+
+# Global thumbnail generator, configured in create_app
+thumbnail_generator = ThumbnailGenerator()
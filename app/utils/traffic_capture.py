@@ -0,0 +1,129 @@
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import threading
+import time
+import logging
+from flask import request, session
+from werkzeug.wsgi import ClosingIterator
+
+logger = logging.getLogger(__name__)
+
+# Query arguments whose values are never written to a trace
+_SENSITIVE = re.compile(r'pass|token|secret|key|csrf|email|phone|address|name', re.IGNORECASE)
+_TRACE_KEY = 'traffic_capture.trace'
+
+def _value_shape(value):
+    """Type and length of a form value: 'd' digits, 'e' email-like, 's' anything else"""
+    if value.isdigit():
+        kind = 'd'
+    elif '@' in value:
+        kind = 'e'
+    else:
+        kind = 's'
+    return [kind, len(value)]
+
+class TrafficCapture:
+    """Opt-in recorder of sanitized request traces for benchmarks/replay.py.
+
+    Each captured request becomes one JSON line appended to
+    TRAFFIC_CAPTURE_FILE: start time, method, path, URL rule, view args,
+    query args (values of sensitive-looking keys dropped), the shape of the
+    form (field -> [kind, length], never the values), uploaded field names,
+    status and duration. The user is recorded only as their user type and
+    a pseudonym keyed on SECRET_KEY, so replays can keep one session per
+    user without the trace identifying anyone.
+    """
+
+    def __init__(self):
+        self.path = ''
+        self.sample_rate = 1.0
+        self.secret = b''
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.path) and self.sample_rate > 0
+
+    def init_app(self, app):
+        self.path = app.config.get('TRAFFIC_CAPTURE_FILE', '')
+        self.sample_rate = app.config.get('TRAFFIC_CAPTURE_SAMPLE_RATE', 1.0)
+        self.secret = str(app.config.get('SECRET_KEY') or '').encode()
+        app.extensions['traffic_capture'] = self
+        if self.enabled:
+            app.after_request(self._annotate)
+            logger.info(f"Capturing {self.sample_rate:.0%} of requests to {self.path}")
+
+    def _annotate(self, response):
+        """Attach what only Flask knows (rule, form, session) to the WSGI environ"""
+        if _TRACE_KEY not in request.environ or request.endpoint == 'static':
+            return response
+        user_id = session.get('user_id')
+        actor = None
+        if user_id is not None:
+            actor = hmac.new(self.secret, f'trace:{user_id}'.encode(), hashlib.sha256).hexdigest()[:12]
+        request.environ[_TRACE_KEY] = {
+            'rule': request.url_rule.rule if request.url_rule else None,
+            'view_args': request.view_args or {},
+            'args': {k: (None if _SENSITIVE.search(k) else v) for k, v in request.args.items()},
+            'form': {k: _value_shape(v) for k, v in request.form.items() if k != 'csrf_token'},
+            'files': sorted(request.files),
+            'role': session.get('user_type'),
+            'actor': actor,
+        }
+        return response
+
+    def _write(self, line):
+        # One O_APPEND write per trace, so workers can share the file
+        with self._lock:
+            if self._fd is None or self._pid != os.getpid():
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+                self._pid = os.getpid()
+            os.write(self._fd, line)
+
+    def record(self, environ, started, elapsed, status):
+        trace = environ.get(_TRACE_KEY)
+        if not trace:
+            return
+        trace = dict(trace, t=round(started, 3), m=environ.get('REQUEST_METHOD', ''),
+                     p=environ.get('PATH_INFO', '')[:200], s=status, ms=round(elapsed * 1000, 2))
+        try:
+            self._write((json.dumps(trace, separators=(',', ':')) + '\n').encode())
+        except OSError as e:
+            logger.warning(f"Could not write traffic trace: {e}")
+
+class TrafficCaptureMiddleware:
+    """WSGI middleware that times sampled requests and hands them to the recorder"""
+
+    def __init__(self, app, capture):
+        self.app = app
+        self.capture = capture
+
+    def __call__(self, environ, start_response):
+        if random.random() >= self.capture.sample_rate:
+            return self.app(environ, start_response)
+
+        # Filled in by TrafficCapture._annotate once the view has run
+        environ[_TRACE_KEY] = {}
+        started = time.time()
+        timer = time.perf_counter()
+        status = []
+
+        def capture_status(status_line, headers, exc_info=None):
+            status[:] = [int(status_line.split(' ', 1)[0])]
+            return start_response(status_line, headers, exc_info)
+
+        def finish():
+            self.capture.record(environ, started, time.perf_counter() - timer, status[0] if status else 500)
+
+        response = self.app(environ, capture_status)
+        # Recorded once the body has been sent, so streamed responses are timed in full
+        return ClosingIterator(response, [finish])
+
+# Global traffic recorder, configured in create_app
+traffic_capture = TrafficCapture()
@@ -0,0 +1,138 @@
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from ..models.verification import Verification
+from ..models.job_claim import JobClaim
+
+try:
+    import magic
+except ImportError:  # python-magic and libmagic are optional
+    magic = None
+
+logger = logging.getLogger(__name__)
+
+# MIME type the content of a file with each accepted extension must have
+EXTENSION_MIME_TYPES = {
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+}
+
+# Leading bytes of those types, used when libmagic is not available
+_SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+def sniff_mime_type(head):
+    """MIME type of a file from its first bytes"""
+    if magic is not None:
+        return magic.from_buffer(head, mime=True)
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+class UploadValidator:
+    """Checks uploaded verification documents on a background pool.
+
+    submit_verification() returns at once; a worker reads only the first
+    UPLOAD_SNIFF_BYTES of each document, sniffs its MIME type (libmagic when
+    python-magic is installed, a signature table otherwise) and marks the
+    request 'validated' or 'rejected'. Each document is checked against the
+    extension it was uploaded with, even when its content is shared with
+    another request's, and keeps the type sniffed from it. Requests left
+    'pending' by a restart are picked up again at startup, by one process.
+    """
+
+    def __init__(self, workers=2, sniff_bytes=8192):
+        self.workers = workers
+        self.sniff_bytes = sniff_bytes
+        self.root = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = app.config.get('UPLOAD_VALIDATION_WORKERS', self.workers)
+        self.sniff_bytes = app.config.get('UPLOAD_SNIFF_BYTES', self.sniff_bytes)
+        self.root = app.config['UPLOAD_FOLDER']
+        app.extensions['upload_validator'] = self
+        if magic is None:
+            logger.info("python-magic is not installed; sniffing uploads by file signature")
+
+    def _get_executor(self):
+        """Create the pool on first use so each worker process gets its own"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='upload-validator')
+                self._pid = os.getpid()
+        return self._executor
+
+    def submit_verification(self, verification_id):
+        """Validate a verification request's documents in the background"""
+        future = self._get_executor().submit(self.validate_verification, verification_id)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def resume_pending(self):
+        """Queue requests a previous process accepted but never validated.
+
+        Every worker calls this at startup; each request is claimed first,
+        so only one of them validates it.
+        """
+        for verification_id in Verification.get_pending_validation():
+            if JobClaim.claim('upload-validation', verification_id):
+                self.submit_verification(verification_id)
+
+    @staticmethod
+    def _log_failure(future):
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Upload validation failed: {error!r}")
+
+    def mime_type_of(self, document):
+        """Sniffed MIME type of a stored document, kept on the document"""
+        if document.mime_type:
+            return document.mime_type
+        with open(os.path.join(self.root, document.path), 'rb') as f:
+            mime_type = sniff_mime_type(f.read(self.sniff_bytes))
+        if document.id is not None:
+            Verification.set_document_mime_type(document.id, mime_type)
+        return mime_type
+
+    def validate_verification(self, verification_id):
+        verification = Verification.get_by_id(verification_id)
+        if verification is None:
+            return None
+        problems = []
+        for document in verification.get_documents():
+            # Older documents only have the extension in their name
+            extension = document.extension or (document.original_name or document.path).rsplit('.', 1)[-1].lower()
+            expected = EXTENSION_MIME_TYPES.get(extension)
+            try:
+                mime_type = self.mime_type_of(document)
+            except OSError as e:
+                problems.append(f"{document.document_type}: file could not be read ({e.strerror})")
+                continue
+            if mime_type != expected:
+                problems.append(f"{document.document_type}: a .{extension} file containing {mime_type}")
+
+        status = 'rejected' if problems else 'validated'
+        Verification.set_validation(verification_id, status, '; '.join(problems) or None)
+        logger.info(f"Verification {verification_id} documents {status}"
+                    + (f": {'; '.join(problems)}" if problems else ''))
+        return status
+
+# Global upload validator, configured in create_app
+upload_validator = UploadValidator()
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import logging
+from flask import Request, current_app, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+from ..models.upload import Upload
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+DOCUMENT_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
+
+# Temp files live inside UPLOAD_FOLDER so the final rename never crosses filesystems
+INCOMING_DIR = '.incoming'
+# Stored files: objects/ab/cd/<sha256>, named by content alone since the same
+# bytes may be uploaded under several names; two levels of 256 directories keep
+# each directory small even with millions of files
+OBJECTS_DIR = 'objects'
+
+def upload_url(path):
+    """URL a stored upload is served at, from its path under UPLOAD_FOLDER"""
+    return url_for('uploads.serve', path=path)
+
+class UploadRejected(Exception):
+    """Raised when an uploaded file is not accepted (type, name or size)"""
+
+class IncomingFile:
+    """Upload being received, written straight to a temp file.
+
+    The form parser writes each chunk here as it arrives, so memory use does
+    not grow with the file and a file over the limit is abandoned as soon
+    as it crosses it. The content hash is computed along the way. The temp file is removed when the request closes
+    unless UploadStore.save() has moved it into place.
+    """
+
+    def __init__(self, directory, limit):
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='upload-')
+        self._file = os.fdopen(fd, 'w+b')
+        self.limit = limit
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.started = time.perf_counter()
+        self.stored = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.limit and self.size > self.limit:
+            self.close()
+            raise RequestEntityTooLarge(f'Each file must be at most {self.limit // (1024 * 1024)} MB.')
+        self.sha256.update(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def close(self):
+        self._file.close()
+        if not self.stored:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+class UploadRequest(Request):
+    """Request that streams uploaded files to disk under UPLOAD_FOLDER"""
+
+    # Plain (non-file) form fields are held in memory; keep them small
+    max_form_memory_size = 512 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        store = current_app.extensions['uploads']
+        return IncomingFile(store.incoming_dir(), store.max_file_size)
+
+class UploadStore:
+    """Content-addressed store for uploaded files under UPLOAD_FOLDER.
+
+    A file is stored once per distinct content, at a path derived from its
+    SHA-256, and the uploads table counts the records that reference it.
+    New content is fsynced and renamed into place atomically, so a reader
+    never sees a partial file and a crash leaves at most a stray temp file
+    in UPLOAD_FOLDER/.incoming (cleared at startup). Each stored upload is
+    logged with its size and throughput.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.max_file_size = 8 * 1024 * 1024
+
+    def init_app(self, app):
+        self.root = app.config['UPLOAD_FOLDER']
+        self.max_file_size = app.config.get('UPLOAD_MAX_FILE_SIZE', self.max_file_size)
+        app.request_class = UploadRequest
+        app.add_template_global(upload_url)
+        app.extensions['uploads'] = self
+        self._clear_incoming()
+
+    def incoming_dir(self):
+        path = os.path.join(self.root, INCOMING_DIR)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _clear_incoming(self):
+        path = os.path.join(self.root, INCOMING_DIR)
+        # Leftovers of interrupted uploads; skip files a live process may still be writing
+        cutoff = time.time() - 3600
+        try:
+            entries = list(os.scandir(path))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def save(self, file_storage, allowed_extensions):
+        """Store an uploaded file and take a reference to it; returns the Upload.
+
+        Upload.path is relative to UPLOAD_FOLDER and Upload.extension is the
+        one this file was uploaded with, for the referencing record to keep.
+        Call release() when that record goes away or points elsewhere.
+        """
+        filename = secure_filename(file_storage.filename or '')
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if extension not in allowed_extensions:
+            raise UploadRejected(f"Files of type '.{extension}' are not allowed. "
+                                 f"Allowed: {', '.join(sorted(allowed_extensions))}")
+
+        incoming = file_storage.stream
+        if not isinstance(incoming, IncomingFile):
+            # Parsed by something other than UploadRequest: copy it to disk under the same limit
+            incoming = IncomingFile(self.incoming_dir(), self.max_file_size)
+            try:
+                shutil.copyfileobj(file_storage.stream, incoming, 64 * 1024)
+            except RequestEntityTooLarge as e:
+                raise UploadRejected(e.description)
+        return self._store(incoming, extension)
+
+    def save_bytes(self, data, extension):
+        """Store generated content (e.g. a thumbnail) and take a reference to it"""
+        incoming = IncomingFile(self.incoming_dir(), None)
+        incoming.write(data)
+        return self._store(incoming, extension)
+
+    def _store(self, incoming, extension):
+        digest = incoming.sha256.hexdigest()
+        # Flushed before taking the database lock, which place() runs under
+        incoming.flush()
+        os.fsync(incoming.fileno())
+        written = []
+
+        def place(relative_path):
+            path = os.path.join(self.root, relative_path)
+            if os.path.exists(path):
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(incoming.path, path)
+            incoming.stored = True
+            written.append(path)
+
+        try:
+            upload = Upload.reference(digest, f"{OBJECTS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}",
+                                      incoming.size, place)
+            upload.extension = extension
+        finally:
+            # Drops the temp file unless it was moved into place
+            incoming.close()
+        if written:
+            self._fsync_dir(os.path.dirname(written[0]))
+
+        elapsed = time.perf_counter() - incoming.started
+        rate = incoming.size / elapsed / (1024 * 1024) if elapsed else 0.0
+        outcome = 'stored' if written else 'deduplicated'
+        logger.info(f"Upload {upload.path} {outcome}: {incoming.size} bytes in {elapsed * 1000:.1f}ms "
+                    f"({rate:.1f} MB/s), {upload.ref_count} reference(s)")
+        return upload
+
+    def release(self, upload):
+        """Drop one reference to an Upload (or its path); the file goes with the last one"""
+        if isinstance(upload, str):
+            upload = Upload.get_by_path(upload)
+        if upload is None:
+            return
+
+        def remove(relative_path):
+            try:
+                os.unlink(os.path.join(self.root, relative_path))
+            except FileNotFoundError:
+                pass
+
+        Upload.release(upload.id, remove)
+
+    @staticmethod
+    def _fsync_dir(directory):
+        # Make the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+# Global upload store, configured in create_app
+upload_store = UploadStore()
@@ -0,0 +1,76 @@
+"""Small helpers shared by the benchmark scripts (stdlib only)."""
+import http.client
+import math
+import threading
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+class HttpClient:
+    """Keep-alive HTTP client that remembers cookies, like a browser tab"""
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.cookies = {}
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # Server closed the keep-alive connection; retry once on a new one
+                self.close()
+                if attempt:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for key, morsel in cookie.items():
+                self.cookies[key] = morsel.value
+        if response.getheader('Connection', '').lower() == 'close':
+            self.close()
+        self.last_headers = response.headers
+        return response.status, data
+
+    def get(self, path, headers=None):
+        return self.request('GET', path, headers=headers)
+
+    def post(self, path, form, headers=None):
+        headers = dict(headers or {})
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        return self.request('POST', path, body=urlencode(form), headers=headers)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+def start_server(app, host='127.0.0.1', port=0, **adjustments):
+    """Run the app under waitress in a background thread; returns (server, port)"""
+    from waitress.server import create_server
+    server = create_server(app, host=host, port=port, **adjustments)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    return server, server.effective_port
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(int(math.ceil(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[rank]
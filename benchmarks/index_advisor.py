@@ -0,0 +1,340 @@
+"""Offline index advisor driven by observed query shapes.
+
+Replays query shapes against a copy of the database, tries candidate
+indexes (including covering ones) for each shape, and reports which ones
+change the plan and how much faster each query gets, ranked by the total
+time they would save. Prints a migration with the winning indexes. The
+original database is never modified.
+
+Shapes come from the SQL profiler (save the output of /admin/queries
+as JSON), from a text file with one statement per line, or by default
+from a built-in list of the queries the models issue.
+
+    python benchmarks/index_advisor.py --db community_helper.db
+    python benchmarks/index_advisor.py --db prod-copy.db --shapes queries.json --sql-out migration.sql
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.query_profiler import analyze_plan, normalize
+
+# Read queries the models issue, used when no recorded shapes are given
+DEFAULT_SHAPES = [
+    'SELECT * FROM service_requests WHERE user_id = ? ORDER BY created_at DESC',
+    'SELECT * FROM service_requests WHERE helper_id = ? ORDER BY created_at DESC',
+    'SELECT * FROM service_requests WHERE status = ? ORDER BY created_at DESC',
+    "SELECT * FROM service_requests WHERE status = ? AND (helper_id IS NULL OR helper_id != ?) ORDER BY created_at DESC",
+    'SELECT COUNT(*) as count FROM service_requests WHERE user_id = ? AND status IN (?)',
+    'SELECT COUNT(*) as count FROM service_requests WHERE helper_id = ? AND status IN (?)',
+    'SELECT * FROM helpers WHERE user_id = ?',
+    'SELECT * FROM feedback WHERE helper_id = ? ORDER BY created_at DESC',
+    'SELECT * FROM feedback WHERE service_request_id = ?',
+    'SELECT * FROM verifications WHERE helper_id = ? ORDER BY created_at DESC',
+    'SELECT * FROM verifications WHERE status = ? ORDER BY created_at ASC LIMIT ?',
+    'SELECT COUNT(*) as count FROM verifications WHERE status = ?',
+    'SELECT v.* FROM verifications v JOIN helpers h ON v.helper_id = h.id JOIN users u ON h.user_id = u.id '
+    'WHERE v.status = ? ORDER BY v.created_at DESC LIMIT ? OFFSET ?',
+    'SELECT * FROM complaints WHERE helper_id = ? ORDER BY created_at DESC',
+    'SELECT * FROM complaints WHERE status = ? ORDER BY created_at ASC',
+]
+
+_KEYWORDS = {'WHERE', 'JOIN', 'ON', 'ORDER', 'GROUP', 'LIMIT', 'LEFT', 'INNER', 'CROSS', 'USING', 'AS', 'SET'}
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN|UPDATE)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_EQUALITY = re.compile(r'(?:(\w+)\.)?(\w+)\s*(?:=|\bIN\s*\()\s*\?', re.IGNORECASE)
+_RANGE = re.compile(r'(?:(\w+)\.)?(\w+)\s*(?:<=|>=|<|>|\bBETWEEN\b)\s*\?', re.IGNORECASE)
+_JOIN_ON = re.compile(r'(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)')
+_ORDER_BY = re.compile(r'\bORDER BY\s+(.+?)(?:\s+LIMIT\b|$)', re.IGNORECASE)
+_SELECT_LIST = re.compile(r'^\s*SELECT\s+(.+?)\s+FROM\b', re.IGNORECASE)
+_PARAM_CONTEXT = re.compile(r'(?:(\w+)\.)?(\w+)\s*(?:=|!=|<>|<=|>=|<|>|\bLIKE|\bIN\s*\()\s*$', re.IGNORECASE)
+
+class Schema:
+    """Columns and existing indexes of the database copy"""
+
+    def __init__(self, conn):
+        self.columns = {}
+        self.indexes = {}
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        for table in tables:
+            self.columns[table] = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+            self.indexes[table] = []
+            for index in conn.execute(f'PRAGMA index_list("{table}")'):
+                cols = [row[2] for row in conn.execute(f'PRAGMA index_info("{index[1]}")')]
+                self.indexes[table].append(tuple(cols))
+
+    def covered(self, table, cols):
+        """True if an existing index (or the rowid) already starts with cols"""
+        if tuple(cols) == ('id',):
+            return True
+        return any(index[:len(cols)] == tuple(cols) for index in self.indexes.get(table, []))
+
+class Shape:
+    """One query shape with the tables and columns it filters, joins and sorts on"""
+
+    def __init__(self, sql, count, schema):
+        self.sql = sql
+        self.count = count
+        self.aliases = {}
+        for table, alias in _TABLE_REF.findall(sql):
+            if table in schema.columns:
+                self.aliases[table] = table
+                if alias and alias.upper() not in _KEYWORDS:
+                    self.aliases[alias] = table
+        self.schema = schema
+
+    @property
+    def tables(self):
+        return sorted(set(self.aliases.values()))
+
+    def resolve(self, qualifier, column):
+        """Table a (possibly qualified) column belongs to"""
+        if qualifier:
+            return self.aliases.get(qualifier)
+        for table in self.tables:
+            if column in self.schema.columns[table]:
+                return table
+        return None
+
+    def _columns(self, pattern, text):
+        found = []
+        for qualifier, column in pattern.findall(text):
+            table = self.resolve(qualifier, column)
+            if table and (table, column) not in found:
+                found.append((table, column))
+        return found
+
+    def candidates(self):
+        """Candidate index column lists per table, most specific first"""
+        where = self.sql
+        order_match = _ORDER_BY.search(self.sql)
+        if order_match:
+            where = self.sql[:order_match.start()]
+        equality = self._columns(_EQUALITY, where)
+        ranges = self._columns(_RANGE, where)
+        order = []
+        if order_match:
+            for term in order_match.group(1).split(','):
+                parts = term.strip().split()
+                qualifier, _, column = parts[0].rpartition('.')
+                table = self.resolve(qualifier, column)
+                if table:
+                    order.append((table, column))
+        joins = []
+        for left_alias, left_col, right_alias, right_col in _JOIN_ON.findall(self.sql):
+            for alias, column in ((left_alias, left_col), (right_alias, right_col)):
+                table = self.aliases.get(alias)
+                if table:
+                    joins.append((table, column))
+
+        selected = self._selected_columns()
+        candidates = []
+        for table in self.tables:
+            eq = [c for t, c in equality if t == table]
+            rng = [c for t, c in ranges if t == table][:1]
+            sort = [c for t, c in order if t == table] if all(t == table for t, _ in order) else []
+            join = [c for t, c in joins if t == table]
+            options = [eq + sort, eq + rng, eq] + [eq + [c] for c in join if c not in eq]
+            cover = [c for c in selected.get(table, []) if c not in eq + sort]
+            if cover and eq:
+                options.append(eq + sort + cover)
+            for cols in options:
+                cols = list(dict.fromkeys(cols))
+                if cols and not self.schema.covered(table, cols) and (table, cols) not in candidates:
+                    candidates.append((table, cols))
+        return candidates
+
+    def _selected_columns(self):
+        match = _SELECT_LIST.search(self.sql)
+        if not match or '*' in match.group(1):
+            return {}
+        selected = {}
+        for term in match.group(1).split(','):
+            name = term.strip().split()[0]
+            qualifier, _, column = name.rpartition('.')
+            table = self.resolve(qualifier, column)
+            if table:
+                selected.setdefault(table, []).append(column)
+        return selected
+
+    def parameters(self, conn):
+        """Realistic values for the shape's placeholders, sampled from the data"""
+        values = []
+        for match in re.finditer(r'\?', self.sql):
+            before = self.sql[:match.start()]
+            if re.search(r'\bLIMIT\s*$', before, re.IGNORECASE):
+                values.append(50)
+                continue
+            if re.search(r'\bOFFSET\s*$', before, re.IGNORECASE):
+                values.append(0)
+                continue
+            context = _PARAM_CONTEXT.search(before)
+            table = self.resolve(*context.groups()) if context else None
+            value = None
+            if table:
+                column = context.group(2)
+                # The most common value is the worst realistic case for a filter
+                row = conn.execute(
+                    f'SELECT "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL '
+                    f'GROUP BY "{column}" ORDER BY COUNT(*) DESC LIMIT 1').fetchone()
+                value = row[0] if row else None
+            values.append(value)
+        return values
+
+def plan_of(conn, sql, params):
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+def time_query(conn, sql, params, runs):
+    conn.execute(sql, params).fetchall()  # warm the page cache
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def index_name(table, cols):
+    return f"idx_{table}_{'_'.join(cols)}"
+
+def evaluate(conn, shape, runs, min_speedup):
+    """Baseline and per-candidate timings for one shape; returns the result dict"""
+    params = shape.parameters(conn)
+    baseline_plan = plan_of(conn, shape.sql, params)
+    baseline = time_query(conn, shape.sql, params, runs)
+    result = {
+        'shape': shape.sql,
+        'count': shape.count,
+        'baseline_ms': round(baseline * 1000, 4),
+        'baseline_plan': baseline_plan,
+        **analyze_plan(baseline_plan),
+        'candidates': [],
+        'best': None,
+    }
+    for table, cols in shape.candidates():
+        name = index_name(table, cols)
+        conn.execute(f'CREATE INDEX "{name}" ON "{table}" ({", ".join(cols)})')
+        try:
+            conn.execute('ANALYZE')
+            plan = plan_of(conn, shape.sql, params)
+            used = any(name in detail for detail in plan)
+            seconds = time_query(conn, shape.sql, params, runs) if used else baseline
+        finally:
+            conn.execute(f'DROP INDEX "{name}"')
+        candidate = {
+            'table': table,
+            'columns': cols,
+            'used': used,
+            'ms': round(seconds * 1000, 4),
+            'speedup': round(baseline / seconds, 2) if seconds else None,
+            'plan': plan,
+        }
+        result['candidates'].append(candidate)
+        if used and seconds and baseline / seconds >= min_speedup:
+            best = result['best']
+            if best is None or seconds < best['ms'] / 1000 or (
+                    seconds * 1000 <= best['ms'] * 1.05 and len(cols) < len(best['columns'])):
+                result['best'] = candidate
+    conn.execute('ANALYZE')
+    if result['best']:
+        result['saved_ms_total'] = round((baseline - result['best']['ms'] / 1000) * shape.count * 1000, 3)
+    return result
+
+def rank(results):
+    """Winning indexes across all shapes, biggest total saving first"""
+    suggestions = {}
+    for result in results:
+        best = result['best']
+        if not best:
+            continue
+        key = (best['table'], tuple(best['columns']))
+        entry = suggestions.setdefault(key, {
+            'table': best['table'],
+            'columns': best['columns'],
+            'sql': f"CREATE INDEX IF NOT EXISTS {index_name(best['table'], best['columns'])} "
+                   f"ON {best['table']} ({', '.join(best['columns'])});",
+            'saved_ms_total': 0.0,
+            'shapes': [],
+        })
+        entry['saved_ms_total'] = round(entry['saved_ms_total'] + result['saved_ms_total'], 3)
+        entry['shapes'].append({'shape': result['shape'], 'speedup': best['speedup'],
+                                'baseline_ms': result['baseline_ms'], 'indexed_ms': best['ms']})
+    # An index whose columns are a prefix of another suggestion on the same table is redundant
+    ranked = []
+    for (table, cols), entry in suggestions.items():
+        wider = [other for (t, c), other in suggestions.items()
+                 if t == table and len(c) > len(cols) and c[:len(cols)] == cols]
+        if wider:
+            wider[0]['shapes'].extend(entry['shapes'])
+            wider[0]['saved_ms_total'] = round(wider[0]['saved_ms_total'] + entry['saved_ms_total'], 3)
+            continue
+        ranked.append(entry)
+    return sorted(ranked, key=lambda e: e['saved_ms_total'], reverse=True)
+
+def load_shapes(path):
+    if not path:
+        return [(normalize(sql), 1) for sql in DEFAULT_SHAPES]
+    with open(path) as f:
+        text = f.read()
+    if path.endswith('.json'):
+        data = json.loads(text)
+        entries = data['shapes'] if isinstance(data, dict) else data
+        return [(entry['shape'], entry.get('count', 1)) if isinstance(entry, dict) else (entry, 1)
+                for entry in entries]
+    return [(normalize(line), 1) for line in text.splitlines() if line.strip() and not line.startswith('#')]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', required=True, help='database to analyse (a copy is used)')
+    parser.add_argument('--shapes', help='/admin/queries JSON or a file with one statement per line')
+    parser.add_argument('--runs', type=int, default=20, help='timed runs per query')
+    parser.add_argument('--min-speedup', type=float, default=1.2)
+    parser.add_argument('--sql-out', help='write the migration to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        copy_path = os.path.join(tmp_dir, 'advisor.db')
+        source = sqlite3.connect(args.db)
+        target = sqlite3.connect(copy_path)
+        source.backup(target)
+        source.close()
+        conn = target
+        conn.execute('ANALYZE')
+        schema = Schema(conn)
+
+        small = {t: n for t in schema.columns
+                 for n in [conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0]] if n < 1000}
+        if small:
+            print(f"warning: few rows in {', '.join(sorted(small))}; timings will understate the gains",
+                  file=sys.stderr)
+
+        results = []
+        for sql, count in load_shapes(args.shapes):
+            if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                continue
+            shape = Shape(sql, count, schema)
+            if not shape.tables:
+                continue
+            try:
+                results.append(evaluate(conn, shape, args.runs, args.min_speedup))
+            except sqlite3.Error as e:
+                print(f"skipping {sql!r}: {e}", file=sys.stderr)
+        conn.close()
+
+    suggestions = rank(results)
+    migration = '\n'.join(['-- Suggested by benchmarks/index_advisor.py'] + [s['sql'] for s in suggestions]) + '\n'
+    if args.sql_out:
+        with open(args.sql_out, 'w') as f:
+            f.write(migration)
+
+    print(json.dumps({'suggestions': suggestions, 'shapes': results, 'migration': migration}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Rate limiter overhead: in-memory vs. shared SQLite storage.
+
+Measures the cost of one fixed-window hit at the storage level, the same
+across several processes sharing one SQLite file (checking that the combined
+count is exact), and the extra latency the limiter adds to a real request.
+
+    python benchmarks/limiter_overhead.py --hits 20000 --processes 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.http_client import percentile
+
+def _limiter_for(uri):
+    from limits import parse
+    from limits.storage import storage_from_string
+    from limits.strategies import FixedWindowRateLimiter
+    import app.rate_limit_storage  # noqa: F401  registers sqlite://
+    return FixedWindowRateLimiter(storage_from_string(uri)), parse('1000000 per hour')
+
+def storage_hits(uri, hits, keys):
+    """Microseconds per hit, cycling over `keys` distinct client keys"""
+    limiter, item = _limiter_for(uri)
+    start = time.perf_counter()
+    for i in range(hits):
+        limiter.hit(item, f'client-{i % keys}')
+    return (time.perf_counter() - start) / hits * 1e6
+
+def _worker(uri, hits, queue):
+    limiter, item = _limiter_for(uri)
+    start = time.perf_counter()
+    for _ in range(hits):
+        limiter.hit(item, 'shared-client')
+    queue.put(time.perf_counter() - start)
+
+def multiprocess_hits(uri, hits, processes):
+    queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_worker, args=(uri, hits, queue)) for _ in range(processes)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    wall = time.perf_counter() - start
+    limiter, item = _limiter_for(uri)
+    _, remaining = limiter.get_window_stats(item, 'shared-client')[:2]
+    return {
+        'processes': processes,
+        'hits_per_sec': round(hits * processes / wall),
+        'counted': item.amount - remaining,
+        'expected': hits * processes,
+    }
+
+def request_overhead(tmp_dir, uri, requests):
+    """Median latency of GET /auth/login with the limiter on, minus with it off"""
+    from config.default import Config
+    from app import create_app
+
+    def median_latency(enabled):
+        class BenchConfig(Config):
+            DATABASE_PATH = os.path.join(tmp_dir, 'bench.db')
+            RATELIMIT_ENABLED = enabled
+            RATELIMIT_STORAGE_URI = uri
+        client = create_app(BenchConfig).test_client()
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.get('/auth/login')
+            samples.append((time.perf_counter() - start) * 1e6)
+        return percentile(samples, 50)
+
+    return round(median_latency(True) - median_latency(False), 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hits', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=1000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sqlite_uri = 'sqlite:///' + os.path.join(tmp_dir, 'ratelimit.db')
+        results = {
+            'storage_us_per_hit': {
+                'memory': round(storage_hits('memory://', args.hits, args.keys), 2),
+                'sqlite': round(storage_hits(sqlite_uri, args.hits, args.keys), 2),
+            },
+            'sqlite_multiprocess': multiprocess_hits(sqlite_uri, args.hits // args.processes, args.processes),
+            'request_overhead_us': {
+                'memory': request_overhead(tmp_dir, 'memory://', args.requests),
+                'sqlite': request_overhead(tmp_dir, sqlite_uri, args.requests),
+            },
+        }
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+"""End-to-end load test: a realistic mix of users, helpers and admins.
+
+Seeds a throwaway database (scaled with --scale), starts the app under
+waitress in this process and runs one keep-alive client per simulated
+person, logged in before the clock starts. Users browse their dashboard and requests, post new requests and
+leave feedback; helpers browse and take open requests through
+accept -> start -> complete; admins page through the admin listings.
+Reports throughput, latency percentiles and error rates per route.
+
+A response counts as an error when its status is 400 or above, or when it
+redirects to the login page (the session was lost).
+
+    python benchmarks/loadtest.py --scale 2 --users 8 --helpers 4 --admins 1 --duration 30
+"""
+import argparse
+import collections
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.http_client import HttpClient, percentile, start_server
+
+PASSWORD = 'password123'
+CATEGORIES = ['Home Repair', 'Technology', 'Transportation', 'Cleaning', 'Cooking', 'Gardening']
+
+# Relative weights of the actions each kind of client picks from
+USER_MIX = [('dashboard', 4), ('my_requests', 2), ('view_request', 3), ('find_helpers', 1),
+            ('new_request', 2), ('feedback', 1)]
+HELPER_MIX = [('dashboard', 4), ('requests', 3), ('view_request', 2), ('take_job', 2)]
+ADMIN_MIX = [('users', 1), ('helpers', 1), ('requests', 1), ('verifications', 1),
+             ('complaints', 1), ('feedback', 1)]
+
+def make_app(tmp_dir, args):
+    from config.default import Config
+    from app import create_app
+
+    class BenchConfig(Config):
+        DATABASE_PATH = os.path.join(tmp_dir, 'bench.db')
+        UPLOAD_FOLDER = os.path.join(tmp_dir, 'uploads')
+        LOG_FILE = os.path.join(tmp_dir, 'app.log')
+        WTF_CSRF_ENABLED = False
+        RATELIMIT_ENABLED = False
+        LOGIN_SHIELD_ENABLED = False
+        DB_MAX_CONNECTIONS = max(args.threads, 10)
+
+    return create_app(BenchConfig)
+
+def seed(db_path, scale):
+    """Create the schema and fill it; returns the ids the clients work with.
+
+    Per unit of scale: 200 users, 40 verified helpers, 2000 service requests
+    (half open, a fifth assigned, the rest completed), feedback on half of the
+    completed ones, one verification per helper and a few complaints.
+    """
+    from config.default import Config
+    from werkzeug.security import generate_password_hash
+    from app.models.database import init_db, set_database_path
+
+    set_database_path(db_path)
+    init_db()
+
+    rng = random.Random(42)
+    password_hash = generate_password_hash(PASSWORD, Config.PASSWORD_HASH_METHOD)
+    user_count, helper_count, request_count = 200 * scale, 40 * scale, 2000 * scale
+
+    conn = sqlite3.connect(db_path)
+    try:
+        # No limits, so clients never stall on max_active_requests / max_active_jobs
+        conn.executemany('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
+                         [('max_active_requests', '0'), ('max_active_jobs', '0')])
+
+        conn.executemany(
+            'INSERT INTO users (email, name, password_hash, user_type) VALUES (?, ?, ?, ?)',
+            [(f'user{i}@load.test', f'Load User {i}', password_hash, 'user') for i in range(user_count)]
+            + [(f'helper{i}@load.test', f'Load Helper {i}', password_hash, 'helper') for i in range(helper_count)]
+            + [(f'admin{i}@load.test', f'Load Admin {i}', password_hash, 'admin') for i in range(4)])
+        user_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM users WHERE user_type = 'user' ORDER BY id")]
+        helper_user_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM users WHERE user_type = 'helper' ORDER BY id")]
+        admin_user_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM users WHERE user_type = 'admin' ORDER BY id")]
+
+        conn.executemany(
+            'INSERT INTO helpers (user_id, skills, experience, availability, verified) VALUES (?, ?, ?, ?, 1)',
+            [(uid, ', '.join(rng.sample(CATEGORIES, 2)), '3 years', 'Weekends') for uid in helper_user_ids])
+        conn.executemany('INSERT INTO admins (user_id) VALUES (?)', [(uid,) for uid in admin_user_ids])
+        helper_ids = [row[0] for row in conn.execute('SELECT id FROM helpers ORDER BY id')]
+
+        requests = []
+        for i in range(request_count):
+            roll = rng.random()
+            status = 'open' if roll < 0.5 else ('assigned' if roll < 0.7 else 'completed')
+            helper_id = None if status == 'open' else rng.choice(helper_ids)
+            requests.append((rng.choice(user_ids), helper_id, rng.choice(CATEGORIES),
+                             f'Seeded request {i}', 'Seeded by the load test.', status))
+        conn.executemany(
+            'INSERT INTO service_requests (user_id, helper_id, category, title, description, status) '
+            'VALUES (?, ?, ?, ?, ?, ?)', requests)
+
+        completed = conn.execute(
+            "SELECT id, user_id, helper_id FROM service_requests WHERE status = 'completed' ORDER BY id").fetchall()
+        rated, unrated = completed[::2], completed[1::2]
+        conn.executemany(
+            'INSERT INTO feedback (user_id, helper_id, service_request_id, rating, review) VALUES (?, ?, ?, ?, ?)',
+            [(uid, hid, rid, rng.randint(1, 5), 'Seeded review') for rid, uid, hid in rated])
+        conn.executemany(
+            'INSERT INTO verifications (helper_id, document_type, document_path, status) VALUES (?, ?, ?, ?)',
+            [(hid, 'ID', f'seed/{hid}.pdf', rng.choice(['Pending', 'Verified'])) for hid in helper_ids])
+        conn.executemany(
+            'INSERT INTO complaints (user_id, helper_id, service_request_id, description) VALUES (?, ?, ?, ?)',
+            [(uid, hid, rid, 'Seeded complaint') for rid, uid, hid in rated[:10 * scale]])
+        conn.commit()
+
+        open_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM service_requests WHERE status = 'open' ORDER BY id")]
+        requests_by_user = collections.defaultdict(list)
+        for rid, uid in conn.execute('SELECT id, user_id FROM service_requests ORDER BY id'):
+            requests_by_user[uid].append(rid)
+    finally:
+        conn.close()
+
+    unrated_by_user = collections.defaultdict(list)
+    for rid, uid, _ in unrated:
+        unrated_by_user[uid].append(rid)
+    return {
+        'user_ids': user_ids,
+        'helper_ids': helper_ids,
+        'open_ids': open_ids,
+        'unrated_by_user': unrated_by_user,
+        'requests_by_user': requests_by_user,
+        'counts': {'users': user_count, 'helpers': helper_count, 'service_requests': request_count,
+                   'feedback': len(rated), 'complaints': min(len(rated), 10 * scale)},
+    }
+
+class Recorder:
+    """Latency samples and error counts per route, for one client thread"""
+
+    def __init__(self):
+        self.samples = collections.defaultdict(list)
+        self.errors = collections.Counter()
+
+    def call(self, client, label, method, path, form=None):
+        start = time.perf_counter()
+        if method == 'POST':
+            status, body = client.post(path, form or {})
+        else:
+            status, body = client.get(path)
+        self.samples[label].append((time.perf_counter() - start) * 1000)
+        location = client.last_headers.get('Location', '') if status in (301, 302, 303) else ''
+        if status >= 400 or '/auth/login' in location:
+            self.errors[label] += 1
+        return status, location
+
+def _id_from(location):
+    try:
+        return int(location.rstrip('/').rsplit('/', 1)[-1])
+    except ValueError:
+        return None
+
+def login(port, email):
+    client = HttpClient('127.0.0.1', port)
+    status, _ = client.post('/auth/login', {'email': email, 'password': PASSWORD})
+    location = client.last_headers.get('Location', '')
+    if status != 302 or '/auth/login' in location:
+        raise RuntimeError(f'could not log in as {email} (status {status})')
+    return client
+
+def _choose(rng, mix):
+    return rng.choices([name for name, _ in mix], weights=[weight for _, weight in mix])[0]
+
+def run_user(client, index, data, shared, stop, recorder):
+    rng = random.Random(index)
+    user_id = data['user_ids'][index]
+    mine = list(data['unrated_by_user'].get(user_id, []))
+    known = list(data['requests_by_user'].get(user_id, []))
+    while not stop.is_set():
+        action = _choose(rng, USER_MIX)
+        if action == 'dashboard':
+            recorder.call(client, 'GET /user/dashboard', 'GET', '/user/dashboard')
+        elif action == 'my_requests':
+            recorder.call(client, 'GET /user/my-requests', 'GET', '/user/my-requests')
+        elif action == 'view_request' and known:
+            recorder.call(client, 'GET /user/request/<id>', 'GET', f'/user/request/{rng.choice(known)}')
+        elif action == 'find_helpers':
+            recorder.call(client, 'GET /user/find-helpers', 'GET', '/user/find-helpers')
+        elif action == 'new_request':
+            recorder.call(client, 'GET /user/request/new', 'GET', '/user/request/new')
+            status, location = recorder.call(client, 'POST /user/request/new', 'POST', '/user/request/new', {
+                'title': f'Load test request {rng.randrange(10 ** 6)}',
+                'category': rng.choice(CATEGORIES),
+                'description': 'Created by the load test.',
+            })
+            request_id = _id_from(location) if status == 302 else None
+            if request_id is not None:
+                known.append(request_id)
+                shared['open_ids'].append(request_id)
+        elif action == 'feedback' and mine:
+            request_id = mine.pop()
+            path = f'/user/request/{request_id}/feedback'
+            recorder.call(client, 'GET /user/request/<id>/feedback', 'GET', path)
+            recorder.call(client, 'POST /user/request/<id>/feedback', 'POST', path,
+                          {'rating': str(rng.randint(1, 5)), 'review': 'Left by the load test.'})
+
+def run_helper(client, index, data, shared, stop, recorder):
+    rng = random.Random(1000 + index)
+    while not stop.is_set():
+        action = _choose(rng, HELPER_MIX)
+        if action == 'dashboard':
+            recorder.call(client, 'GET /helper/dashboard', 'GET', '/helper/dashboard')
+        elif action == 'requests':
+            recorder.call(client, 'GET /helper/requests', 'GET', '/helper/requests')
+        elif action == 'view_request':
+            recorder.call(client, 'GET /helper/request/<id>', 'GET',
+                          f'/helper/request/{rng.choice(data["open_ids"])}')
+        elif action == 'take_job':
+            try:
+                request_id = shared['open_ids'].popleft()
+            except IndexError:
+                continue
+            base = f'/helper/request/{request_id}'
+            status, location = recorder.call(client, 'POST /helper/request/<id>/accept', 'POST', base + '/accept')
+            # Another helper took it first
+            if not location.endswith('/helper/dashboard'):
+                continue
+            recorder.call(client, 'POST /helper/request/<id>/start', 'POST', base + '/start')
+            recorder.call(client, 'POST /helper/request/<id>/complete', 'POST', base + '/complete')
+            shared['completed'] += 1
+
+def run_admin(client, index, data, shared, stop, recorder):
+    rng = random.Random(2000 + index)
+    while not stop.is_set():
+        page = _choose(rng, ADMIN_MIX)
+        recorder.call(client, f'GET /admin/{page}', 'GET', f'/admin/{page}')
+
+def _client(target, *args):
+    try:
+        target(*args)
+    except Exception as e:
+        print(f'{target.__name__} stopped: {e}', file=sys.stderr)
+
+def summarize(recorders, duration):
+    samples = collections.defaultdict(list)
+    errors = collections.Counter()
+    for recorder in recorders:
+        for label, values in recorder.samples.items():
+            samples[label].extend(values)
+        errors.update(recorder.errors)
+
+    routes = {}
+    for label in sorted(samples):
+        values = samples[label]
+        routes[label] = {
+            'requests': len(values),
+            'errors': errors[label],
+            'error_rate': round(errors[label] / len(values), 4),
+            'rps': round(len(values) / duration, 2),
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+        }
+    everything = [value for values in samples.values() for value in values]
+    total_errors = sum(errors.values())
+    return routes, {
+        'requests': len(everything),
+        'errors': total_errors,
+        'error_rate': round(total_errors / len(everything), 4) if everything else 0.0,
+        'rps': round(len(everything) / duration, 2),
+        'p50_ms': round(percentile(everything, 50), 2),
+        'p95_ms': round(percentile(everything, 95), 2),
+        'p99_ms': round(percentile(everything, 99), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1, help='size of the seeded database')
+    parser.add_argument('--users', type=int, default=8, help='concurrent user clients')
+    parser.add_argument('--helpers', type=int, default=4, help='concurrent helper clients')
+    parser.add_argument('--admins', type=int, default=1, help='concurrent admin clients (at most 4)')
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--threads', type=int, default=8, help='waitress threads')
+    args = parser.parse_args()
+    args.users = min(args.users, 200 * args.scale)
+    args.helpers = min(args.helpers, 40 * args.scale)
+    args.admins = min(args.admins, 4)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data = seed(os.path.join(tmp_dir, 'bench.db'), args.scale)
+        app = make_app(tmp_dir, args)
+        server, port = start_server(app, threads=args.threads)
+        shared = {'open_ids': collections.deque(data['open_ids']), 'completed': 0}
+        stop = threading.Event()
+        recorders = []
+        threads = []
+        try:
+            # Log everyone in up front: logins are deliberately slow (password
+            # hashing) and are not part of the measured mix
+            for kind, count, target in (('user', args.users, run_user), ('helper', args.helpers, run_helper),
+                                        ('admin', args.admins, run_admin)):
+                for index in range(count):
+                    client = login(port, f'{kind}{index}@load.test')
+                    recorder = Recorder()
+                    recorders.append(recorder)
+                    threads.append(threading.Thread(target=_client, daemon=True,
+                                                    args=(target, client, index, data, shared, stop, recorder)))
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            time.sleep(args.duration)
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=30)
+            elapsed = time.perf_counter() - started
+        finally:
+            server.close()
+
+    routes, totals = summarize(recorders, elapsed)
+    print(json.dumps({
+        'benchmark': 'loadtest',
+        'config': vars(args),
+        'seeded': data['counts'],
+        'jobs_completed': shared['completed'],
+        'totals': totals,
+        'routes': routes,
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Login throughput vs. dashboard latency under a login burst.
+
+Starts the app under waitress on a throwaway database, keeps one logged-in
+user polling /user/dashboard, and measures dashboard latency first on its own
+and then while several clients hammer POST /auth/login.
+
+    python benchmarks/login_throughput.py --login-clients 8 --duration 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.http_client import HttpClient, percentile, start_server
+
+def make_app(tmp_dir, args):
+    from config.default import Config
+    from app import create_app
+
+    class BenchConfig(Config):
+        DATABASE_PATH = os.path.join(tmp_dir, 'bench.db')
+        UPLOAD_FOLDER = os.path.join(tmp_dir, 'uploads')
+        WTF_CSRF_ENABLED = False
+        RATELIMIT_ENABLED = False
+        LOGIN_SHIELD_ENABLED = False
+        PASSWORD_HASH_METHOD = args.hash_method
+        PASSWORD_HASH_WORKERS = args.hash_workers
+        PASSWORD_HASH_MAX_PENDING = args.hash_max_pending
+        PASSWORD_HASH_EXECUTOR = args.hash_executor
+
+    return create_app(BenchConfig)
+
+def seed_users(app, count):
+    from app.models.user import User
+    with app.app_context():
+        for i in range(count):
+            User.create(email=f'bench{i}@example.com', name=f'Bench {i}',
+                        password='password123', user_type='user')
+
+def poll_dashboard(port, stop, samples):
+    client = HttpClient('127.0.0.1', port)
+    client.post('/auth/login', {'email': 'bench0@example.com', 'password': 'password123'})
+    while not stop.is_set():
+        start = time.perf_counter()
+        status, _ = client.get('/user/dashboard')
+        samples.append((time.perf_counter() - start) * 1000)
+        if status != 200:
+            raise RuntimeError(f'dashboard returned {status}')
+        time.sleep(0.01)
+
+def hammer_login(port, stop, counts, index, user_count):
+    client = HttpClient('127.0.0.1', port)
+    email = f'bench{index % user_count}@example.com'
+    while not stop.is_set():
+        status, _ = client.post('/auth/login', {'email': email, 'password': 'password123'})
+        key = 'ok' if status == 302 else ('busy' if status == 503 else 'error')
+        counts[key] = counts.get(key, 0) + 1
+
+def run_phase(port, duration, login_clients, user_count):
+    stop = threading.Event()
+    dashboard = []
+    counts = [dict() for _ in range(login_clients)]
+    threads = [threading.Thread(target=poll_dashboard, args=(port, stop, dashboard), daemon=True)]
+    threads += [threading.Thread(target=hammer_login, args=(port, stop, counts[i], i, user_count), daemon=True)
+                for i in range(login_clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    totals = {}
+    for c in counts:
+        for key, value in c.items():
+            totals[key] = totals.get(key, 0) + value
+    return {
+        'login_clients': login_clients,
+        'logins_per_sec': round(totals.get('ok', 0) / duration, 2),
+        'logins_rejected_busy': totals.get('busy', 0),
+        'login_errors': totals.get('error', 0),
+        'dashboard_requests': len(dashboard),
+        'dashboard_p50_ms': round(percentile(dashboard, 50), 2),
+        'dashboard_p95_ms': round(percentile(dashboard, 95), 2),
+        'dashboard_p99_ms': round(percentile(dashboard, 99), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--login-clients', type=int, default=8)
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4, help='waitress threads')
+    parser.add_argument('--hash-method', default='pbkdf2:sha256:600000')
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--hash-max-pending', type=int, default=0, help='0: 4 x --hash-workers')
+    parser.add_argument('--hash-executor', default='thread', choices=['thread', 'process'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = make_app(tmp_dir, args)
+        seed_users(app, max(args.users, 1))
+        server, port = start_server(app, threads=args.threads)
+        try:
+            results = {
+                'config': vars(args),
+                'baseline': run_phase(port, args.duration / 2, 0, args.users),
+                'under_login_load': run_phase(port, args.duration, args.login_clients, args.users),
+            }
+        finally:
+            server.close()
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
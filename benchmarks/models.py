@@ -0,0 +1,86 @@
+"""Micro-benchmarks of the model layer's read methods.
+
+Seeds a throwaway database the way benchmarks/loadtest.py does and calls
+each model method in a tight loop for several timed rounds. Reports calls
+per second per method: the median, plus every round so that
+benchmarks/results.py can test differences between commits for
+significance.
+
+    python benchmarks/models.py --scale 1 --rounds 7 --round-seconds 0.5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import seed
+
+def cases(data):
+    """name -> zero-argument callable, drawing ids from the seeded data"""
+    from app.models.user import User
+    from app.models.helper import Helper
+    from app.models.service_request import ServiceRequest
+    from app.models.feedback import Feedback
+    from app.models.verification import Verification
+
+    rng = random.Random(7)
+    user_ids = data['user_ids']
+    helper_ids = data['helper_ids']
+    request_ids = list(range(1, data['counts']['service_requests'] + 1))
+    return {
+        'User.get_by_id': lambda: User.get_by_id(rng.choice(user_ids)),
+        'User.get_by_email': lambda: User.get_by_email(f'user{rng.randrange(len(user_ids))}@load.test'),
+        'Helper.get_by_id': lambda: Helper.get_by_id(rng.choice(helper_ids)),
+        'Helper.get_all': lambda: Helper.get_all(verified_only=True),
+        'ServiceRequest.get_by_id': lambda: ServiceRequest.get_by_id(rng.choice(request_ids)),
+        'ServiceRequest.get_by_user_id': lambda: ServiceRequest.get_by_user_id(rng.choice(user_ids)),
+        'ServiceRequest.get_by_helper_id': lambda: ServiceRequest.get_by_helper_id(rng.choice(helper_ids)),
+        'ServiceRequest.get_available_for_helper':
+            lambda: ServiceRequest.get_available_for_helper(rng.choice(helper_ids)),
+        'ServiceRequest.count_active_by_user': lambda: ServiceRequest.count_active_by_user(rng.choice(user_ids)),
+        'Feedback.get_by_helper_id': lambda: Feedback.get_by_helper_id(rng.choice(helper_ids)),
+        'Verification.get_by_status': lambda: Verification.get_by_status('Pending', limit=20),
+    }
+
+def run_round(call, seconds):
+    """Calls per second over one round of about `seconds`"""
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(10):
+            call()
+        calls += 10
+        now = time.perf_counter()
+        if now >= deadline:
+            return calls / (now - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1, help='size of the seeded database')
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--round-seconds', type=float, default=0.5)
+    parser.add_argument('--only', nargs='*', help='run only these methods')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data = seed(os.path.join(tmp_dir, 'bench.db'), args.scale)
+        methods = {}
+        for name, call in cases(data).items():
+            if args.only and name not in args.only:
+                continue
+            # One untimed round to warm the page cache and the statement cache
+            run_round(call, args.round_seconds)
+            rounds = [round(run_round(call, args.round_seconds), 1) for _ in range(args.rounds)]
+            methods[name] = {'ops_per_sec': round(statistics.median(rounds), 1), 'rounds': rounds}
+
+    print(json.dumps({'benchmark': 'models', 'config': vars(args), 'methods': methods}, indent=2))
+
+if __name__ == '__main__':
+    main()
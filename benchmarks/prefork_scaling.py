@@ -0,0 +1,121 @@
+"""Throughput of the prefork launcher vs. number of worker processes.
+
+Starts run.py on a throwaway database once per worker count, drives
+rendered pages with several keep-alive clients and reports requests per
+second and latency for each run. Throughput should grow with the worker
+count up to the number of cores.
+
+    python benchmarks/prefork_scaling.py --workers 1 2 4 --clients 16 --duration 10
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.http_client import HttpClient, percentile
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server did not start on port {port}')
+
+def start_launcher(tmp_dir, workers, threads, port):
+    env = dict(os.environ,
+               PORT=str(port),
+               WEB_WORKERS=str(workers),
+               WEB_THREADS=str(threads),
+               DATABASE_PATH=os.path.join(tmp_dir, 'bench.db'),
+               RATELIMIT_STORAGE_URI='sqlite:///' + os.path.join(tmp_dir, 'ratelimit.db'))
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'run.py')], cwd=tmp_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port)
+    return process
+
+def drive(port, path, stop, samples):
+    client = HttpClient('127.0.0.1', port)
+    while not stop.is_set():
+        start = time.perf_counter()
+        status, _ = client.get(path)
+        samples.append((time.perf_counter() - start) * 1000)
+        if status != 200:
+            raise RuntimeError(f'{path} returned {status}')
+
+def run_phase(port, path, clients, duration, warmup):
+    # Warm up every worker before measuring
+    stop = threading.Event()
+    threads = [threading.Thread(target=drive, args=(port, path, stop, []), daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    stop = threading.Event()
+    samples = [[] for _ in range(clients)]
+    threads = [threading.Thread(target=drive, args=(port, path, stop, samples[i]), daemon=True)
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    latencies = [sample for client in samples for sample in client]
+    return {
+        'requests_per_sec': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4, help='waitress threads per worker')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--path', default='/about')
+    args = parser.parse_args()
+
+    results = {'config': vars(args), 'cpu_count': os.cpu_count(), 'runs': []}
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            port = free_port()
+            process = start_launcher(tmp_dir, workers, args.threads, port)
+            try:
+                run = run_phase(port, args.path, args.clients, args.duration, args.warmup)
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+        run['workers'] = workers
+        results['runs'].append(run)
+
+    base = results['runs'][0]['requests_per_sec'] or 1
+    for run in results['runs']:
+        run['speedup'] = round(run['requests_per_sec'] / base, 2)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
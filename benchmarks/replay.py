@@ -0,0 +1,227 @@
+"""Replay captured production traffic against a local instance.
+
+Reads a trace file written by the traffic capture middleware
+(TRAFFIC_CAPTURE_FILE) and re-issues the requests against the app served
+in-process by waitress, on a copy of a snapshot database (or a freshly
+seeded one if --db is not given). --speed 1 keeps the original pacing,
+--speed 10 replays ten times faster and --speed 0 as fast as possible.
+
+Every pseudonymous user in the trace gets its own session, logged in as a
+real account of the same user type from the snapshot; those accounts get a
+known password on the copy only. Form values are synthesized from the
+recorded shapes. Login/logout/registration and file uploads are not
+replayed. Reports per-route latency next to the latency recorded in
+production, and how far behind schedule requests were issued.
+
+    python benchmarks/replay.py traffic.jsonl --db snapshot.db --speed 4
+"""
+import argparse
+import collections
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.http_client import HttpClient, percentile, start_server
+from benchmarks.loadtest import PASSWORD, Recorder, login, make_app, seed, summarize
+
+SKIPPED_PREFIXES = ('/auth/login', '/auth/logout', '/auth/register', '/static/')
+
+# Accounts that can log in as each user type
+ACCOUNT_QUERIES = {
+    'user': "SELECT id, email FROM users WHERE user_type = 'user' ORDER BY id LIMIT ?",
+    'helper': "SELECT u.id, u.email FROM users u JOIN helpers h ON h.user_id = u.id "
+              "WHERE u.user_type = 'helper' ORDER BY u.id LIMIT ?",
+    'admin': "SELECT u.id, u.email FROM users u JOIN admins a ON a.user_id = u.id "
+             "WHERE u.user_type = 'admin' ORDER BY u.id LIMIT ?",
+}
+
+def load_traces(path):
+    """Replayable traces in start order, and counts of skipped ones by reason"""
+    traces, skipped = [], collections.Counter()
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                trace = json.loads(line)
+            except ValueError:
+                skipped['unparsable'] += 1
+                continue
+            if trace['p'].startswith(SKIPPED_PREFIXES):
+                skipped['auth/static'] += 1
+            elif trace.get('files'):
+                skipped['upload'] += 1
+            else:
+                traces.append(trace)
+    traces.sort(key=lambda trace: trace['t'])
+    return traces, skipped
+
+def synthesize(shape):
+    """A form value of the recorded kind and length"""
+    kind, length = shape
+    if kind == 'd':
+        return '1' * length
+    if kind == 'e':
+        return 'replay@example.com'
+    return 'x' * length
+
+def prepare_accounts(db_path, sessions_by_role):
+    """Give the accounts used by the replay a known password (on the copy)"""
+    from config.default import Config
+    from werkzeug.security import generate_password_hash
+
+    password_hash = generate_password_hash(PASSWORD, Config.PASSWORD_HASH_METHOD)
+    accounts = {}
+    conn = sqlite3.connect(db_path)
+    try:
+        for role, count in sessions_by_role.items():
+            rows = conn.execute(ACCOUNT_QUERIES[role], (count,)).fetchall()
+            if not rows:
+                raise SystemExit(f'the database has no {role} accounts to replay {role} traffic with')
+            conn.executemany('UPDATE users SET password_hash = ? WHERE id = ?',
+                             [(password_hash, user_id) for user_id, _ in rows])
+            accounts[role] = [email for _, email in rows]
+        conn.commit()
+    finally:
+        conn.close()
+    return accounts
+
+def assign_sessions(traces, max_sessions, anonymous_sessions):
+    """Group traces into sessions: (role, slot) -> traces in start order.
+
+    Each pseudonymous actor keeps to one session; with more actors than
+    max_sessions per role, several share one. Anonymous traffic is spread
+    over anonymous_sessions sessions.
+    """
+    sessions = collections.defaultdict(list)
+    slots = collections.defaultdict(dict)
+    anonymous = 0
+    for trace in traces:
+        role, actor = trace.get('role'), trace.get('actor')
+        if role in ACCOUNT_QUERIES and actor:
+            known = slots[role]
+            if actor not in known:
+                known[actor] = len(known) % max_sessions
+            sessions[(role, known[actor])].append(trace)
+        else:
+            sessions[(None, anonymous % anonymous_sessions)].append(trace)
+            anonymous += 1
+    return sessions
+
+def replay_session(client, traces, origin, started, speed, stop, recorder, lag):
+    for trace in traces:
+        if stop.is_set():
+            return
+        if speed:
+            due = started + (trace['t'] - origin) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                lag.append(-delay * 1000)
+        path = trace['p']
+        args = {k: ('x' if v is None else v) for k, v in trace.get('args', {}).items()}
+        if args:
+            path += '?' + urlencode(args)
+        form = {k: synthesize(shape) for k, shape in trace.get('form', {}).items()}
+        label = f"{trace['m']} {trace.get('rule') or trace['p']}"
+        recorder.call(client, label, trace['m'], path, form)
+
+def _session(*args):
+    try:
+        replay_session(*args)
+    except Exception as e:
+        print(f'session stopped: {e}', file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('traces', help='file written by TRAFFIC_CAPTURE_FILE')
+    parser.add_argument('--db', help='snapshot database to replay against (copied first)')
+    parser.add_argument('--scale', type=int, default=1, help='size of the seeded database without --db')
+    parser.add_argument('--speed', type=float, default=1.0, help='1 = original pacing, 0 = no pacing')
+    parser.add_argument('--max-sessions', type=int, default=32, help='logged-in sessions per user type')
+    parser.add_argument('--anonymous-sessions', type=int, default=4)
+    parser.add_argument('--limit', type=int, help='replay only the first N traces')
+    parser.add_argument('--threads', type=int, default=8, help='waitress threads')
+    args = parser.parse_args()
+
+    traces, skipped = load_traces(args.traces)
+    if args.limit:
+        traces = traces[:args.limit]
+    if not traces:
+        raise SystemExit('no replayable traces')
+    sessions = assign_sessions(traces, args.max_sessions, args.anonymous_sessions)
+    sessions_by_role = collections.Counter(role for role, _ in sessions if role)
+
+    recorded = collections.defaultdict(list)
+    for trace in traces:
+        recorded[f"{trace['m']} {trace.get('rule') or trace['p']}"].append(trace['ms'])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        if args.db:
+            source, target = sqlite3.connect(args.db), sqlite3.connect(db_path)
+            source.backup(target)
+            source.close()
+            target.close()
+        else:
+            seed(db_path, args.scale)
+        accounts = prepare_accounts(db_path, sessions_by_role)
+
+        app = make_app(tmp_dir, args)
+        server, port = start_server(app, threads=args.threads)
+        stop = threading.Event()
+        recorders, lag, threads = [], [], []
+        origin = traces[0]['t']
+        try:
+            clients = {}
+            for role, slot in sessions:
+                if role is None:
+                    clients[(role, slot)] = None
+                else:
+                    emails = accounts[role]
+                    clients[(role, slot)] = login(port, emails[slot % len(emails)])
+            started = time.perf_counter()
+            for key, session_traces in sessions.items():
+                client = clients[key] or HttpClient('127.0.0.1', port)
+                recorder = Recorder()
+                recorders.append(recorder)
+                threads.append(threading.Thread(target=_session, daemon=True, args=(
+                    client, session_traces, origin, started, args.speed, stop, recorder, lag)))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            stop.set()
+            server.close()
+
+    routes, totals = summarize(recorders, elapsed)
+    for label, stats in routes.items():
+        stats['recorded_p50_ms'] = round(percentile(recorded[label], 50), 2)
+        stats['recorded_p95_ms'] = round(percentile(recorded[label], 95), 2)
+    print(json.dumps({
+        'benchmark': 'replay',
+        'config': vars(args),
+        'traces': len(traces),
+        'skipped': dict(skipped),
+        'sessions': len(sessions),
+        'recorded_seconds': round(traces[-1]['t'] - origin, 2),
+        'replay_seconds': round(elapsed, 2),
+        'late_requests': len(lag),
+        'lag_p95_ms': round(percentile(lag, 95), 2),
+        'totals': totals,
+        'routes': routes,
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
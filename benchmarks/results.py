@@ -0,0 +1,257 @@
+"""Benchmark result history and regression gate.
+
+Stores the JSON printed by the benchmarks in a local SQLite database, keyed
+by git commit, and compares commits:
+
+    python benchmarks/models.py | python benchmarks/results.py record -
+    python benchmarks/loadtest.py --duration 30 > run.json && python benchmarks/results.py record run.json
+    python benchmarks/results.py list
+    python benchmarks/results.py compare --base main --head HEAD --benchmark loadtest
+
+Understood outputs: per-route results (loadtest.py, replay.py) and per-method
+results (models.py). compare gates on each route's p95 latency and each
+model method's calls per second. A metric regresses when its median moves
+the wrong way by more than --threshold and a two-sided Mann-Whitney U test
+finds the difference significant at --alpha. Samples are the values of
+every run recorded for a commit, plus each round of a models.py run, so
+record a benchmark several times per commit. With fewer than
+--min-samples values on either side the test is skipped and the
+threshold alone decides. Exits with status 1 if anything regressed.
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB = os.getenv('BENCH_RESULTS_DB', os.path.join(ROOT, 'benchmark_results.db'))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    benchmark TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    recorded_at TEXT NOT NULL,
+    config TEXT,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_benchmark_commit ON runs (benchmark, commit_sha);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    higher_is_better INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_run ON metrics (run_id);
+'''
+
+# Metrics read from each route of a loadtest/replay run: key -> higher is better
+ROUTE_METRICS = {'p50_ms': False, 'p95_ms': False, 'p99_ms': False, 'rps': True, 'error_rate': False}
+# Metrics compare gates on by default
+GATED_SUFFIXES = (' p95_ms', ' ops_per_sec')
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def git(*args):
+    return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+
+def resolve_commit(ref):
+    """Full sha for a ref, or the ref itself when git cannot resolve it"""
+    try:
+        return git('rev-parse', '--verify', f'{ref}^{{commit}}')
+    except (OSError, subprocess.CalledProcessError):
+        return ref
+
+def working_tree_dirty():
+    try:
+        return bool(git('status', '--porcelain', '--untracked-files=no'))
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+def extract_metrics(data):
+    """(name, value, higher_is_better) rows for a benchmark's JSON output"""
+    rows = []
+    if 'routes' in data:
+        for label, stats in data['routes'].items():
+            for key, higher in ROUTE_METRICS.items():
+                if key in stats:
+                    rows.append((f'{label} {key}', stats[key], higher))
+        for key, higher in ROUTE_METRICS.items():
+            if key in data.get('totals', {}):
+                rows.append((f'total {key}', data['totals'][key], higher))
+    if 'methods' in data:
+        for name, stats in data['methods'].items():
+            # One sample per round, so a single run can be tested
+            for value in stats.get('rounds') or [stats['ops_per_sec']]:
+                rows.append((f'{name} ops_per_sec', value, True))
+    return rows
+
+def record(conn, data, benchmark, commit, dirty):
+    rows = extract_metrics(data)
+    if not rows:
+        raise SystemExit('no routes or methods found in the benchmark output')
+    cursor = conn.execute(
+        'INSERT INTO runs (benchmark, commit_sha, dirty, recorded_at, config, raw) VALUES (?, ?, ?, ?, ?, ?)',
+        (benchmark, commit, int(dirty), datetime.now(timezone.utc).isoformat(timespec='seconds'),
+         json.dumps(data.get('config')), json.dumps(data)))
+    conn.executemany('INSERT INTO metrics (run_id, name, value, higher_is_better) VALUES (?, ?, ?, ?)',
+                     [(cursor.lastrowid, name, value, int(higher)) for name, value, higher in rows])
+    conn.commit()
+    return cursor.lastrowid, len(rows)
+
+def samples(conn, benchmark, commit):
+    """metric name -> (values across every run of the commit, higher is better)"""
+    rows = conn.execute('''
+        SELECT m.name, m.value, m.higher_is_better FROM metrics m JOIN runs r ON r.id = m.run_id
+        WHERE r.benchmark = ? AND (r.commit_sha = ? OR r.commit_sha LIKE ? || '%')
+    ''', (benchmark, commit, commit)).fetchall()
+    result = {}
+    for name, value, higher in rows:
+        result.setdefault(name, ([], bool(higher)))[0].append(value)
+    return result
+
+def mann_whitney(a, b):
+    """Two-sided p-value of the Mann-Whitney U test.
+
+    Normal approximation with tie and continuity corrections; adequate from
+    about four samples per side.
+    """
+    n1, n2 = len(a), len(b)
+    pooled = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    ranks = [0.0] * len(pooled)
+    tie_term = 0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tied = j - i + 1
+        tie_term += tied ** 3 - tied
+        i = j + 1
+    rank_sum = sum(rank for rank, (_, side) in zip(ranks, pooled) if side == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0
+    z = max(abs(u - n1 * n2 / 2) - 0.5, 0) / sigma
+    return math.erfc(z / math.sqrt(2))
+
+def compare(base, head, threshold, alpha, min_samples, include_all=False):
+    """One row per metric present on both sides, flagged if it regressed"""
+    rows = []
+    for name in sorted(set(base) & set(head)):
+        if not include_all and not name.endswith(GATED_SUFFIXES):
+            continue
+        base_values, higher = base[name]
+        head_values, _ = head[name]
+        base_median, head_median = statistics.median(base_values), statistics.median(head_values)
+        change = (head_median - base_median) / base_median if base_median else 0.0
+        worse = -change if higher else change
+        tested = min(len(base_values), len(head_values)) >= min_samples
+        p_value = mann_whitney(base_values, head_values) if tested else None
+        regressed = (name.endswith(GATED_SUFFIXES) and worse > threshold
+                     and (p_value is None or p_value < alpha))
+        rows.append({
+            'metric': name,
+            'base': round(base_median, 3),
+            'head': round(head_median, 3),
+            'change_pct': round(change * 100, 1),
+            'samples': [len(base_values), len(head_values)],
+            'p_value': None if p_value is None else round(p_value, 4),
+            'regressed': regressed,
+        })
+    return rows
+
+def print_table(rows):
+    width = max([len(row['metric']) for row in rows] + [6])
+    print(f"{'metric':<{width}}  {'base':>10}  {'head':>10}  {'change':>8}  {'n':>7}  {'p':>7}")
+    for row in rows:
+        p_value = '-' if row['p_value'] is None else f"{row['p_value']:.4f}"
+        flag = '  REGRESSED' if row['regressed'] else ''
+        samples = f"{row['samples'][0]}/{row['samples'][1]}"
+        print(f"{row['metric']:<{width}}  {row['base']:>10}  {row['head']:>10}  "
+              f"{row['change_pct']:>7}%  {samples:>7}  {p_value:>7}{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB, help='results database (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_cmd = commands.add_parser('record', help='store a benchmark result')
+    record_cmd.add_argument('file', help="benchmark JSON output, or - for stdin")
+    record_cmd.add_argument('--benchmark', help='name to store it under (default: from the output)')
+    record_cmd.add_argument('--commit', default='HEAD', help='git ref the result belongs to')
+
+    list_cmd = commands.add_parser('list', help='show recorded runs')
+    list_cmd.add_argument('--benchmark')
+    list_cmd.add_argument('--limit', type=int, default=20)
+
+    compare_cmd = commands.add_parser('compare', help='compare two commits; exit 1 on a regression')
+    compare_cmd.add_argument('--benchmark', required=True)
+    compare_cmd.add_argument('--base', required=True, help='git ref of the baseline')
+    compare_cmd.add_argument('--head', default='HEAD', help='git ref under test')
+    compare_cmd.add_argument('--threshold', type=float, default=0.10, help='tolerated relative change')
+    compare_cmd.add_argument('--alpha', type=float, default=0.05, help='significance level')
+    compare_cmd.add_argument('--min-samples', type=int, default=4,
+                             help='samples per side needed to run the significance test')
+    compare_cmd.add_argument('--all', action='store_true', help='also show metrics that are not gated')
+    compare_cmd.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        if args.command == 'record':
+            data = json.load(sys.stdin if args.file == '-' else open(args.file))
+            benchmark = args.benchmark or data.get('benchmark')
+            if not benchmark:
+                raise SystemExit('the output does not name its benchmark; pass --benchmark')
+            commit = resolve_commit(args.commit)
+            dirty = args.commit == 'HEAD' and working_tree_dirty()
+            run_id, count = record(conn, data, benchmark, commit, dirty)
+            print(f"Recorded run {run_id}: {benchmark} at {commit[:12]}{' (dirty)' if dirty else ''}, "
+                  f"{count} metric values")
+
+        elif args.command == 'list':
+            query = 'SELECT id, benchmark, commit_sha, dirty, recorded_at FROM runs'
+            params = ()
+            if args.benchmark:
+                query += ' WHERE benchmark = ?'
+                params = (args.benchmark,)
+            for run_id, benchmark, commit, dirty, recorded_at in conn.execute(
+                    query + ' ORDER BY id DESC LIMIT ?', params + (args.limit,)):
+                print(f"{run_id:>5}  {recorded_at}  {commit[:12]}{'+' if dirty else ' '}  {benchmark}")
+
+        else:
+            base_commit, head_commit = resolve_commit(args.base), resolve_commit(args.head)
+            base = samples(conn, args.benchmark, base_commit)
+            head = samples(conn, args.benchmark, head_commit)
+            if not base or not head:
+                missing = args.base if not base else args.head
+                raise SystemExit(f'no {args.benchmark} results recorded for {missing}')
+            rows = compare(base, head, args.threshold, args.alpha, args.min_samples, args.all)
+            if args.json:
+                print(json.dumps({'base': base_commit, 'head': head_commit, 'metrics': rows}, indent=2))
+            else:
+                print(f'{args.benchmark}: {base_commit[:12]} -> {head_commit[:12]}')
+                print_table(rows)
+            regressed = [row['metric'] for row in rows if row['regressed']]
+            if regressed:
+                print(f"{len(regressed)} regression(s): {', '.join(regressed)}", file=sys.stderr)
+                sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Cold-start time of create_app in fresh interpreter processes.
+
+Each run starts a new Python process (as a restarted or newly scaled-out
+worker would), builds the app against a throwaway database and reports the
+startup breakdown from app.extensions['startup_report'] plus the time until
+the first request is served.
+
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --runs 5 --precompile-templates
+    python benchmarks/startup.py --runs 5 --precompile-templates --bytecode-cache
+
+With --bytecode-cache the runs share a Jinja bytecode cache, filled by the
+first (unmeasured) run, as restarted workers would.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def child(args):
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from config.default import Config
+    from app import create_app
+
+    class BenchConfig(Config):
+        DATABASE_PATH = os.path.join(args.tmp_dir, 'bench.db')
+        RATELIMIT_STORAGE_URI = 'sqlite:///' + os.path.join(args.tmp_dir, 'ratelimit.db')
+        TEMPLATE_PRECOMPILE = args.precompile_templates
+        TEMPLATE_BYTECODE_CACHE_DIR = os.path.join(args.tmp_dir, 'jinja_cache') if args.bytecode_cache else ''
+
+    app = create_app(BenchConfig)
+    ready = time.perf_counter()
+    status = app.test_client().get('/about').status_code
+    first_request = time.perf_counter()
+
+    print(json.dumps({
+        'process_ms': round((ready - started) * 1000, 2),
+        'first_request_ms': round((first_request - ready) * 1000, 2),
+        'status': status,
+        'report': app.extensions['startup_report'].as_dict(),
+        'first_renders_ms': app.extensions['first_renders'].first_renders,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--precompile-templates', action='store_true')
+    parser.add_argument('--bytecode-cache', action='store_true')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--tmp-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        command = [sys.executable, os.path.abspath(__file__), '--child', '--tmp-dir', tmp_dir]
+        if args.precompile_templates:
+            command.append('--precompile-templates')
+        if args.bytecode_cache:
+            command.append('--bytecode-cache')
+        for _ in range(args.runs + 1):
+            output = subprocess.run(command, cwd=tmp_dir, capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+    # The first run creates the database; measure the restarts after it
+    runs = runs[1:]
+
+    phases = {}
+    first_renders = {}
+    for run in runs:
+        for name, ms in run['report']['phases_ms'].items():
+            phases.setdefault(name, []).append(ms)
+        for name, ms in run['first_renders_ms'].items():
+            first_renders.setdefault(name, []).append(ms)
+
+    def median(values):
+        values = sorted(values)
+        return values[len(values) // 2] if values else 0.0
+
+    print(json.dumps({
+        'config': {'runs': args.runs, 'precompile_templates': args.precompile_templates,
+                   'bytecode_cache': args.bytecode_cache},
+        'median_process_ms': median([run['process_ms'] for run in runs]),
+        'median_first_request_ms': median([run['first_request_ms'] for run in runs]),
+        'median_phases_ms': {name: median(values) for name, values in phases.items()},
+        'median_first_renders_ms': {name: median(values) for name, values in first_renders.items()},
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -10,10 +10,114 @@ class Config:
     # Use absolute path for database to avoid issues
     DATABASE_PATH = os.getenv('DATABASE_PATH', os.path.join(PROJECT_ROOT, 'community_helper.db'))
     DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', '10'))
+    # How often (seconds) the settings cache checks for writes by other processes
+    SETTINGS_REFRESH_INTERVAL = float(os.getenv('SETTINGS_REFRESH_INTERVAL', '5'))
     DEBUG = os.getenv('FLASK_ENV') == 'development'
+    # Per-process cache of the logged-in user's rows (see app/utils/principal.py).
+    # Invalidation only reaches the process that made the change, so with
+    # several worker processes (or edits made outside the app) the others can serve
+    # a stale name, role or verification status for up to PRINCIPAL_CACHE_TTL
+    # seconds. Set it to 0 to disable the cache.
+    PRINCIPAL_CACHE_TTL = float(os.getenv('PRINCIPAL_CACHE_TTL', '30'))
+    PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', '1024'))
+    # Password hashing. Hashes run on a small pool; at most
+    # PASSWORD_HASH_MAX_PENDING (running or queued) are admitted at once so a
+    # login burst cannot occupy every server thread. A request beyond that
+    # waits up to PASSWORD_HASH_QUEUE_TIMEOUT seconds for a slot before it
+    # gets a 503. Changing the method upgrades stored hashes on the next
+    # successful login.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'thread')  # 'thread' or 'process'
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', str(4 * PASSWORD_HASH_WORKERS)))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', '2'))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+    # Login throttling, checked before any user lookup or password hashing
+    LOGIN_SHIELD_ENABLED = os.getenv('LOGIN_SHIELD_ENABLED', 'true').lower() == 'true'
+    LOGIN_SHIELD_IP_BURST = int(os.getenv('LOGIN_SHIELD_IP_BURST', '10'))
+    LOGIN_SHIELD_IP_PER_MINUTE = float(os.getenv('LOGIN_SHIELD_IP_PER_MINUTE', '10'))
+    LOGIN_SHIELD_ACCOUNT_BURST = int(os.getenv('LOGIN_SHIELD_ACCOUNT_BURST', '5'))
+    LOGIN_SHIELD_ACCOUNT_PER_MINUTE = float(os.getenv('LOGIN_SHIELD_ACCOUNT_PER_MINUTE', '1'))
+    LOGIN_SHIELD_MAX_KEYS = int(os.getenv('LOGIN_SHIELD_MAX_KEYS', '10000'))
+    # Rate limit counters shared by all worker processes (app/rate_limit_storage.py).
+    # Use memory:// for a single process.
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'sqlite:///' + os.path.join(PROJECT_ROOT, 'ratelimit.db'))
+    RATELIMIT_STORAGE_OPTIONS = {'sweep_interval': int(os.getenv('RATELIMIT_SWEEP_INTERVAL', '60'))}
+    # Seconds before a request's database work is aborted (0 disables). A
+    # streamed body gets this long again to produce each chunk.
+    REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', '30'))
+    # Waitress serving (run.py). WEB_WORKERS > 1 forks that many processes
+    # sharing one listening socket; send SIGHUP to recycle them gracefully.
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', '1'))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
+    WEB_CONNECTION_LIMIT = int(os.getenv('WEB_CONNECTION_LIMIT', '100'))
+    WEB_CHANNEL_TIMEOUT = int(os.getenv('WEB_CHANNEL_TIMEOUT', '120'))
+    WEB_BACKLOG = int(os.getenv('WEB_BACKLOG', '1024'))
+    WEB_GRACEFUL_TIMEOUT = float(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+    # Compile every template at startup instead of on first use
+    TEMPLATE_PRECOMPILE = os.getenv('TEMPLATE_PRECOMPILE', 'false').lower() == 'true'
+    # Compiled templates are kept here across restarts (empty disables)
+    TEMPLATE_BYTECODE_CACHE_DIR = os.getenv('TEMPLATE_BYTECODE_CACHE_DIR', os.path.join(PROJECT_ROOT, '.jinja_cache'))
+    # Logging. Records are queued and written by one background thread to
+    # LOG_FILE (stderr if empty), as text or json. Each INFO/DEBUG call site
+    # of the per-request loggers in LOG_SAMPLED_LOGGERS may log at most
+    # LOG_SAMPLE_LIMIT lines per LOG_SAMPLE_INTERVAL seconds (0 disables
+    # sampling); when the queue is full records are dropped.
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    LOG_SAMPLE_LIMIT = int(os.getenv('LOG_SAMPLE_LIMIT', '20'))
+    LOG_SAMPLE_INTERVAL = float(os.getenv('LOG_SAMPLE_INTERVAL', '60'))
+    LOG_SAMPLED_LOGGERS = [name for name in os.getenv(
+        'LOG_SAMPLED_LOGGERS', 'werkzeug,waitress,app.utils.query_profiler').split(',') if name]
+    # Per-endpoint latency and query metrics, served at /admin/metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    # SQL profiler: time per query shape (see /admin/queries). The plan of
+    # any shape slower than SQL_SLOW_QUERY_MS is captured once. Per-request
+    # statement logs default to on in debug mode only.
+    SQL_PROFILER_ENABLED = os.getenv('SQL_PROFILER_ENABLED', 'true').lower() == 'true'
+    SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', '100'))
+    SQL_PROFILE_REQUESTS = os.getenv('SQL_PROFILE_REQUESTS', str(DEBUG)).lower() == 'true'
+    # Traffic capture for replay benchmarks: off unless a file is given.
+    # Traces hold no form values, only field names and lengths.
+    TRAFFIC_CAPTURE_FILE = os.getenv('TRAFFIC_CAPTURE_FILE', '')
+    TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.getenv('TRAFFIC_CAPTURE_SAMPLE_RATE', '1.0'))
+    # Upload limits: MAX_CONTENT_LENGTH caps a whole request body (waitress
+    # refuses larger bodies before buffering them); UPLOAD_MAX_FILE_SIZE
+    # caps each file while it streams to disk
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', str(16 * 1024 * 1024)))
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', str(8 * 1024 * 1024)))
+    # Browser and proxy cache lifetime of avatars (content-addressed, they
+    # never change); verification documents are never cached
+    UPLOAD_CACHE_MAX_AGE = int(os.getenv('UPLOAD_CACHE_MAX_AGE', str(365 * 24 * 3600)))
+    # Verification documents are type-checked in the background from their
+    # first UPLOAD_SNIFF_BYTES (libmagic if python-magic is installed)
+    UPLOAD_VALIDATION_WORKERS = int(os.getenv('UPLOAD_VALIDATION_WORKERS', '2'))
+    UPLOAD_SNIFF_BYTES = int(os.getenv('UPLOAD_SNIFF_BYTES', '8192'))
+    # Profile pictures get a THUMBNAIL_SIZE px square JPEG thumbnail, made
+    # in the background (needs Pillow; the full picture is used until then)
+    THUMBNAIL_SIZE = int(os.getenv('THUMBNAIL_SIZE', '160'))
+    THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '82'))
+    THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '1'))
+    # Answer revalidations of dashboards and helper profiles with 304 when
+    # the rows behind them are unchanged
+    CONDITIONAL_GET_ENABLED = os.getenv('CONDITIONAL_GET_ENABLED', 'true').lower() == 'true'
+    # Serve the fingerprinted assets listed in app/static/dist/manifest.json
+    # when it exists; they never change, so browsers cache them for good
+    USE_ASSET_MANIFEST = os.getenv('USE_ASSET_MANIFEST', 'true').lower() == 'true'
+    ASSET_CACHE_MAX_AGE = int(os.getenv('ASSET_CACHE_MAX_AGE', str(365 * 24 * 3600)))
+    # Compress text responses of at least COMPRESSION_MIN_SIZE bytes (brotli
+    # when installed and accepted, else gzip at COMPRESSION_LEVEL)
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6'))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
     SESSION_COOKIE_HTTPONLY = True
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
-    UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, 'app', 'static', 'uploads')
+    # Outside the static folder, so every upload is served by the uploads
+    # blueprint, which checks who may see verification documents
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(PROJECT_ROOT, 'uploads'))
     
     # Firebase settings (if needed, loading from env or check logic)
     FIREBASE_API_KEY = os.getenv('FIREBASE_API_KEY')
@@ -1,23 +1,22 @@
-
-from waitress import serve
-from app import create_app
 from dotenv import load_dotenv
 import os
 
-# Load environment variables
+# Load environment variables before Config reads them
 load_dotenv()
 
+from app import create_app
+from app.server import serve_app
+from config.default import Config
+
 if __name__ == '__main__':
-    # Create app instance
-    app = create_app()
-    
     # Get port from environment or default to 5000
     port = int(os.getenv('PORT', 5000))
-    
+
     # Print startup message
-    print(f"\nStarting Community App server on port {port}...")
+    print(f"\nStarting Community App server on port {port} "
+          f"({Config.WEB_WORKERS} worker(s) x {Config.WEB_THREADS} threads)...")
     print(f"Visit http://localhost:{port} or http://127.0.0.1:{port} in your browser")
     print("Press Ctrl+C to stop the server\n")
-    
-    # Run the app with Waitress
-    serve(app, host='0.0.0.0', port=port, threads=4)
\ No newline at end of file
+
+    # Run the app with Waitress; the app is created inside each worker process
+    serve_app(create_app, Config, host='0.0.0.0', port=port)
\ No newline at end of file